@@ -1,331 +1,551 @@
+import functools
+import itertools
 import json
 import math
 import os
-from dotenv import load_dotenv
-from qiskit import QuantumCircuit, transpile, ClassicalRegister, QuantumRegister
+import zlib
+from qiskit import QuantumCircuit, transpile
 import numpy as np
-from qiskit_aer import AerSimulator
-from qiskit_ibm_runtime import QiskitRuntimeService, SamplerV2 as Sampler
-from qiskit_ibm_runtime.fake_provider import FakeManilaV2
-from qiskit.visualization import plot_histogram
-from matplotlib import pyplot
+from transpile_cache import cached_transpile, circuit_hash, transpile_repeated
+from results_store import ResultsStore
+from render import RENDER_DIR, RenderQueue, render_pending
+from bit_counts import bincount, counts_dict, success_probability, top_k
+from ideal_grover import marked_from_circuit, sample_counts
+from grover_builder import CONSTRUCTIONS, MCX_STRATEGIES, UNCOMPUTATIONS, GroverBuilder, hash_oracle
+from adaptive_search import bbht_search, counting_circuit, counting_search, marked_verifier, sampler_runner
+from backends import make_backend
+from aer_methods import choose_options
+from layout_search import search_layouts
+from job_manager import Batch, JobManager, RuntimeAdapter, batch_key, new_run_id
+from telemetry import TELEMETRY_FILE, Telemetry, circuit_fields, wait_for_job
 
 # --- Configuration ---
-# Load environment variables from .env file for Azure Quantum
-load_dotenv()
+# Importing this module only loads qiskit: the backend, the sampler and the
+# output directory are created when a run starts (see backends.py).
 
 # Directory to save results
 output_dir = "./results/Local_no_reset"
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
 
 # --- Backend Selection ---
-# Set to False to use Azure Quantum, True for local AerSimulator
+# Set to False to use IBM Quantum hardware, True for local AerSimulator
 use_local = True
 
 if use_local:
-    # Setting a local AER simulator backend
-    backend = AerSimulator()
-    sampler = Sampler(backend)
     optimization_level = 1
     # Number of times to run the circuit
     num_shots = 1024
+    # Aer method: "auto" picks it, with threading and fusion settings, from the circuit
+    # and the calibration table of aer_methods.py; a method name forces it for comparison
+    aer_method = "auto"
+    # Seeds of the layout search; the simulator has no errors to score layouts by
+    layout_search_seeds = 0
+    # Journal jobs so an interrupted run picks up their results (job_manager.py)
+    journal_jobs = False
 else:
-    # Load saved credentials
-    service = QiskitRuntimeService()
-    backend = service.least_busy(operational=True, simulator=False)
-
-    # Set resilience options. Level 1 is a good starting point.
-    # Initialize your Sampler with these options
-    sampler = Sampler(backend)
-    
-
     optimization_level = 3
     num_shots = 1024
+    # Transpile with this many seeds (plus the best logged layouts) in parallel and submit
+    # the one with the highest estimated fidelity (layout_search.py); 0 transpiles once
+    layout_search_seeds = 16
+    journal_jobs = True
+# Id of a journaled run to resume, as printed when it started; None samples anew
+resume_run = None
 
 
 # --- Circuit configuration ---
-input_qubits = list(range(8))           # Qubits 0-7
-classical_destination = list(range(8))  # classical bits 0-7
-PHASE_ANC_INDEX = 13
-OR_RESULT_ANC_INDEX = 14
-F_RESULT_ANC_INDEX = 12
+# Every circuit is built by a grover_builder.GroverBuilder of the hash oracle (hash_builder()),
+# whose kickback construction lays it out on NUM_QUBITS qubits
+NUM_QUBITS = 15
 # Whether or not to pretend to know the number of solutions
 known_solutions = True
+# Optimal iterations for the 4 solutions among 2^8 inputs:
+# t = round( (pi/4) * sqrt(N/s) ) = round( (pi/4) * sqrt(256/4) ) ~ 6
+KNOWN_SOLUTIONS_T = 6
+# Transpile one Grover iterate and repeat it t times instead of transpiling the full circuit
+transpile_per_iteration = False
+# On a local simulator, replace the t-sweep by one run that snapshots every iteration
+snapshot_sweep = True
+# Oracle construction, one of CONSTRUCTIONS: "kickback" prepares and undoes the phase
+# ancilla in every oracle, "phase" marks the states with multi-controlled Z gates and
+# needs no phase ancilla (see construction_report.py)
+default_construction = "kickback"
+# Decomposition of the multi-controlled X gates, one of MCX_STRATEGIES
+default_mcx_strategy = "noancilla"
+# How the oracles free their ancillas, one of UNCOMPUTATIONS: "reversible" repeats
+# the gates in reverse, "measure" measures each ancilla in the X basis and fixes
+# the phase under a classical condition, "reset" does the same but resets the
+# measured ancilla instead of flipping it back
+default_uncomputation = "reversible"
+# Unknown solutions: "sweep" runs the candidate_schedule, "bbht" and "counting"
+# run an adaptive search that stops once required_solutions are verified classically
+search_mode = "sweep"
+required_solutions = 1
+shots_per_batch = 8
+# Counting register size for search_mode = "counting"
+counting_precision = 6
+# Also keep every run's counts in the append-only results store (results_store.py)
+store_results = True
+# Circuit diagrams and histograms: "deferred" queues them for `python render.py`,
+# "now" renders the queue in a process pool after the run, "skip" draws nothing
+render_mode = "deferred"
+# Per-stage timings of every run as JSON lines (telemetry.py), None to not record them
+telemetry_path = TELEMETRY_FILE
+
+
+# --- Hash oracle builder ---
+# MCX_STRATEGIES, CONSTRUCTIONS, UNCOMPUTATIONS and the circuits themselves live in grover_builder.py.
+
+@functools.lru_cache(maxsize=None)
+def _hash_builder (construction, mcx_strategy, uncomputation):
+    return GroverBuilder(8, hash_oracle(), NUM_QUBITS - 8, mcx_strategy, construction, uncomputation)
+
+def hash_builder (construction=None, mcx_strategy=None, uncomputation=None):
+    """The GroverBuilder of the hash oracle; options not given take their default_* value."""
+    return _hash_builder(construction or default_construction, mcx_strategy or default_mcx_strategy,
+                         uncomputation or default_uncomputation)
+
+# Qubits of the kickback layout
+input_qubits = hash_builder("kickback").input_qubits          # Qubits 0-7
+F_RESULT_ANC_INDEX = hash_builder("kickback").result_qubit     # 12
+OR_RESULT_ANC_INDEX = hash_builder("kickback").or_result_qubit # 14
 
 
 # --- Helper functions ---
 
-def compute_OR_fx (circ):
-    """Computes OR of input_indices into or_result_anc_idx.
-       Assumes or_result_anc_idx is |0> initially.
-    """
-    # Apply X to all input qubits (to get NOT x_i)
-    for i in input_qubits:
-        circ.x(i)
-    
-    
-    # Target is ORPHASE_ANC_INDEX. It now holds AND(NOT x_i).
-    circ.mcx(input_qubits, OR_RESULT_ANC_INDEX)
-
-    # Apply X to all input qubits again to restore them to their original state
-    for i in input_qubits:
-        circ.x(i)
-    
-    # Apply X to it to get NOT(AND(NOT x_i)) = OR(x_i).
-    circ.x(OR_RESULT_ANC_INDEX)
-
-def uncompute_OR_fx(circ):
-    """Uncomputes OR_fx. Returns or_result_anc_idx to |0>."""
-    # Inverse of compute_OR_fx applied in reverse order
-    circ.x(OR_RESULT_ANC_INDEX) # Reverse the final X
-
-    for i in input_qubits: # Reverse the restoration Xs
-        circ.x(i)
-    
-    circ.mcx(input_qubits, OR_RESULT_ANC_INDEX) # Reverse the MCX
-
-    for i in input_qubits: # Reverse the initial Xs
-        circ.x(i)
-
-def Z_or (circ):
-    """Implements the Z_OR gate acting on INPUT_QUBIT_INDICES."""
-    
-    # --- Part 1: Compute OR(X) into OR_RESULT_ANC_INDEX ---
-    compute_OR_fx(circ)
-
-    # --- Part 2: Phase Kickback ---
-    # Prepare for kickback into |->
-    circ.x(PHASE_ANC_INDEX)
-    circ.h(PHASE_ANC_INDEX)
-
-    # CNOT from OR_RESULT_ANC_INDEX to PHASE_ANC_INDEX
-    circ.cx(OR_RESULT_ANC_INDEX, PHASE_ANC_INDEX)
-
-    # --- Part 3: Uncompute OR(X) ---
-    #Input qubits are restored to their original state by this function.
-    uncompute_OR_fx(circ)
-    
-    # --- Part 4: Clean up PHASE_ANC_INDEX ---
-    # Return PHASE_ANC_INDEX from |-> basis back to |0>
-    circ.h(PHASE_ANC_INDEX)
-    circ.x(PHASE_ANC_INDEX)
-
-    circ.barrier()
-
-
-def compute_fx(circ):
-    """Computes f of input_indices into F_RESULT_ANC_INDEX.
+def compute_fx (circ, mcx_strategy=None):
+    """Computes f of input_qubits into F_RESULT_ANC_INDEX.
        Assumes F_RESULT_ANC_INDEX is |0> initially.
     """
-    ####    Oracle    ####
-
-    # The hash function
-    # Gate 2
-    circ.ccx(2, 3, 8)
-    # Gate 3
-    circ.ccx(4, 6, 9)
-    # Gate 5
-    circ.ccx(8,9,11)
-
-    # Ensure the first 3 bits are zero
-    # Gate 0
-    circ.x(0)
-    # Gate 1
-    circ.x(1)
-    # Gate 4
-    circ.ccx(0,1,10)
-    # Gate 6
-    circ.ccx(10,11,F_RESULT_ANC_INDEX)
-    
-def uncompute_fx(circ):
-    """Uncomputes fx. Returns F_RESULT_ANC_INDEX to |0>.
-       Input qubits are restored to their original state by this function."""
-    
-    # Gate 6
-    circ.ccx(10,11,F_RESULT_ANC_INDEX)
-    # Gate 4
-    circ.ccx(0,1,10)
-    # Gate 1
-    circ.x(1)
-    # Gate 0
-    circ.x(0)
-    # Gate 5
-    circ.ccx(8,9,11)
-    # Gate 3
-    circ.ccx(4, 6, 9)
-    # Gate 2
-    circ.ccx(2, 3, 8)
-
-def Z_f (circ):
-    """Implements the Z_f gate acting on INPUT_QUBIT_INDICES.
-       Marks states where f(x)=1 with a phase kickback."""
-    
-    compute_fx(circ)
-
-
-    # Prepare Phase Kickback Ancilla to |->
-    circ.x(PHASE_ANC_INDEX)
-    circ.h(PHASE_ANC_INDEX)
-
-    circ.cx(F_RESULT_ANC_INDEX, PHASE_ANC_INDEX)
-
-    #Input qubits are restored to their original state by this function.
-    uncompute_fx(circ)
-
-    # Return PHASE_ANC_INDEX from |-> basis back to |0>
-    circ.h(PHASE_ANC_INDEX)
-    circ.x(PHASE_ANC_INDEX)
-
-    circ.barrier()
+    hash_builder("kickback", mcx_strategy).compute_oracle(circ)
+
+def uncompute_fx (circ, mcx_strategy=None, uncomputation=None):
+    """Uncomputes fx. Returns F_RESULT_ANC_INDEX and ancillas 8-11 to |0>."""
+    hash_builder("kickback", mcx_strategy, uncomputation).uncompute_oracle(circ)
+
+def compute_OR_fx (circ, mcx_strategy=None):
+    """Computes OR of input_qubits into OR_RESULT_ANC_INDEX.
+       Assumes OR_RESULT_ANC_INDEX is |0> initially.
+    """
+    hash_builder("kickback", mcx_strategy).compute_or(circ)
+
+def uncompute_OR_fx (circ, mcx_strategy=None, uncomputation=None):
+    """Uncomputes OR_fx. Returns OR_RESULT_ANC_INDEX to |0>."""
+    hash_builder("kickback", mcx_strategy, uncomputation).uncompute_or(circ)
+
+
+def candidate_schedule (N, growth_factor=1.5):
+    """
+    Returns the increasing 't' values to try when the number of solutions is unknown.
+    N: Total items in the search space.
+    growth_factor: Factor to increase 't' in each step.
+    """
+    current_t = 1.0 # Initial number of iterations.
+    # Heuristic maximum for t, roughly pi/4 * sqrt(N) if s=1.
+    max_t = (math.pi/4) * math.sqrt(N)
+    candidates_t = []
+
+    # Generate a sequence of 't' values, increasing exponentially.
+    while (int(round(current_t)) < max_t):
+        t_to_add = int(round(current_t)) # Round to nearest integer.
+        candidates_t.append(t_to_add)
+        current_t *= growth_factor # Increase 't'.
+        if int(round(current_t)) <= t_to_add and t_to_add > 0 : # Ensure 't' progresses if rounding stalls.
+            current_t = t_to_add + 1
+    if not candidates_t and max_t >=1 : candidates_t.append(1) # Ensure at least t=1 is run.
+    return candidates_t
 
 
 # --- Grover operation ---
 
-def Grover (circ, t):
+def prepare_superposition (circ, construction=None):
+    """Puts all input qubits in an equal superposition."""
+    hash_builder(construction).prepare(circ)
+
+def grover_iteration (circ, construction=None, mcx_strategy=None, uncomputation=None):
+    """Appends one Grover iterate: Z_f followed by the diffusion H Z_or H.
+       construction: one of CONSTRUCTIONS, defaults to default_construction.
+       mcx_strategy: one of MCX_STRATEGIES, defaults to default_mcx_strategy.
+       uncomputation: one of UNCOMPUTATIONS, defaults to default_uncomputation."""
+    hash_builder(construction, mcx_strategy, uncomputation).iteration(circ)
+
+def Grover (circ, t, construction=None, mcx_strategy=None, uncomputation=None):
     """
     Constructs the Grover's algorithm circuit.
     t: The number of Grover iterations to perform.
+    construction: One of CONSTRUCTIONS, defaults to default_construction.
+    mcx_strategy: One of MCX_STRATEGIES, defaults to default_mcx_strategy.
+    uncomputation: One of UNCOMPUTATIONS, defaults to default_uncomputation;
+    the measured ones add the classical register "uncompute" to circ.
     """
+    builder = hash_builder(construction, mcx_strategy, uncomputation)
 
     # Step 1 prepare all qubits in a super position
-    for i in input_qubits:
-        circ.h(i)
-    circ.barrier()
+    builder.prepare(circ)
 
     # Step 2 perform t iterations of Grovers operation
     for j in range(t):
-        # for i in range(8, 13): circ.reset(i) # Reset ancillas 8,9,10,11 and output F_RESULT_ANC_INDEX for Z_f
-        Z_f(circ)
-        for i in input_qubits: circ.h(i)
-        circ.barrier()
-        Z_or(circ)
-        for i in input_qubits: circ.h(i)
-        circ.barrier()
-
+        builder.iteration(circ)
 
     # Step 3 Measure to get a candidate solution for the search
-    circ.measure(input_qubits, classical_destination)
+    builder.measure(circ)
 
+def probability_table (t_max, simulator, construction=None, mcx_strategy=None, uncomputation=None):
+    """
+    Runs a Grover circuit that saves the input probabilities after every iteration once on an Aer simulator.
+    Returns a (t_max, 2^n) array whose row t-1 holds the input probabilities after t iterations.
+    After the phase fixups the inputs no longer depend on the ancilla outcomes, so
+    one shot also covers the measured uncomputations.
+    """
+    builder = hash_builder(construction, mcx_strategy, uncomputation)
+    circ = builder.new_circuit(measure=False)
+    builder.snapshots(circ, t_max)
+    data = simulator.run(transpile(circ, simulator), shots=1).result().data()
+    return np.array([data[f"t_{t}"] for t in range(1, t_max + 1)])
+
+def success_by_t (table, marked):
+    """Per-t probability of measuring a marked state, and the best t (1-based)."""
+    success = table[:, marked].sum(axis=1)
+    return success, int(np.argmax(success)) + 1
+
+def Grover_pieces (construction=None, mcx_strategy=None, uncomputation=None):
+    """
+    Returns the (prepare, iterate, measure) circuits that make up Grover(circ, t),
+    so the iterate can be transpiled once and repeated t times.
+    """
+    return hash_builder(construction, mcx_strategy, uncomputation).pieces()
+
+def Grover_circuit (t, construction=None, mcx_strategy=None, uncomputation=None):
+    """Returns a new measured Grover circuit with t iterations."""
+    return hash_builder(construction, mcx_strategy, uncomputation).circuit(t)
+
+def controlled_grover_iteration (circ, control, mcx_strategy=None, uncomputation=None):
+    """Appends the kickback Grover iterate controlled by the qubit control, for quantum counting."""
+    hash_builder("kickback", mcx_strategy, uncomputation).controlled_iteration(circ, control)
+
+
+def compile_circuit (circ, backend):
+    """Transpiles circ for backend, through the layout search if layout_search_seeds is set."""
+    if not layout_search_seeds:
+        return cached_transpile(circ, backend, optimization_level=optimization_level)
+    compiled, candidates = search_layouts(circ, backend, layout_search_seeds, optimization_level)
+    best = candidates[0]
+    print(f"Best of {len(candidates)} layouts: seed {best['seed']}, {best['two_qubit']} two-qubit gates, "
+          f"estimated fidelity {best['estimated_fidelity']:.3e}")
+    return compiled
+
+
+def run_pubs (sampler, backend, pubs, circuits, telemetry, job_run, shots=None, index=None, **metadata):
+    """Runs pubs with shots (num_shots by default) as one job and returns (result, reloaded).
+       With journal_jobs the job goes through the job manager under run id
+       job_run, so resuming an interrupted run with the same id waits for the
+       same job or reloads its saved result; reloaded tells the latter apart.
+       The journal knows the job by the logical circuits the pubs were compiled
+       from, as a recompilation after a calibration update may differ, and by
+       index, which tells apart repeated jobs of the same circuits in one run."""
+    shots = shots or num_shots
+    if not journal_jobs:
+        with telemetry.stage("submit"):
+            job = sampler.run(pubs, shots=shots)
+        return wait_for_job(job, telemetry), False
+    manager = JobManager(RuntimeAdapter(sampler, getattr(backend, "service", None)), telemetry=telemetry)
+    key_fields = {} if index is None else {"index": index}
+    key = batch_key(job_run, backend.name, circuits, shots, optimization_level=optimization_level,
+                    layout_search_seeds=layout_search_seeds, transpile_per_iteration=transpile_per_iteration,
+                    **key_fields)
+    result = manager.run([Batch(key, pubs, shots, **metadata)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result, key in manager.reloaded
+
+
+def adaptive_runners (sampler, backend, telemetry, job_run, store=None):
+    """The (run, run_counting) of the adaptive searches on backend.
+       Circuits are compiled by compile_circuit once per t, and every batch is
+       a job of run_pubs numbered in order, so a resumed run (whose t are
+       drawn from the same run_seed) reloads the batches it already ran.
+       Each batch is timed in telemetry and, unless reloaded, saved in store."""
+    batches = itertools.count()
+
+    def build (t):
+        with telemetry.stage("build", t=t):
+            return Grover_circuit(t)
+
+    def compile_ (circ):
+        with telemetry.stage("transpile", layout_search_seeds=layout_search_seeds):
+            return compile_circuit(circ, backend)
+
+    def sample (t, circ, compiled, shots, **metadata):
+        index = next(batches)
+        first = len(telemetry.records)
+        telemetry.update(t=t, batch=index, **circuit_fields(compiled))
+        result, reloaded = run_pubs(sampler, backend, [compiled], [circ], telemetry, job_run, shots=shots,
+                                    index=index, t=t, mode=search_mode, **metadata)
+        with telemetry.stage("postprocess"):
+            counts = bincount(result[0].data.c)
+        if store is not None and not reloaded:
+            timings = {}
+            for record in telemetry.records[first:]:
+                timings[record["stage"]] = timings.get(record["stage"], 0.0) + record["seconds"]
+            store.save(counts, **run_metadata(backend, t, compiled, timings, mode=search_mode, shots=shots,
+                                              batch=index, job_run=job_run,
+                                              telemetry_run_id=telemetry.context["run_id"], **metadata))
+        return counts_dict(counts)
+
+    def run_counting (shots):
+        with telemetry.stage("build", counting_precision=counting_precision):
+            counting = counting_circuit(controlled_grover_iteration, NUM_QUBITS, input_qubits, counting_precision)
+        return sample(None, counting, compile_(counting), shots, counting_precision=counting_precision)
+
+    return sampler_runner(build, compile_, sample), run_counting
+
+
+def run_schedule (sampler, backend, candidates_t, telemetry, job_run):
+    """Builds and compiles the Grover circuit of every t in candidates_t and runs them as one job.
+       Returns (counts_by_t, metadata_by_t, reloaded): the counts of every t, taken from its own
+       PUB of the job, their results store metadata and whether run_pubs reloaded the job."""
+    # Build and transpile the circuit for every candidate 't' up front.
+    telemetry.update(mode="sweep")
+    circuits, pubs = [], []
+    for t_value in candidates_t:
+        with telemetry.stage("build", t=t_value):
+            circ = Grover_circuit(t_value) # Construct Grover circuit.
+            circuits.append(circ)
+
+        with telemetry.stage("transpile", t=t_value, layout_search_seeds=layout_search_seeds):
+            if transpile_per_iteration:
+                qc_compiled = transpile_repeated(*Grover_pieces(), t_value, backend, optimization_level=optimization_level)
+            else:
+                qc_compiled = compile_circuit(circ, backend)
+        pubs.append(qc_compiled)
+
+    # Submit the whole schedule as a single job: one queue wait on hardware,
+    # and Aer is free to run the PUBs in parallel.
+    print(f"\n--- Running Grover with t in {candidates_t} as one job ---")
+    telemetry.update(t=max(candidates_t), depth=max(c.depth() for c in pubs),
+                     cx=sum(circuit_fields(c)["cx"] for c in pubs))
+    try:
+        result, reloaded = run_pubs(sampler, backend, pubs, circuits, telemetry, job_run,
+                                    t=candidates_t, mode="sweep")
+        print(result)
+    except Exception as e:
+        print(f"Error running job for t={candidates_t}: {e}")
+        result, reloaded = [], False
+    # Timings cover the whole schedule, which ran as one job
+    timings = telemetry.seconds()
+
+    counts_by_t, metadata_by_t = {}, {}
+    with telemetry.stage("postprocess"):
+        for t_value, pub_result, qc_compiled in zip(candidates_t, result, pubs):
+            # Get the counts per outcome from the result of this 't'
+            counts_by_t[t_value] = bincount(pub_result.data.c)
+            metadata_by_t[t_value] = run_metadata(backend, t_value, qc_compiled, timings, mode="sweep",
+                                                  telemetry_run_id=telemetry.context["run_id"])
+    return counts_by_t, metadata_by_t, reloaded
+
+def all_run_results (counts_by_t):
+    """Bitstring counts of every t keyed "t_<t>", as saved to grover_all_run_results.json."""
+    return {f"t_{t_value}": counts_dict(counts, len(input_qubits)) for t_value, counts in counts_by_t.items()}
+
+def run_seed (job_run):
+    """Seed of the random choices of run job_run, the same when it is resumed."""
+    return zlib.crc32(job_run.encode())
+
+
+def run_metadata (backend, t, compiled=None, timings=None, **extra):
+    """Fields recorded in the results store index for a run with t iterations on backend."""
+    oracle = QuantumCircuit(NUM_QUBITS)
+    compute_fx(oracle)
+    return {
+        "backend": backend.name,
+        "t": t,
+        "shots": num_shots,
+        "optimization_level": optimization_level,
+        "construction": default_construction,
+        "mcx_strategy": default_mcx_strategy,
+        "uncomputation": default_uncomputation,
+        "oracle_hash": circuit_hash(oracle),
+        "depth": compiled.depth() if compiled is not None else None,
+        "timings": timings or {},
+        **extra,
+    }
 
 
 # --- Main ---
 
 if __name__ == "__main__":
     # Main execution block
+    if use_local:
+        # The width and depth of the t=6 circuit are representative of every mode
+        force_method = None if aer_method == "auto" else aer_method
+        simulator_options = choose_options(Grover_circuit(6), num_shots, force_method=force_method)
+        print(f"Aer options: {simulator_options}")
+        backend, sampler = make_backend(use_local, **simulator_options)
+    else:
+        backend, sampler = make_backend(use_local)
+    os.makedirs(output_dir, exist_ok=True)
+    telemetry = Telemetry(telemetry_path, backend=backend.name, shots=num_shots,
+                          optimization_level=optimization_level)
+    job_run = resume_run or new_run_id()
+    if journal_jobs:
+        print(f"Journaling jobs as run {job_run}; set resume_run = \"{job_run}\" to resume it")
 
     if known_solutions:
         # --- KNOWN SOLUTIONS MODE ---
         # Assumes the number of solutions 's' is known, allowing for optimal 't' calculation.
         
-        # Initialize quantum circuit: 15 total qubits, 8 classical bits for output.
-        circ = QuantumCircuit(15, len(input_qubits))
-        
-        # Optimal iterations 't' for 4 solutions in 2^8 search space.
-        # t = round( (pi/4) * sqrt(N/s) ) = round( (pi/4) * sqrt(256/4) ) ~ 6.
-        Grover(circ=circ, t=6)
+        telemetry.update(t=KNOWN_SOLUTIONS_T, mode="known")
+        with telemetry.stage("build"):
+            # Optimal iterations 't' for 4 solutions in 2^8 search space.
+            circ = Grover_circuit(KNOWN_SOLUTIONS_T)
         
         # Transpile for selected backend and optimization level.
-        qc_compiled = transpile(circ, backend, optimization_level=optimization_level)
+        with telemetry.stage("transpile", layout_search_seeds=layout_search_seeds):
+            qc_compiled = compile_circuit(circ, backend)
+        telemetry.update(**circuit_fields(qc_compiled))
         
         # Run the job using the sampler
         print("Starting run")
+        reloaded = False
         try:
-            job = sampler.run([qc_compiled], shots=num_shots)
-            result = job.result()
+            result, reloaded = run_pubs(sampler, backend, [qc_compiled], [circ], telemetry, job_run,
+                                        t=KNOWN_SOLUTIONS_T, mode="known")
             print(result)
         except Exception as e:
             print(f"Error running job: {e}")
-        # Get the counts from the result
-        pub_result = result[0]
-        counts = job.result()[0].data.c.get_counts()
-
-        # --- Save Circuit Diagram & Histogram ---
-        circuit_diagram = circ.draw('mpl') # Generate circuit diagram.
-        circuit_diagram.savefig(os.path.join(output_dir, "circuit_diagram.png")) # Save diagram.
-
-        # Filter counts to only include those within the highest 10%
-        threshold = max(counts.values()) * 0.9
-        filtered_counts = {k: v for k, v in counts.items() if v >= threshold}
-
-        # Plot measurement histogram with filtered counts
-        fig = plot_histogram(counts)
-
-        pyplot.savefig(os.path.join(output_dir, "histogram.png"), dpi=300) # Save histogram in higher quality.
-        pyplot.close() # Close plot to free memory.
+        with telemetry.stage("postprocess"):
+            # Get the counts per outcome from the result
+            counts = bincount(result[0].data.c)
+            marked = marked_from_circuit(compute_fx, NUM_QUBITS, input_qubits, F_RESULT_ANC_INDEX)
+        if reloaded:
+            print(f"Counts reloaded from the journal of run {job_run}, not stored again")
+        elif store_results:
+            run_id = ResultsStore().save(counts, **run_metadata(backend, KNOWN_SOLUTIONS_T, qc_compiled, telemetry.seconds(),
+                                                                mode="known", telemetry_run_id=telemetry.context["run_id"]))
+            print(f"Counts stored as run {run_id}")
+        print(f"Most frequent outcomes: {top_k(counts, len(marked)).tolist()}, marked: {marked.tolist()}")
+        print(f"Success probability: {success_probability(counts, marked):.4f}")
+
+        # --- Queue Circuit Diagram & Histograms ---
+        if render_mode != "skip":
+            with telemetry.stage("render", deferred=True):
+                render_queue = RenderQueue()
+                render_queue.circuit(circ, os.path.join(output_dir, "circuit_diagram.png"))
+                render_queue.histogram(counts, os.path.join(output_dir, "histogram.png"))
+                render_queue.highlighted_histogram(counts, marked, os.path.join(output_dir, "highlighted_histogram.png"))
 
         # Save results to a JSON file
         json_filename = os.path.join(output_dir, "grover_known_solutions_results.json")
         try:
             with open(json_filename, 'w') as f_json:
-                json.dump(counts, f_json, indent=4)
+                json.dump(counts_dict(counts, len(input_qubits)), f_json, indent=4)
                 print(f"\nResults saved to JSON file: {json_filename}")
         except IOError as e:
             print(f"Error saving to JSON: {e}")
+    elif search_mode != "sweep":
+        # --- ADAPTIVE SEARCH MODE ---
+        # 's' is unknown; spends shots in small batches and stops as soon as
+        # 'required_solutions' measured bitstrings pass the classical check.
+        telemetry.update(mode=search_mode)
+        run, run_counting = adaptive_runners(sampler, backend, telemetry, job_run,
+                                             ResultsStore() if store_results else None)
+        verify = marked_verifier(hash_oracle())
+        if search_mode == "bbht":
+            log = bbht_search(run, len(input_qubits), verify, required_solutions, shots_per_batch,
+                              rng=run_seed(job_run))
+        elif search_mode == "counting":
+            log = counting_search(run, run_counting, len(input_qubits), verify, counting_precision,
+                                  required_solutions, shots_per_batch=shots_per_batch, rng=run_seed(job_run))
+            print(f"Estimated number of solutions: {log.estimated_solutions:.2f}")
+        else:
+            raise ValueError(f"Unknown search mode: {search_mode}")
+        print(f"Verified solutions: {log.solutions}")
+        print(f"Used {log.shots} shots and {log.oracle_calls} oracle calls in {len(log.batches)} batches")
+
+        json_filename = os.path.join(output_dir, f"grover_{search_mode}_search_results.json")
+        try:
+            with open(json_filename, 'w') as f_json:
+                json.dump(log.to_dict(), f_json, indent=4)
+            print(f"\nResults saved to JSON file: {json_filename}")
+        except IOError as e:
+            print(f"Error saving to JSON: {e}")
     else:
         # --- UNKNOWN SOLUTIONS MODE ---
         # Used when 's' is unknown; iterates through different 't' values.
         
         N = 2**len(input_qubits) # Total items in search space.
-        current_t = 1.0 # Initial number of iterations.
-        # Heuristic maximum for t, roughly pi/4 * sqrt(N) if s=1.
-        max_t = (math.pi/4) * math.sqrt(N) 
-        growth_factor = 1.5 # Factor to increase 't' in each step.
-        candidates_t = [] # List to store 't' values to test.
-
-        # Generate a sequence of 't' values, increasing exponentially.
-        while (int(round(current_t)) < max_t):
-            t_to_add = int(round(current_t)) # Round to nearest integer.
-            current_t *= growth_factor # Increase 't'.
-            if int(round(current_t)) <= t_to_add and t_to_add > 0 : # Ensure 't' progresses if rounding stalls.
-                current_t = t_to_add + 1
-        if not candidates_t and max_t >=1 : candidates_t.append(1) # Ensure at least t=1 is run.
-
-
-        all_run_results = {} # Dictionary to store results for each 't'.
-        for t_value in candidates_t:
-            # Loop through each candidate 't' value.
-            print(f"\n--- Running Grover with t = {t_value} iterations ---")
-
-            # Initialize new circuit for this 't_value'.
-            circ = QuantumCircuit(15, len(input_qubits))
-            Grover(circ=circ, t=t_value) # Construct Grover circuit.
-
-            # Transpile and run.
-            qc_compiled = transpile(circ, backend, optimization_level=optimization_level)
+        candidates_t = candidate_schedule(N) # 't' values to test.
+
+        counts_by_t = {} # Measured (or sampled) counts for each 't'.
+        reloaded = False # Whether the counts came from the journal of a resumed run
+        if use_local and snapshot_sweep:
+            # A simulator can save the probabilities after every iteration,
+            # so one run up to the largest 't' replaces the whole sweep.
+            print(f"\n--- Simulating Grover up to t = {max(candidates_t)} with per-iteration snapshots ---")
+            telemetry.update(t=max(candidates_t), mode="snapshot_sweep")
+            with telemetry.stage("execute", snapshots=True):
+                table = probability_table(max(candidates_t), backend)
+            marked = marked_from_circuit(compute_fx, NUM_QUBITS, input_qubits, F_RESULT_ANC_INDEX)
+            success, best_t = success_by_t(table, marked)
+            for t_value, probability in enumerate(success, start=1):
+                print(f"t={t_value}: success probability {probability:.4f}")
+            print(f"Best t: {best_t}")
+
+            # Sample 'num_shots' shots per 't' so the saved results keep their usual format.
+            rng = np.random.default_rng()
+            for t_value in candidates_t:
+                counts_by_t[t_value] = sample_counts(table[t_value - 1], num_shots, rng)
+            metadata_by_t = {t_value: run_metadata(backend, t_value, mode="snapshot_sweep", sampled=True,
+                                                   success_probability=float(success[t_value - 1]), best_t=best_t)
+                             for t_value in candidates_t}
+
+            # The counts JSON stays keyed by t; the exact success table and the
+            # note that the counts were sampled from it go next to it
+            json_filename = os.path.join(output_dir, "grover_snapshot_success.json")
             try:
-                # Run the job using the sampler
-                job = sampler.run([qc_compiled], shots=num_shots)
-                result = job.result()
-                print(result)
-            except Exception as e:
-                print(f"Error running job for t={t_value}: {e}")
-                continue # Skip to the next t_value if job submission fails
-            
-            # Get the counts from the result
-            pub_result = result[0]
-            counts = pub_result.data.c.get_counts()
-
-            all_run_results[f"t_{t_value}"] = counts # Store counts for this 't'.
-            print(f"Counts for t={t_value}: {counts}")
-
-            # Filter counts to only include those within the highest 10%
-            threshold = max(counts.values()) * 0.9
-            filtered_counts = {k: v for k, v in counts.items() if v >= threshold}
-
-            # Plot and save histogram for current 't' with filtered counts.
-
-            fig = plot_histogram(counts, title=f"Grover Results (Oracle: custom hash) for t={t_value}")
-            pyplot.savefig(os.path.join(output_dir, f"histogram_t_{t_value}.png"), dpi=300)
-            print(f"Histogram saved to histogram_t_{t_value}.png")
-            pyplot.close(fig) # Close figure to free memory.
+                with open(json_filename, 'w') as f_json:
+                    json.dump({"sampled": True, "best_t": best_t,
+                               "success_probability": {f"t_{t_value}": float(probability)
+                                                       for t_value, probability in enumerate(success, start=1)}},
+                              f_json, indent=4)
+                print(f"Success table saved to JSON file: {json_filename}")
+            except IOError as e:
+                print(f"Error saving to JSON: {e}")
+        else:
+            counts_by_t, metadata_by_t, reloaded = run_schedule(sampler, backend, candidates_t, telemetry, job_run)
+
+        if reloaded:
+            print(f"Counts reloaded from the journal of run {job_run}, not stored again")
+        elif store_results:
+            store = ResultsStore()
+            for t_value, counts in counts_by_t.items():
+                run_id = store.save(counts, **metadata_by_t[t_value])
+                print(f"Counts for t={t_value} stored as run {run_id}")
+
+        for t_value, counts in counts_by_t.items():
+            top = top_k(counts, 4)
+            print(f"Most frequent outcomes for t={t_value}: {dict(zip(top.tolist(), counts[top].tolist()))}")
+
+            # Queue the histogram for current 't'.
+            if render_mode != "skip":
+                with telemetry.stage("render", deferred=True, t=t_value):
+                    RenderQueue().histogram(counts, os.path.join(output_dir, f"histogram_t_{t_value}.png"),
+                                            title=f"Grover Results (Oracle: custom hash) for t={t_value}")
         
         # --- Save All Results to JSON ---
         json_filename = os.path.join(output_dir, "grover_all_run_results.json")
         try:
             with open(json_filename, 'w') as f_json:
                 # Dump dictionary to JSON file with pretty printing.
-                json.dump(all_run_results, f_json, indent=4) 
+                json.dump(all_run_results(counts_by_t), f_json, indent=4)
             print(f"\nResults saved to JSON file: {json_filename}")
         except IOError as e:
             print(f"Error saving to JSON: {e}")
+
+    if render_mode == "now":
+        with telemetry.stage("render", deferred=False):
+            failed = render_pending()
+        for job_id, error in failed:
+            print(f"Rendering job {job_id} failed: {error}")
+    elif render_mode == "deferred":
+        print(f"Plots for {output_dir} are queued in {RENDER_DIR}, run `python render.py` to draw them "
+              f"(or set render_mode = \"now\")")
@@ -1,7 +1,36 @@
+import os
+import subprocess
+import sys
+import time
+from qiskit_aer import AerSimulator
 from Grover import *
+from aer_methods import DEFAULT_CALIBRATION, calibrate, calibration_table, choose_options
+from backends import make_sampler
+from benchmarks import QUICK_SWEEP, bench_postprocess, compare
+from oracle_finder import AND, NOT, OR, TARGET_WIRES, batch_hits, evaluate_configs, live_gates, oracle_hits, random_configs
+from oracle_search import new_state, parse_args as search_args, record_chunk, run_search, search_chunk
+from telemetry import summarize
+from layout_search import estimated_fidelity
+from construction_report import line_backend
+from job_manager import StandInAdapter, new_run_id
+from oracle_batch import GO_CONFIGS, OracleBatch, go_oracle
+from sweep_runner import compile_tasks, expand_grid, load_sweep, run_sweep
+from bit_counts import bincount, counts_dict, merged_pub_counts, success_probability, top_k
+from adaptive_search import (bbht_search, counting_circuit, counting_probabilities, counting_search,
+                             ideal_counting_runner, ideal_runner, marked_verifier)
+from grover_builder import GroverBuilder, hash_oracle, marked_states_oracle, optimal_iterations
+from ideal_grover import marked_from_circuit, probabilities, success_probability as ideal_success_probability
+from oracle_compiler import compile_oracle
+from oracle_enumerate import Enumerator
+from reversible_sim import dirty_qubits, truth_table
+from transpile_cache import cache_key, restore_layout
 
 backend = AerSimulator()
+sampler = make_sampler(backend)
 optimization_level = 1
+# Seconds `import Grover` may take in a fresh interpreter, only checked when the
+# GROVER_IMPORT_BUDGET environment variable sets it, as timings depend on the machine
+IMPORT_TIME_BUDGET = float(os.environ.get("GROVER_IMPORT_BUDGET", 0)) or None
 
 
 def testGrover():
@@ -24,6 +53,7 @@ def testGrover():
     counts = result.get_counts(qc_compiled) # Get measurement counts.
 
     # --- Save Circuit Diagram & Histogram ---
+    os.makedirs(output_dir, exist_ok=True)
     circuit_diagram = circ.draw('mpl') # Generate circuit diagram.
     circuit_diagram.savefig(os.path.join(output_dir, "circuit_diagram_1.png")) # Save diagram.
 
@@ -54,35 +84,18 @@ def testOracle():
         return var2
 
     print("Assume \"11111100\", \"11011100\", \"01111100\", \"01011100\" are the only inputs that classical algorithm and compute_fx return 1 for.")
+    # compute_fx only uses X/CX/CCX, so all 256 inputs are simulated classically in one pass
+    circ = QuantumCircuit(15)
+    compute_fx(circ)
+    quantum_table = truth_table(circ, F_RESULT_ANC_INDEX, input_qubits)
+
     for i in range(256):
-        input = [False]*8        
+        input = [False]*8
         for j in range(8):
             input[j] = (i >> j) & 1
 
         classic = classicalalgorithm(input)
-
-        circ = QuantumCircuit(15, 1)
-
-        for j in range(8):
-            if input[j]:
-                circ.x(j)
-        compute_fx(circ)
-        circ.measure(F_RESULT_ANC_INDEX, 0)
-        # Transpile for selected backend and optimization level.
-        qc_compiled = transpile(circ, backend, optimization_level=optimization_level)
-        # Execute the circuit 'num_shots' times.
-        job = backend.run(qc_compiled, shots=1)
-        result = job.result() # Get execution results.
-        counts = result.get_counts(qc_compiled) # Get measurement counts.
-        quantum = -1
-        measured_outcome_str = list(counts.keys())[0]
-        if measured_outcome_str == '1':
-            quantum = 1
-        elif measured_outcome_str == '0':
-            quantum = 0
-        else:
-            print("Something has gone terrible wrong")
-        qc_compiled = transpile(circ, backend, optimization_level=optimization_level)
+        quantum = int(quantum_table[i])
 
         if classic == 1 and quantum == 1:
             input.reverse()
@@ -92,11 +105,606 @@ def testOracle():
                 print(f"Error: Only classic gave 1 for inputs: {input}.")
             if quantum == 1:
                 print(f"Error: Only quantum gave 1 for inputs: {input}.")
+        assert classic == quantum
+
+    # Uncomputation must return every ancilla to |0> and restore the inputs
+    circ = QuantumCircuit(15)
+    compute_fx(circ)
+    uncompute_fx(circ)
+    assert dirty_qubits(circ, input_qubits, [8, 9, 10, 11, F_RESULT_ANC_INDEX]) == []
+
+    circ = QuantumCircuit(15)
+    compute_OR_fx(circ)
+    assert truth_table(circ, OR_RESULT_ANC_INDEX, input_qubits).tolist() == [0] + [1] * 255
+    uncompute_OR_fx(circ)
+    assert dirty_qubits(circ, input_qubits, [OR_RESULT_ANC_INDEX]) == []
+
+
+def testBitslicedOracle():
+    # The bit-sliced engine must give the same hits as the per-input oracle
+    rng = np.random.default_rng(0)
+    confs_batch = random_configs(rng, 200, 16)
+    expected = [oracle_hits(confs.tolist()) for confs in confs_batch]
+    assert batch_hits(confs_batch).tolist() == expected
+    print("Bit-sliced oracle matches the reference on 200 random configs.")
+
+def testOracleEnumeration():
+    # Every (hits, length) pair of a config without no-op gates or dead writes must be found,
+    # as by a brute-force walk over all gates from every distinct wire state
+    import itertools
+    for size, depth, target_wires in ((4, 3, (0, 1, 2)), (4, 2, (0,)), (3, 4, (0, 1))):
+        gates = list(itertools.product(range(4), range(size), range(size), range(size)))
+        full = pow(2, pow(2, size)) - 1
+        start = tuple(sum(1 << i for i in range(pow(2, size)) if i >> (size - 1 - w) & 1) for w in range(size))
+        brute, seen = set(), set()
+        def walk(wires, unread, length):
+            if (wires, unread, length) in seen:
+                return
+            seen.add((wires, unread, length))
+            if length and unread <= set(target_wires):
+                zero = full
+                for w in target_wires:
+                    zero &= ~wires[w]
+                brute.add((zero.bit_count(), length))
+            if length == depth:
+                return
+            for operation_type, param_1, param_2, param_3 in gates:
+                reads = {param_1} if operation_type == NOT else {param_1, param_2}
+                if param_3 in unread and param_3 not in reads:
+                    continue
+                value = (wires[param_1] ^ full if operation_type == NOT else wires[param_1] & wires[param_2]
+                         if operation_type == AND else wires[param_1] | wires[param_2] if operation_type == OR
+                         else wires[param_1] ^ wires[param_2])
+                if value != wires[param_3]:
+                    walk(wires[:param_3] + (value,) + wires[param_3 + 1:], (unread - reads) | {param_3}, length + 1)
+        walk(start, frozenset(), 0)
+        enumerated = set()
+        for confs, h in Enumerator(size, depth, target_wires=target_wires, accept=lambda hits: True).run():
+            assert int(batch_hits([confs], size, target_wires)[0]) == h
+            enumerated.add((h, len(confs)))
+        assert enumerated == brute, (size, depth, target_wires)
+    print("Enumeration reaches every (hits, length) pair found by brute force.")
+
+def testOracleSearch():
+    # A fixed seed and worker count give the same top-k, also when resumed from a checkpoint,
+    # and a found target stops the other workers before their chunks are done
+    import tempfile
+    options = ["--workers", "2", "--size", "10", "--num-iter", "4", "--batch-size", "256",
+               "--batches-per-chunk", "2", "--report-interval", "1e9"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint = os.path.join(tmp_dir, "search.json")
+        full = run_search(search_args(options + ["--max-configs", "4096", "--checkpoint", ""]))
+        again = run_search(search_args(options + ["--max-configs", "4096", "--checkpoint", ""]))
+        assert full["found"] is None and full["next_chunk"] == [4, 4]
+        assert again["top"] == full["top"]
+        run_search(search_args(options + ["--max-configs", "2048", "--checkpoint", checkpoint]))
+        resumed = run_search(search_args(options + ["--max-configs", "4096", "--checkpoint", checkpoint]))
+        assert resumed["next_chunk"] == full["next_chunk"] and resumed["evaluated"] == full["evaluated"]
+        assert [list(entry) for entry in resumed["top"]] == [list(entry) for entry in full["top"]]
+    # A chunk's top-k is the true top-k by (hits, live gates) over every config it drew
+    rng = np.random.default_rng([0, 0, 0])
+    drawn = [confs.tolist() for _ in range(2) for confs in random_configs(rng, 256, 4, 10)]
+    ranked = sorted((int(batch_hits([confs], 10)[0]), len(live_gates(confs, TARGET_WIRES)), confs) for confs in drawn)
+    ranked = [entry for entry in ranked if entry[0] > 1]
+    assert [list(entry) for entry in search_chunk(0, 0, 0, 2, 256, 4, 10, 10)[2]] == [list(entry) for entry in ranked[:10]]
+    found = run_search(search_args(["--workers", "2", "--batch-size", "256", "--batches-per-chunk", "1000",
+                                    "--checkpoint", "", "--report-interval", "1e9"]))
+    assert found["found"] is not None and sum(found["evaluated"]) < 2 * 1000 * 256
+    # A chunk cut short by the stop flag is neither counted nor skipped on resume
+    state = new_state(search_args(options))
+    record_chunk(state, (1, 0, [(20, 3, [[0]])], 256, 0.5), 512, 10)
+    assert state["next_chunk"] == [0, 0] and state["evaluated"] == [0, 0]
+    record_chunk(state, (1, 0, [(20, 3, [[0]])], 512, 1.0), 512, 10)
+    assert state["next_chunk"] == [0, 1] and state["evaluated"] == [0, 512]
+    print(f"Oracle search is reproducible across resumes and stopped after {sum(found['evaluated'])} configs.")
+
+def testCompiledOracle():
+    # A compiled config must mark exactly the inputs oracle_finder marks and clean up after itself.
+    # oracle_finder's wire 0 is the most significant input bit, so wire w goes on qubit 7 - w
+    rng = np.random.default_rng(1)
+    wire_qubits = input_qubits[::-1]
+    for confs in random_configs(rng, 50, 16):
+        wires = evaluate_configs(confs)[0]
+        marked = np.bitwise_and.reduce([~wires[w] for w in TARGET_WIRES])
+        expected = np.unpackbits(marked.view(np.uint8), bitorder='little')[:256]
+        program = compile_oracle(confs.tolist())
+        ancillas = list(range(8, 8 + program.num_ancillas))
+        result_qubit = 8 + program.num_ancillas
+        circ = QuantumCircuit(result_qubit + 1)
+        program.compute(circ, wire_qubits, ancillas, result_qubit)
+        assert (truth_table(circ, result_qubit, input_qubits) == expected).all()
+        assert expected.sum() == oracle_hits(confs.tolist())
+        program.uncompute(circ, wire_qubits, ancillas, result_qubit)
+        assert dirty_qubits(circ, input_qubits, ancillas + [result_qubit]) == []
+    print("Compiled oracles mark the same inputs as oracle_finder on 50 random configs.")
+
+def testUnknownSolutionsSweep():
+    # The whole schedule goes out as one job and its counts come back split per t
+    class CountingSampler:
+        def __init__(self, sampler):
+            self.sampler = sampler
+            self.jobs = 0
+
+        def run(self, pubs, shots=None):
+            self.jobs += 1
+            return self.sampler.run(pubs, shots=shots)
+
+        def backend(self):
+            return self.sampler.backend()
+
+    counting = CountingSampler(sampler)
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    candidates_t = [1, 2, 3]
+    counts_by_t, metadata_by_t, reloaded = run_schedule(counting, backend, candidates_t, Telemetry(None), new_run_id())
+    assert counting.jobs == 1 and not reloaded
+    assert list(counts_by_t) == list(metadata_by_t) == candidates_t
+    for t in candidates_t:
+        assert counts_by_t[t].sum() == num_shots and metadata_by_t[t]["t"] == t
+        ideal = ideal_success_probability(marked, len(input_qubits), t)
+        assert abs(success_probability(counts_by_t[t], marked) - ideal) < 0.06, t
+    saved = all_run_results(counts_by_t)
+    assert list(saved) == [f"t_{t}" for t in candidates_t]
+    assert all(sum(saved[f"t_{t}"].values()) == num_shots for t in candidates_t)
+    print(f"Sweep over t={candidates_t} ran as one job.")
+
+def testIdealEngine():
+    # The ancilla-free NumPy engine must reproduce the 15-qubit Aer statevector
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    simulator = AerSimulator(method='statevector')
+    for t in (1, 6):
+        circ = QuantumCircuit(15, len(input_qubits))
+        prepare_superposition(circ)
+        for j in range(t):
+            grover_iteration(circ)
+        circ.save_probabilities(input_qubits)
+        aer_probabilities = simulator.run(transpile(circ, simulator)).result().data()['probabilities']
+        assert np.allclose(aer_probabilities, probabilities(marked, len(input_qubits), t))
+    print("NumPy engine matches the Aer statevector for t=1 and t=6.")
+
+def testProbabilityTable():
+    # One snapshot run gives a (t_max, 2^n) table whose rows match separate Grover(circ, t) runs and the
+    # ideal engine, and whose best t is the optimal one
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    simulator = AerSimulator(method='statevector')
+    table = probability_table(8, simulator)
+    assert table.shape == (8, pow(2, len(input_qubits)))
+    success, best_t = success_by_t(table, marked)
+    for t in (1, 3, 6):
+        circ = QuantumCircuit(15, len(input_qubits))
+        Grover(circ, t)
+        circ.remove_final_measurements()
+        circ.save_probabilities(input_qubits)
+        separate = simulator.run(transpile(circ, simulator)).result().data()['probabilities']
+        assert np.allclose(table[t - 1], separate)
+        assert np.allclose(table[t - 1], probabilities(marked, len(input_qubits), t))
+        assert np.isclose(success[t - 1], separate[marked].sum())
+    assert best_t == optimal_iterations(len(marked), len(input_qubits)) == 6
+    print(f"Snapshot table matches separate runs, best t={best_t}.")
+
+def testMcxStrategies():
+    # Every construction and MCX decomposition must give the ideal probabilities
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    simulator = AerSimulator(method='statevector')
+    for construction in ("kickback", "phase"):
+        for mcx_strategy in MCX_STRATEGIES:
+            table = probability_table(2, simulator, construction, mcx_strategy)
+            for t in (1, 2):
+                assert np.allclose(table[t - 1], probabilities(marked, len(input_qubits), t))
+    print("All MCX strategies match the ideal probabilities.")
+
+def testGroverBuilder():
+    # The builder's layout of the hash oracle must behave like the fixed 15-qubit circuit
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    simulator = AerSimulator(method='statevector')
+    for mcx_strategy in MCX_STRATEGIES:
+        builder = GroverBuilder(len(input_qubits), hash_oracle(), mcx_strategy=mcx_strategy)
+        circ, metadata = builder.build(measure=False)
+        assert builder.marked() == list(marked)
+        assert metadata["optimal_t"] == 6 and metadata["num_qubits"] < 15
+        circ.save_probabilities(builder.input_qubits)
+        builder_probabilities = simulator.run(transpile(circ, simulator)).result().data()['probabilities']
+        assert np.allclose(builder_probabilities, probabilities(marked, len(input_qubits), 6))
+    print("GroverBuilder matches the fixed layout with fewer qubits.")
+
+def testAdaptiveSearch():
+    # The classical check must agree with compute_fx and follow a changed oracle, and BBHT must find every solution
+    # with far fewer shots than the fixed schedule
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    bitstrings = [format(i, "08b") for i in range(256)]
+    verify = marked_verifier(hash_oracle())
+    assert [b for b in bitstrings if verify(b)] == [format(i, "08b") for i in marked]
+    other = marked_states_oracle(8, [3, 200])
+    assert [b for b in bitstrings if marked_verifier(other)(b)] == [format(3, "08b"), format(200, "08b")]
+    log = bbht_search(ideal_runner(marked, 8, rng=0), 8, verify, required=len(marked), rng=0)
+    assert sorted(log.solutions) == [format(i, "08b") for i in marked]
+    assert log.shots < len(candidate_schedule(256)) * num_shots
+    print(f"BBHT verified all solutions with {log.shots} shots and {log.oracle_calls} oracle calls.")
+
+def testAdaptiveRunners():
+    # Every adaptive batch is compiled once per t, timed, stored and journaled, so a
+    # resumed run draws the same t and reloads each batch instead of resubmitting it
+    import tempfile
+    import Grover as grover
+    verify = marked_verifier(hash_oracle())
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as run_dir:
+        os.chdir(run_dir)
+        grover.journal_jobs = True
+        try:
+            job_run = new_run_id()
+            logs, stores = [], []
+            for _ in range(2):
+                telemetry = Telemetry(None)
+                store = ResultsStore(os.path.join(run_dir, f"store_{len(stores)}"))
+                run, _ = adaptive_runners(sampler, backend, telemetry, job_run, store)
+                logs.append(bbht_search(run, 8, verify, required=2, rng=run_seed(job_run)))
+                stores.append(store)
+            first, resumed = logs
+            assert len(first.solutions) >= 2 and all(verify(b) for b in first.solutions)
+            assert [batch["shots"] for batch in first.batches] == [record["shots"] for record in stores[0].runs()]
+            assert first.to_dict() == resumed.to_dict() and stores[1].runs() == []
+            assert {"build", "transpile", "postprocess"} <= {record["stage"] for record in telemetry.records}
+        finally:
+            grover.journal_jobs = False
+            os.chdir(cwd)
+    print(f"Adaptive batches journaled and reloaded: {len(first.batches)} batches.")
+
+def testCountingSearch():
+    # The ideal counting distribution must match Aer, and a coarse estimate still finds every solution
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    circ = counting_circuit(controlled_grover_iteration, 15, input_qubits, 3)
+    circ.remove_final_measurements()
+    circ.save_probabilities([15, 16, 17])
+    aer_probabilities = backend.run(transpile(circ, backend), shots=1).result().data()['probabilities']
+    assert np.allclose(aer_probabilities, counting_probabilities(len(marked), 8, 3))
+    estimates = {}
+    for precision in (5, 7):
+        log = counting_search(ideal_runner(marked, 8, rng=0), ideal_counting_runner(len(marked), 8, precision, rng=0),
+                              8, marked_verifier(hash_oracle()), precision, required=len(marked), rng=0)
+        assert sorted(log.solutions) == [format(i, "08b") for i in marked]
+        assert log.oracle_calls >= (pow(2, precision) - 1) * 32
+        estimates[precision] = round(log.estimated_solutions, 2)
+    assert estimates[5] < 3 and round(estimates[7]) == len(marked)
+    print(f"Counting estimates per precision for {len(marked)} solutions: {estimates}")
+
+def testBitCounts():
+    # Counts taken from the packed BitArray must match get_counts()
+    circ = QuantumCircuit(15, len(input_qubits))
+    Grover(circ=circ, t=6)
+    result = sampler.run([transpile(circ, backend)] * 2, shots=num_shots).result()
+    counts = bincount(result[0].data.c)
+    assert counts_dict(counts, len(input_qubits)) == result[0].data.c.get_counts()
+    assert merged_pub_counts(result).sum() == 2 * num_shots
+    marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+    assert sorted(top_k(counts, len(marked)).tolist()) == marked.tolist()
+    # Ties at the k-th count go to the lowest outcome, whatever the run
+    assert top_k(np.array([3, 5, 1, 5, 5]), 2).tolist() == [1, 3]
+    assert success_probability(counts, marked) > 0.95
+    print("Bit-array counts match get_counts().")
+
+def testResultsStore():
+    # Runs are never overwritten and come back as the stored arrays
+    import tempfile
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ResultsStore(store_dir)
+        counts = sample_counts(probabilities([92, 124, 220, 252], 8, 6), num_shots, 0)
+        first = store.save(counts, backend="test", t=6)
+        second = store.save(counts, backend="test", t=6)
+        store.save(counts, backend="test", t=1)
+        assert first != second
+        assert [record["run_id"] for record in store.runs(t=6)] == [first, second]
+        assert np.array_equal(store.load_many(store.runs(t=6)), np.stack([counts, counts]))
+        # A sweep file keeps the t of each of its keys, even when the caller passes one
+        sweep_path = os.path.join(store_dir, "sweep.json")
+        with open(sweep_path, 'w') as f_json:
+            json.dump({"t_2": counts_dict(counts, 8), "t_3": counts_dict(counts, 8)}, f_json)
+        imported = store.import_json(sweep_path, backend="sweep", t=6)
+        assert [record["t"] for record in store.runs(backend="sweep")] == [2, 3] and len(imported) == 2
+    print("Results store keeps every run.")
+
+def testRender():
+    # Queued plots are drawn once each, a repeated circuit is copied from the diagram cache
+    import tempfile
+    from render import RenderQueue, pending_jobs, render_pending
+    counts = sample_counts(probabilities([92, 124, 220, 252], 8, 6), num_shots, 0)
+    with tempfile.TemporaryDirectory() as root:
+        queue = RenderQueue(root)
+        outputs = [os.path.join(root, "out", name) for name in ("circuit.png", "circuit_again.png", "histogram.png",
+                                                                 "highlighted.png")]
+        queue.circuit(Grover_circuit(1), outputs[0])
+        queue.circuit(Grover_circuit(1), outputs[1])
+        queue.histogram(counts, outputs[2], title="t=6")
+        queue.highlighted_histogram(counts, [92, 124, 220, 252], outputs[3])
+        assert len(pending_jobs(root)) == 4
+        assert render_pending(root, workers=2) == []
+        assert all(os.path.getsize(path) > 0 for path in outputs)
+        assert len(os.listdir(os.path.join(root, "diagrams"))) == 1
+        assert pending_jobs(root) == [] and render_pending(root) == []
+    print("Render queue drew every pending plot once.")
+
+def testTranspileCache():
+    # A cached compilation comes back from disk, a recalibrated backend misses, and the
+    # iterate compiled once and stitched back to its layout gives the t=6 distribution
+    import tempfile
+    from qiskit.providers.fake_provider import GenericBackendV2
+    from qiskit.transpiler import CouplingMap
+    device = line_backend()
+    recalibrated = GenericBackendV2(15, coupling_map=CouplingMap.from_line(15), seed=1)
+    assert cache_key(Grover_circuit(1), device, 1, {}) != cache_key(Grover_circuit(1), recalibrated, 1, {})
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compiled = cached_transpile(Grover_circuit(1), device, cache_dir=cache_dir, seed_transpiler=0)
+        assert len(os.listdir(cache_dir)) == 1
+        again = cached_transpile(Grover_circuit(1), device, cache_dir=cache_dir, seed_transpiler=0)
+        assert circuit_hash(again) == circuit_hash(compiled)
+        # Writers of the same key at once each replace the entry with a whole file of their own
+        from concurrent.futures import ThreadPoolExecutor
+        concurrent_dir = os.path.join(cache_dir, "concurrent")
+        with ThreadPoolExecutor(4) as pool:
+            written = list(pool.map(lambda _: cached_transpile(Grover_circuit(1), device, cache_dir=concurrent_dir,
+                                                               seed_transpiler=0), range(4)))
+        assert [name.endswith(".qpy") for name in os.listdir(concurrent_dir)] == [True]
+        assert circuit_hash(cached_transpile(Grover_circuit(1), device, cache_dir=concurrent_dir, seed_transpiler=0)) \
+            == circuit_hash(written[0])
+
+        prepare, iterate, measure = Grover_pieces()
+        # On a line routing always permutes the iterate, so the stitched path needs the restoring swaps
+        assert restore_layout(cached_transpile(iterate, device, cache_dir=cache_dir), device, cache_dir=cache_dir) is not None
+        stitched = transpile_repeated(prepare, iterate, measure, 6, device, cache_dir=cache_dir)
+        counts = bincount(sampler.run([stitched], shots=num_shots).result()[0].data.c)
+        marked = marked_from_circuit(compute_fx, 15, input_qubits, F_RESULT_ANC_INDEX)
+        assert sorted(top_k(counts, len(marked)).tolist()) == marked.tolist()
+        assert success_probability(counts, marked) > 0.95
+    print("Transpile cache reuses compilations, stitched t=6 circuit finds the marked states.")
+
+def testImportTime():
+    # Building circuits must not load the simulators, IBM runtime or plotting
+    code = ("import sys, time; start = time.perf_counter(); import Grover; "
+            "print(time.perf_counter() - start); "
+            "print(','.join(m for m in ('qiskit_aer', 'qiskit_ibm_runtime', 'matplotlib', 'dotenv') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+    seconds, loaded = float(output[0]), output[1] if len(output) > 1 else ""
+    assert loaded == "", f"import Grover loaded {loaded}"
+    if IMPORT_TIME_BUDGET is not None:
+        assert seconds < IMPORT_TIME_BUDGET, f"import Grover took {seconds:.2f} s"
+    print(f"import Grover took {seconds:.2f} s without loading backends or plotting.")
+
+def testAerMethods():
+    # The default table keeps the 15-qubit circuit on the statevector method,
+    # a forced method wins, and only mid-circuit resets parallelize shots
+    circ = Grover_circuit(6)
+    options = choose_options(circ, num_shots, DEFAULT_CALIBRATION)
+    assert options["method"] == "statevector" and options["max_parallel_shots"] == 1
+    forced = choose_options(circ, num_shots, DEFAULT_CALIBRATION, force_method="matrix_product_state")
+    assert forced["method"] == "matrix_product_state"
+    circ_with_reset = Grover_circuit(1)
+    circ_with_reset.reset(F_RESULT_ANC_INDEX)
+    assert choose_options(circ_with_reset, num_shots, DEFAULT_CALIBRATION)["max_parallel_shots"] == 0
+
+    # Calibrated rows bound depth and shots; every grid point gets the options that won there
+    mps, sv = {"method": "matrix_product_state"}, {"method": "statevector"}
+    table = calibration_table({(6, 10, 100): sv, (6, 10, 1000): mps, (6, 50, 100): sv, (6, 50, 1000): sv,
+                               (8, 20, 100): mps, (8, 20, 1000): mps})
+    assert table == [{"max_qubits": 6, "max_depth": 10, "max_shots": 100, "options": sv},
+                     {"max_qubits": 6, "max_depth": 10, "max_shots": None, "options": mps},
+                     {"max_qubits": 6, "max_depth": None, "max_shots": None, "options": sv},
+                     {"max_qubits": None, "max_depth": None, "max_shots": None, "options": mps}]
+    builder = GroverBuilder(4, marked_states_oracle(4, [0]))
+    circuits = [builder.build(t)[0] for t in (1, 3)]
+    table, timings = calibrate(circuits, shots=(16, 256), path=None, repeats=1)
+    assert len(timings) == 2 * 2 * 5
+    for circ in circuits:
+        for shots in (16, 256):
+            point = [timing for timing in timings if timing["depth"] == circ.depth() and timing["shots"] == shots]
+            winner = min(point, key=lambda timing: timing["seconds"])["options"]
+            chosen = choose_options(circ, shots, table)
+            assert {key: chosen.get(key) for key in winner} == winner
+    print(f"Aer options for t=6: {options}")
+
+def testBenchmarks():
+    # Any growth in circuit size is a regression, small timing noise is not
+    baseline = [{"stage": "transpile", "t": 6, "optimization_level": 1, "seconds": 0.2, "depth": 100, "cx": 50}]
+    assert compare(baseline, [dict(baseline[0], seconds=0.21)]) == []
+    assert len(compare(baseline, [dict(baseline[0], cx=51)])) == 1
+    assert len(compare(baseline, [dict(baseline[0], seconds=1.0)])) == 1
+    records = bench_postprocess(dict(QUICK_SWEEP, shots=[1000]), memory=False)
+    assert {record["variant"] for record in records} == {"bit_counts", "get_counts"}
+    print("Benchmark comparison flags size and time regressions.")
+
+def testTelemetry():
+    # A job's wait is split into queue_wait, execute and fetch records carrying the job id
+    telemetry = Telemetry(None, backend=backend.name, t=1, shots=num_shots)
+    with telemetry.stage("transpile"):
+        qc_compiled = transpile(Grover_circuit(1), backend)
+    telemetry.update(**circuit_fields(qc_compiled))
+    with telemetry.stage("submit"):
+        job = sampler.run([qc_compiled], shots=num_shots)
+    result = wait_for_job(job, telemetry)
+    assert sum(bincount(result[0].data.c)) == num_shots
+    assert [record["stage"] for record in telemetry.records] == ["transpile", "submit", "queue_wait", "execute", "fetch"]
+    assert all(record["job_id"] == job.job_id() for record in telemetry.records[2:])
+    rows = summarize(telemetry.records)
+    assert abs(sum(row["share"] for row in rows) - 1) < 1e-9
+
+    # A job finishing between two polls is split by the device's timestamps, or marked unknown
+    class QueuedThenDone:
+        def __init__(self, metrics):
+            self.statuses = ["QUEUED", "QUEUED", "DONE"]
+            self._metrics = metrics
+        def job_id(self):
+            return "queued-then-done"
+        def status(self):
+            return self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        def metrics(self):
+            return self._metrics
+        def result(self):
+            return None
+    timestamps = {"created": "2026-01-01T00:00:00Z", "running": "2026-01-01T00:00:09Z",
+                  "finished": "2026-01-01T00:00:09.01Z"}
+    for metrics, split in (({}, "unknown"), ({"timestamps": timestamps}, "metrics")):
+        stub_telemetry = Telemetry(None)
+        wait_for_job(QueuedThenDone(metrics), stub_telemetry)
+        queue_wait, execute = stub_telemetry.records[:2]
+        assert queue_wait["split"] == execute["split"] == split
+        assert queue_wait["seconds"] > 0 and execute["seconds"] >= 0
+    print(f"Telemetry of one run: {telemetry.seconds()}")
+
+def testLayoutSearch():
+    # The chosen candidate has the best estimated fidelity, which falls with every added gate
+    from qiskit_ibm_runtime.fake_provider import FakeSherbrooke
+    device = FakeSherbrooke()
+    compiled, candidates = search_layouts(Grover_circuit(1), device, seeds=2, reuse=False, log_path=None)
+    assert len(candidates) == 2
+    assert candidates[0]["log_fidelity"] >= candidates[1]["log_fidelity"]
+    assert estimated_fidelity(compiled, device.target)[1] == candidates[0]["log_fidelity"]
+    longer = compiled.copy()
+    longer.append(next(i for i in compiled.data if i.operation.num_qubits == 2))
+    assert estimated_fidelity(longer, device.target)[1] < candidates[0]["log_fidelity"]
+    print(f"Best layout: {candidates[0]['two_qubit']} two-qubit gates, fidelity {candidates[0]['estimated_fidelity']:.3e}")
+
+def testUncomputation():
+    # Measuring the ancillas with phase fixups gives the reversible probabilities
+    # with fewer unconditional two-qubit gates
+    expected = np.array([probabilities([92, 124, 220, 252], 8, t) for t in (1, 2)])
+    device = line_backend(control_flow=True)
+    cx = {}
+    for uncomputation in UNCOMPUTATIONS:
+        for construction in ("kickback", "phase"):
+            table = probability_table(2, backend, construction, uncomputation=uncomputation)
+            assert np.allclose(table, expected), (uncomputation, construction)
+        compiled = transpile(Grover_circuit(1, uncomputation=uncomputation), device, seed_transpiler=0)
+        cx[uncomputation] = compiled.count_ops().get("cx", 0)
+    assert cx["measure"] < cx["reversible"] and cx["reset"] < cx["reversible"]
+    # Quantum counting must see the same eigenphases, also where relative-phase
+    # Toffolis would be computed without their mirror image
+    counting = {}
+    for mcx_strategy in ("noancilla", "relative-phase"):
+        for uncomputation in UNCOMPUTATIONS:
+            circ = counting_circuit(lambda c, control: controlled_grover_iteration(c, control, mcx_strategy, uncomputation),
+                                    15, input_qubits, 2)
+            circ.remove_final_measurements()
+            circ.save_probabilities([15, 16])
+            counting[mcx_strategy, uncomputation] = backend.run(transpile(circ, backend), shots=1).result().data()['probabilities']
+    for distribution in counting.values():
+        assert np.allclose(distribution, counting["noancilla", "reversible"])
+    print(f"Unconditional CX count per uncomputation at t=1: {cx}")
+
+def testJobManager():
+    # Queued jobs run concurrently, a resumed run reloads the journaled results instead of
+    # resubmitting, and a new run samples again
+    import tempfile
+    # Batches are keyed on the run and the logical circuits, whatever they compile to
+    circuits = {t: Grover_circuit(t) for t in (1, 2, 3)}
+    job_run = new_run_id()
+    batches = [Batch(batch_key(job_run, backend.name, [circ], 100, optimization_level=1), [transpile(circ, backend)],
+                     100, t=t) for t, circ in circuits.items()]
+    with tempfile.TemporaryDirectory() as job_dir:
+        journal_path = os.path.join(job_dir, "journal.jsonl")
+        telemetry = Telemetry(None)
+        manager = JobManager(StandInAdapter(backend, queue_delay=(0.2, 0.4), seed=0), journal_path,
+                             os.path.join(job_dir, "results"), telemetry=telemetry)
+        start = time.perf_counter()
+        results = manager.run(batches)
+        assert time.perf_counter() - start < 2 * 0.4 + 1
+        assert all(sum(result[0].data.c.get_counts().values()) == 100 for result in results)
+        events = [entry["event"] for entry in manager.journal().values()]
+        assert events == ["done"] * len(batches)
+        # Every job is timed like wait_for_job, and its queue delay shows up as queue_wait
+        for entry in manager.journal().values():
+            stages = {record["stage"]: record for record in telemetry.records if record["job_id"] == entry["job_id"]}
+            assert sorted(stages) == ["execute", "fetch", "queue_wait", "submit"]
+            assert stages["queue_wait"]["seconds"] > 0.1
+
+        assert manager.reloaded == set()
+
+        recompiled = [Batch(batch_key(job_run, backend.name, [circ], 100, optimization_level=1),
+                            [transpile(circ, backend, optimization_level=0)], 100, t=t) for t, circ in circuits.items()]
+        resumed = JobManager(StandInAdapter(backend, queue_delay=(10, 10)), journal_path, os.path.join(job_dir, "results"))
+        reloaded = resumed.run(recompiled)
+        for result, again in zip(results, reloaded):
+            assert result[0].data.c.get_counts() == again[0].data.c.get_counts()
+        assert resumed.reloaded == {batch.key for batch in recompiled}
+
+        new_run = new_run_id()
+        fresh = [Batch(batch_key(new_run, backend.name, [circ], 100, optimization_level=1), [transpile(circ, backend)],
+                       100, t=t) for t, circ in circuits.items()]
+        again = JobManager(StandInAdapter(backend), journal_path, os.path.join(job_dir, "results"))
+        again.run(fresh)
+        assert again.reloaded == set() and len(again.journal()) == 2 * len(batches)
+    print("Job manager reloads journaled results of a resumed run and samples a new one again.")
+
+def testSweepRunner():
+    # Points differing only in shots share one build and transpile, and every point gets its counts
+    import tempfile
+    grid = {"known_solutions": True, "shots": [64, 128], "optimization_level": [0, 1]}
+    points = expand_grid(grid)
+    assert len(points) == 4 and all(point["t"] == 6 for point in points)
+    assert sorted(len(indices) for indices in compile_tasks(points).values()) == [2, 2]
+    assert [point["t"] for point in expand_grid({"known_solutions": False})] == candidate_schedule(256)
+    try:
+        expand_grid({"known_solutions": True, "t": [1]})
+        assert False, "t and known_solutions were both accepted"
+    except ValueError:
+        pass
+    with tempfile.TemporaryDirectory() as sweep_dir:
+        points, counts = load_sweep(run_sweep({"name": "test", "grid": grid, "workers": 1, "seed": 0}, sweep_dir))
+        assert counts.sum(axis=1).tolist() == [point["shots"] for point in points]
+        assert all(point["success"] > 0.9 for point in points)
+    print("Sweep runner shares compilations across points.")
+
+def testOracleBatch():
+    # One job screens the Go configs, each at its optimal t, close to the ideal success
+    batch = OracleBatch([go_oracle(confs) for confs in GO_CONFIGS])
+    rows = batch.screen(sampler, backend, shots=num_shots)
+    assert [row["hits"] for row in rows] == [8, 4, 4, 4, 4]
+    for row in rows:
+        assert abs(row["success"] - row["ideal_success"]) < 0.05, row
+    # On a line every oracle piece is routed with a permutation; the circuits must
+    # still be stitched from the pieces, never transpiled whole
+    import tempfile
+    from qiskit import qpy
+    device = line_backend(batch.num_qubits)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compiled = batch.compile(device, cache_dir=cache_dir)
+        largest = 0
+        for name in os.listdir(cache_dir):
+            with open(os.path.join(cache_dir, name), 'rb') as f_qpy:
+                largest = max(largest, len(qpy.load(f_qpy)[0].data))
+    assert largest < min(len(circ.data) for circ in compiled)
+    line_rows = batch.screen(sampler, device, shots=num_shots)
+    for row in line_rows:
+        assert abs(row["success"] - row["ideal_success"]) < 0.05, row
+    print(f"Screened {len(rows)} oracles: {[round(row['success'], 3) for row in rows]}")
 
 
 if __name__ == "__main__":
     testGrover()
     testOracle()
+    testBitslicedOracle()
+    testOracleEnumeration()
+    testOracleSearch()
+    testCompiledOracle()
+    testUnknownSolutionsSweep()
+    testIdealEngine()
+    testProbabilityTable()
+    testMcxStrategies()
+    testGroverBuilder()
+    testAdaptiveSearch()
+    testAdaptiveRunners()
+    testCountingSearch()
+    testBitCounts()
+    testResultsStore()
+    testRender()
+    testTranspileCache()
+    testImportTime()
+    testAerMethods()
+    testBenchmarks()
+    testTelemetry()
+    testLayoutSearch()
+    testUncomputation()
+    testJobManager()
+    testSweepRunner()
+    testOracleBatch()
 
     
 
@@ -2,7 +2,6 @@ import math
 from qiskit import QuantumCircuit
 from qiskit.quantum_info import Statevector
 from qiskit.visualization import plot_bloch_multivector
-from qiskit_aer import AerSimulator
 from matplotlib import pyplot
  
 qc = QuantumCircuit(2)
@@ -18,15 +17,7 @@ qc.p(math.pi/2, 1) # Apply a phase gate (P-gate) with an angle of pi/2 (1.57 rad
 
 
 qc.remove_final_measurements()  # no measurements allowed
-statevector = Statevector(qc)
-
-# Backend for statevector simulation
-sv_simulator = AerSimulator(method='statevector') # Specify statevector method for clarity
-
-job_sv = sv_simulator.run(qc)
-
-# Execute and get statevector
-result_sv = job_sv.result()
+statevector = Statevector(qc) # Exact statevector, no simulator run needed for 2 qubits
 
 
 # Interpret and print the statevector
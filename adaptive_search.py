@@ -0,0 +1,258 @@
+"""Adaptive Grover search for an unknown number of solutions.
+
+The fixed t-schedule of Grover.py spends num_shots at every t, even after a
+solution has shown up. The searches here spend shots in small batches and
+check every measured bitstring classically, stopping as soon as enough
+distinct solutions are verified:
+
+  * bbht_search() follows Boyer, Brassard, Hoyer and Tapp: t is drawn
+    uniformly from [0, m) and m grows by a factor 6/5 after every batch
+    without a new solution, up to sqrt(N). The expected number of oracle
+    calls stays O(sqrt(N/s)) without knowing s.
+  * counting_search() first estimates s with quantum counting (phase
+    estimation of the Grover iterate), then samples at the t that is
+    optimal for the estimate, and falls back to bbht_search() if that
+    finds nothing.
+
+Both work with any runner, a callable (t, shots) -> counts dict, such as
+sampler_runner() for a compiled and sampled circuit or ideal_runner() for the NumPy engine;
+ideal_counting_runner() is the ideal counterpart of the counting circuit.
+"""
+import math
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import QFTGate
+from qiskit.transpiler.passes import RemoveBarriers
+
+from grover_builder import optimal_iterations
+from ideal_grover import probabilities, sample_counts
+
+# Growth factor of the BBHT range, any value in (1, 4/3) works
+BBHT_GROWTH = 6 / 5
+
+
+def marked_verifier(oracle):
+    """Classical check of a measured bitstring against an OracleProgram.
+
+    Every bitstring (Qiskit order, as measured) is evaluated on its own by
+    replaying the oracle's gates on classical bits, so the check neither
+    simulates the circuits it verifies nor tabulates all inputs up front.
+    """
+    def verify(bitstring):
+        # Inputs, then ancillas and the result qubit, which start at 0
+        bits = [int(bit) for bit in reversed(bitstring)] + [0] * (oracle.num_ancillas + 1)
+        for controls, ctrl_state, target in oracle.gates:
+            if all(bits[c] == (ctrl_state >> k) & 1 for k, c in enumerate(controls)):
+                bits[target] ^= 1
+        return bits[-1] == 1
+
+    return verify
+
+
+def sampler_runner(build_circuit, compile_circuit, sample):
+    """Runner that builds, compiles and samples the circuit for each t.
+
+    build_circuit(t) must return the measured Grover circuit with t iterations
+    and compile_circuit(circ) its compiled version; both run once per t.
+    sample(t, circ, compiled, shots) runs one batch and returns its counts
+    dict, e.g. through Grover.run_pubs so that every batch is journaled.
+    """
+    circuits = {}
+
+    def run(t, shots):
+        if t not in circuits:
+            circ = build_circuit(t)
+            circuits[t] = circ, compile_circuit(circ)
+        return sample(t, *circuits[t], shots)
+
+    return run
+
+
+def ideal_runner(marked, num_inputs, rng=None):
+    """Runner sampling the ideal output distribution from ideal_grover."""
+    rng = np.random.default_rng(rng)
+
+    def run(t, shots):
+        sampled = sample_counts(probabilities(marked, num_inputs, t), shots, rng)
+        return {format(i, f"0{num_inputs}b"): int(c) for i, c in enumerate(sampled) if c}
+
+    return run
+
+
+def counting_probabilities(num_solutions, num_inputs, precision):
+    """Ideal outcome distribution of counting_circuit, indexed by the measured y.
+
+    The uniform superposition is an equal mix of the eigenvectors of G with
+    phases +-theta / pi, and each gives the usual phase estimation peak.
+    """
+    theta = math.asin(math.sqrt(num_solutions / pow(2, num_inputs)))
+    size = pow(2, precision)
+    y = np.arange(size)
+    probs = np.zeros(size)
+    for phase in (theta / math.pi, 1 - theta / math.pi):
+        amplitudes = np.exp(2j * math.pi * np.outer(phase - y / size, np.arange(size))).sum(axis=1) / size
+        probs += np.abs(amplitudes) ** 2 / 2
+    return probs
+
+
+def ideal_counting_runner(num_solutions, num_inputs, precision, rng=None):
+    """run_counting for counting_search sampling counting_probabilities()."""
+    rng = np.random.default_rng(rng)
+
+    def run(shots):
+        sampled = sample_counts(counting_probabilities(num_solutions, num_inputs, precision), shots, rng)
+        return {format(y, f"0{precision}b"): int(c) for y, c in enumerate(sampled) if c}
+
+    return run
+
+
+class SearchLog:
+    """Solutions found and the cost spent finding them."""
+
+    def __init__(self):
+        self.solutions = []
+        self.rejected = set()
+        self.shots = 0
+        self.oracle_calls = 0
+        self.batches = []
+        self.estimated_solutions = None
+
+    def record(self, t, shots, counts, verify):
+        """Verifies the new outcomes of a batch; returns how many were solutions."""
+        self.shots += shots
+        self.oracle_calls += t * shots
+        found = 0
+        for bitstring in counts:
+            if bitstring in self.solutions or bitstring in self.rejected:
+                continue
+            if verify(bitstring):
+                self.solutions.append(bitstring)
+                found += 1
+            else:
+                self.rejected.add(bitstring)
+        self.batches.append({"t": t, "shots": shots, "new_solutions": found})
+        return found
+
+    def to_dict(self):
+        return {
+            "solutions": sorted(self.solutions),
+            "shots": self.shots,
+            "oracle_calls": self.oracle_calls,
+            "estimated_solutions": self.estimated_solutions,
+            "batches": self.batches,
+        }
+
+
+def bbht_search(run, num_inputs, verify, required=1, shots_per_batch=8, max_batches=100, rng=None, log=None):
+    """Searches with randomly drawn t until required solutions are verified.
+
+    Args:
+      run: Runner, (t, shots) -> counts dict of bitstrings.
+      num_inputs: Number of input qubits n.
+      verify: Classical check of a bitstring, e.g. marked_verifier(builder).
+      required: Number of distinct solutions to find before stopping.
+      shots_per_batch: Shots per drawn t.
+      max_batches: Upper bound on batches, reached when there are fewer
+        than required solutions.
+      rng: Seed or Generator for drawing t.
+      log: SearchLog to continue, a new one by default.
+
+    Returns:
+      The SearchLog.
+    """
+    rng = np.random.default_rng(rng)
+    log = log or SearchLog()
+    m = 1.0
+    m_max = math.sqrt(pow(2, num_inputs))
+    for _ in range(max_batches):
+        if len(log.solutions) >= required:
+            break
+        t = int(rng.integers(0, math.ceil(m)))
+        if log.record(t, shots_per_batch, run(t, shots_per_batch), verify) == 0:
+            m = min(BBHT_GROWTH * m, m_max)
+    return log
+
+
+def controlled_gate_iteration(iterate):
+    """Generic controlled iteration for counting_circuit from an iterate circuit.
+
+    The iterate must equal the Grover operator exactly (a global phase would
+    shift the estimate), so use the kickback construction. Controlling every
+    gate is expensive; a hand-written version that only controls the phase
+    kickbacks, like Grover.controlled_grover_iteration, is much cheaper.
+    """
+    controlled = RemoveBarriers()(iterate).to_gate(label="G").control(1)
+
+    def apply(circ, control):
+        circ.append(controlled, [control] + list(range(iterate.num_qubits)))
+
+    return apply
+
+
+def counting_circuit(controlled_iteration, num_qubits, input_qubits, precision):
+    """Quantum counting: phase estimation of the Grover iterate.
+
+    controlled_iteration(circ, control) appends the Grover iterate on qubits
+    0..num_qubits-1 controlled by control. The counting register is appended
+    after them, qubits num_qubits..num_qubits+precision-1.
+    """
+    counting = list(range(num_qubits, num_qubits + precision))
+    circ = QuantumCircuit(num_qubits + precision, precision)
+    circ.h(counting)
+    circ.h(list(input_qubits))
+    for k, control in enumerate(counting):
+        for _ in range(pow(2, k)):
+            controlled_iteration(circ, control)
+    circ.append(QFTGate(precision).inverse(), counting)
+    circ.measure(counting, list(range(precision)))
+    return circ
+
+
+def estimate_solutions(counts, precision, num_inputs):
+    """Number of solutions from the most frequent counting outcome.
+
+    G has eigenvalues exp(+-2i theta) with sin^2(theta) = s/N, so the
+    measured phase y / 2^precision is theta / pi or 1 - theta / pi.
+    """
+    y = int(max(counts, key=counts.get), 2)
+    theta = math.pi * y / pow(2, precision)
+    return pow(2, num_inputs) * math.sin(theta) ** 2
+
+
+def counting_search(run, run_counting, num_inputs, verify, precision, required=1, counting_shots=32,
+                    shots_per_batch=8, max_batches=20, rng=None):
+    """Estimates the number of solutions first, then samples at the optimal t.
+
+    The precision trades oracle calls for accuracy: every counting shot costs
+    2^precision - 1 controlled iterations, and the estimate of s is only good
+    to about 2 pi sqrt(s N) / 2^precision + pi^2 N / 4^precision. With N = 256
+    and s = 4, precision 5 estimates 2.46 and samples at t = 8 instead of 6,
+    which still succeeds with probability 0.72; precision 7 estimates 3.83 at
+    four times the counting cost. A rough estimate is usually enough, as the
+    success probability is flat around the optimal t.
+
+    Args:
+      run: Runner, (t, shots) -> counts dict of bitstrings.
+      run_counting: shots -> counts of counting_circuit(..., precision).
+      precision: Qubits of the counting register; costs 2^precision - 1
+        controlled iterations per shot.
+      Others as in bbht_search; max_batches bounds each of the two phases.
+
+    Returns:
+      The SearchLog.
+    """
+    log = SearchLog()
+    log.estimated_solutions = estimate_solutions(run_counting(counting_shots), precision, num_inputs)
+    log.shots += counting_shots
+    log.oracle_calls += (pow(2, precision) - 1) * counting_shots
+
+    t = optimal_iterations(round(log.estimated_solutions), num_inputs)
+    if t is not None:
+        for _ in range(max_batches):
+            if len(log.solutions) >= required:
+                return log
+            if log.record(t, shots_per_batch, run(t, shots_per_batch), verify) == 0 and not log.solutions:
+                # Nothing at the estimated optimum, the estimate is off
+                break
+    return bbht_search(run, num_inputs, verify, required, shots_per_batch, max_batches, rng, log)
@@ -0,0 +1,250 @@
+"""Aer simulation method and parallelism selection.
+
+AerSimulator() picks its method per circuit but leaves threading and fusion
+at generic defaults, and a hard-coded method='statevector' is slow once the
+circuit gets wide. choose_options() picks the method, max_parallel_threads,
+max_parallel_shots and fusion settings from the circuit's width, depth and
+shot count using a calibration table:
+
+  * each row bounds width, depth and shots (None for no bound) and gives the
+    options to use; the first row containing the circuit wins;
+  * DEFAULT_CALIBRATION is a hand-written table, calibrate() measures one on
+    this machine over a grid of widths, depths and shot counts and saves it
+    as CALIBRATION_FILE, which is then used instead;
+  * shots are only parallelized when the circuit measures or resets before
+    its end, otherwise Aer samples all shots from one final state and the
+    threads are better spent on the state update.
+
+Pass force_method to compare against a fixed method.
+
+The table only holds Aer options, so a reduced-width simulation of the input
+register alone is not one of its methods: the rows configure the
+AerSimulator every mode runs on, noise and mid-circuit measurements
+included. Ideal runs whose ancillas are classically uncomputed already have
+that engine in ideal_grover.py.
+
+    python aer_methods.py --calibrate
+"""
+import argparse
+import json
+import os
+import time
+
+# Measured table written by calibrate(), used when it exists
+CALIBRATION_FILE = "./aer_calibration.json"
+
+DEFAULT_CALIBRATION = [
+    # Small states: fusion and threading overhead outweigh the work
+    {"max_qubits": 12, "max_depth": None, "max_shots": None,
+     "options": {"method": "statevector", "fusion_enable": False, "max_parallel_threads": 1}},
+    {"max_qubits": 28, "max_depth": None, "max_shots": None,
+     "options": {"method": "statevector", "fusion_enable": True}},
+    # Too wide for a dense state; the Grover registers stay lowly entangled
+    {"max_qubits": None, "max_depth": None, "max_shots": None,
+     "options": {"method": "matrix_product_state"}},
+]
+
+METHODS = ("statevector", "matrix_product_state")
+
+# Instructions that make Aer simulate every shot separately when not final
+NON_FINAL_INSTRUCTIONS = {"measure", "reset"}
+CONTROL_FLOW = {"if_else", "while_loop", "for_loop", "switch_case"}
+
+
+def circuit_features(circ):
+    """Width, depth and whether shots must be simulated one by one."""
+    per_shot = False
+    measured = set()
+    for instruction in circ.data:
+        name = instruction.operation.name
+        qubits = {circ.find_bit(q).index for q in instruction.qubits}
+        if name in NON_FINAL_INSTRUCTIONS:
+            if name == "reset":
+                per_shot = True
+            measured |= qubits
+        elif name != "barrier" and qubits & measured:
+            # A gate after a measurement on the same qubit
+            per_shot = True
+        if name in CONTROL_FLOW:
+            per_shot = True
+    return {"num_qubits": circ.num_qubits, "depth": circ.depth(), "per_shot": per_shot}
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """The measured table if one was saved, otherwise DEFAULT_CALIBRATION."""
+    if path and os.path.exists(path):
+        with open(path) as f_json:
+            return json.load(f_json)
+    return DEFAULT_CALIBRATION
+
+
+def _within(value, bound):
+    return bound is None or value <= bound
+
+
+def choose_options(circ, shots, table=None, force_method=None):
+    """AerSimulator options for running circ with the given number of shots.
+
+    Args:
+      circ: The circuit (transpiled or not) to run.
+      shots: Number of shots.
+      table: Calibration rows, load_calibration() by default.
+      force_method: Use this method regardless of the table; the table's
+        other options are kept when its row has the same method.
+    """
+    table = load_calibration() if table is None else table
+    features = circuit_features(circ)
+    options = {"method": "automatic"}
+    for row in table:
+        if (_within(features["num_qubits"], row.get("max_qubits"))
+                and _within(features["depth"], row.get("max_depth"))
+                and _within(shots, row.get("max_shots"))):
+            options = dict(row["options"])
+            break
+    if force_method is not None and options.get("method") != force_method:
+        options = {"method": force_method}
+    if features["per_shot"] and shots > 1:
+        options.setdefault("max_parallel_shots", 0)  # 0: as many as there are threads
+    else:
+        options["max_parallel_shots"] = 1
+    return options
+
+
+def auto_simulator(circ, shots, table=None, force_method=None):
+    """An AerSimulator configured by choose_options()."""
+    from qiskit_aer import AerSimulator
+
+    return AerSimulator(**choose_options(circ, shots, table, force_method))
+
+
+def time_run(circ, shots, options, repeats=2):
+    """Best wall time of running the transpiled circ with the given options."""
+    from qiskit import transpile
+    from qiskit_aer import AerSimulator
+
+    simulator = AerSimulator(**options)
+    compiled = transpile(circ, simulator)
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        simulator.run(compiled, shots=shots).result()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def candidate_options():
+    """Option sets calibrate() compares."""
+    candidates = []
+    for method in METHODS:
+        for fusion_enable in (False, True):
+            candidates.append({"method": method, "fusion_enable": fusion_enable})
+    candidates.append({"method": "statevector", "fusion_enable": True, "max_parallel_threads": 1})
+    return candidates
+
+
+def calibration_table(best):
+    """Turns the fastest options per grid point into bounded calibration rows.
+
+    Args:
+      best: Dict (num_qubits, depth, shots) -> options of the calibration grid.
+
+    Returns:
+      Rows ordered by width, then depth, then shots. Each bounds the grid point
+      it was measured at, so a circuit takes the options of the nearest point
+      at or above it; the largest depth and shots of a width and the largest
+      width are left unbounded. Neighbours with the same options are merged.
+    """
+    widths = sorted({num_qubits for num_qubits, _, _ in best})
+    table = []
+    for num_qubits in widths:
+        depths = sorted({depth for q, depth, _ in best if q == num_qubits})
+        # Per depth, the (max_shots, options) segments of its shot grid
+        segments_by_depth = []
+        for depth in depths:
+            shot_counts = sorted(s for q, d, s in best if (q, d) == (num_qubits, depth))
+            segments = []
+            for k, shots in enumerate(shot_counts):
+                options = best[num_qubits, depth, shots]
+                max_shots = shots if k < len(shot_counts) - 1 else None
+                if segments and segments[-1][1] == options:
+                    segments[-1] = (max_shots, options)
+                else:
+                    segments.append((max_shots, options))
+            if segments_by_depth and segments_by_depth[-1][1] == segments:
+                segments_by_depth.pop()
+            segments_by_depth.append((depth, segments))
+        for k, (depth, segments) in enumerate(segments_by_depth):
+            max_depth = depth if k < len(segments_by_depth) - 1 else None
+            for max_shots, options in segments:
+                table.append({"max_qubits": num_qubits, "max_depth": max_depth, "max_shots": max_shots,
+                              "options": options})
+        # A width won by one option everywhere merges into the previous one alike
+        if (len(table) >= 2 and table[-2]["options"] == table[-1]["options"]
+                and all(row[key] is None for row in table[-2:] for key in ("max_depth", "max_shots"))):
+            table[-2]["max_qubits"] = num_qubits
+            table.pop()
+    for row in table:
+        if row["max_qubits"] == widths[-1]:
+            row["max_qubits"] = None
+    return table
+
+
+def calibrate(circuits, shots=(128, 4096), path=CALIBRATION_FILE, repeats=2):
+    """Times every candidate on a grid and saves the fastest as a table.
+
+    Args:
+      circuits: Representative circuits spanning the widths and depths of
+        interest, e.g. GroverBuilder(n, ...).build(t)[0] for several n and t.
+      shots: Shot counts of the grid.
+      path: Where to save the table, None to only return it.
+
+    Returns:
+      (table, timings), timings holding one dict per grid point and candidate.
+    """
+    timings = []
+    best = {}
+    for circ in circuits:
+        features = circuit_features(circ)
+        for num_shots in shots:
+            point = (features["num_qubits"], features["depth"], num_shots)
+            fastest = None
+            for options in candidate_options():
+                seconds = time_run(circ, num_shots, options, repeats)
+                timings.append({**features, "shots": num_shots, "options": options, "seconds": seconds})
+                if fastest is None or seconds < fastest[0]:
+                    fastest = (seconds, options)
+            best[point] = fastest[1]
+    table = calibration_table(best)
+    if path:
+        with open(path, 'w') as f_json:
+            json.dump(table, f_json, indent=4)
+    return table, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibrate", action="store_true", help=f"Measure and save {CALIBRATION_FILE}")
+    parser.add_argument("--min-inputs", type=int, default=6)
+    parser.add_argument("--max-inputs", type=int, default=20)
+    parser.add_argument("--t", type=int, nargs="+", default=[1, 4], help="Iteration counts, i.e. the depth grid.")
+    parser.add_argument("--shots", type=int, nargs="+", default=[128, 4096], help="Shot counts of the grid.")
+    args = parser.parse_args()
+
+    from grover_builder import GroverBuilder, marked_states_oracle
+
+    circuits = []
+    for num_inputs in range(args.min_inputs, args.max_inputs + 1, 2):
+        builder = GroverBuilder(num_inputs, marked_states_oracle(num_inputs, [0]))
+        circuits += [builder.build(t)[0] for t in args.t]
+    if args.calibrate:
+        table, timings = calibrate(circuits, args.shots)
+        for timing in timings:
+            print(f"{timing['num_qubits']:>3} qubits, depth {timing['depth']:>5}, {timing['shots']:>5} shots  "
+                  f"{timing['seconds']:.4f} s  {timing['options']}")
+        print(json.dumps(table, indent=4))
+    else:
+        for circ in circuits:
+            for shots in args.shots:
+                print(f"{circ.num_qubits:>3} qubits, depth {circ.depth():>5}, {shots:>5} shots: "
+                      f"{choose_options(circ, shots)}")
@@ -0,0 +1,41 @@
+"""Backend and sampler factory.
+
+Building and verifying circuits only needs qiskit, while creating a backend
+pulls in qiskit_aer or qiskit_ibm_runtime (and for IBM, credentials and a
+network round trip). Grover.py therefore creates its backend only when a run
+starts, through make_backend(), and every heavy import happens inside these
+functions.
+"""
+
+
+def local_backend(**options):
+    """An AerSimulator with the given options."""
+    from qiskit_aer import AerSimulator
+
+    return AerSimulator(**options)
+
+
+def ibm_backend():
+    """The least busy IBM Quantum device, using the saved credentials (and .env)."""
+    from dotenv import load_dotenv
+    from qiskit_ibm_runtime import QiskitRuntimeService
+
+    load_dotenv()
+    service = QiskitRuntimeService()
+    return service.least_busy(operational=True, simulator=False)
+
+
+def make_sampler(backend):
+    """A SamplerV2 running on backend."""
+    from qiskit_ibm_runtime import SamplerV2 as Sampler
+
+    return Sampler(backend)
+
+
+def make_backend(use_local=True, **options):
+    """Returns (backend, sampler) for a local simulator or IBM hardware.
+
+    options are passed to local_backend() when use_local is set.
+    """
+    backend = local_backend(**options) if use_local else ibm_backend()
+    return backend, make_sampler(backend)
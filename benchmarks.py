@@ -0,0 +1,305 @@
+"""Benchmarks of the Grover pipeline: build, transpile, simulate, post-process.
+
+Every measurement becomes one JSON line with the stage, its parameters, the
+wall time in seconds, the peak Python allocation in bytes (tracemalloc; Aer's
+native buffers are not included) and, for circuits, the transpiled depth, CX
+count and qubit count. Sweeps:
+
+  * build and transpile: t = 1..12 at optimization levels 0-3 on a 15-qubit
+    line, and the optimal t on FakeSherbrooke;
+  * simulate: t = 1..12, and shots 1k..1M at the optimal t;
+    both sweep Grover.Grover_circuit over the constructions and MCX
+    strategies of the sweep;
+  * post-process: bincount / top-k / success probability on a BitArray,
+    against get_counts(), for 1k..1M shots;
+  * width: GroverBuilder circuits for n = 8..16 (build, transpile, simulate);
+  * uncomputation: each uncomputation of the sweep (Grover.UNCOMPUTATIONS)
+    and construction transpiled onto the line, with its success probability
+    on Aer and on a noisy model of the line.
+    The measured uncomputations make Aer simulate every shot separately, so
+    this stage uses few shots. conditional_cx counts the two-qubit gates of
+    the phase fixups, which only run when their ancilla measured 1.
+
+Compare a run against a saved baseline to catch regressions: circuit sizes
+must not grow at all, times may not grow beyond a tolerance factor.
+
+    python benchmarks.py --output bench_results.jsonl
+    python benchmarks.py --quick --compare bench_baseline.jsonl
+    python benchmarks.py --stages transpile --construction phase --mcx-strategy clean dirty
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+from qiskit import transpile
+from qiskit.primitives import BitArray
+
+from bit_counts import bincount, success_probability, top_k
+from construction_report import circuit_stats, line_backend
+from grover_builder import GroverBuilder, marked_states_oracle
+from Grover import CONSTRUCTIONS, MCX_STRATEGIES, UNCOMPUTATIONS, Grover_circuit, input_qubits
+from ideal_grover import probabilities, sample_outcomes
+
+# Solutions of the hash oracle and its optimal t
+MARKED = [92, 124, 220, 252]
+OPTIMAL_T = 6
+
+FULL_SWEEP = {
+    "t": list(range(1, 13)),
+    "optimization_levels": [0, 1, 2, 3],
+    "shots": [1000, 10000, 100000, 1000000],
+    "widths": [8, 10, 12, 14, 16],
+    "uncomputation_t": [1, 2],
+    "uncomputation_shots": 512,
+    "constructions": list(CONSTRUCTIONS),
+    "mcx_strategies": list(MCX_STRATEGIES),
+    "uncomputations": list(UNCOMPUTATIONS),
+}
+QUICK_SWEEP = {
+    "t": [1, 6, 12],
+    "optimization_levels": [0, 3],
+    "shots": [1000, 100000],
+    "widths": [8, 12],
+    "uncomputation_t": [1],
+    "uncomputation_shots": 128,
+    "constructions": ["kickback"],
+    "mcx_strategies": ["noancilla"],
+    "uncomputations": list(UNCOMPUTATIONS),
+}
+
+STAGES = ("transpile", "simulate", "postprocess", "width", "uncomputation")
+
+# Fields that identify a measurement when comparing runs
+KEY_FIELDS = ("stage", "t", "n", "shots", "optimization_level", "construction", "mcx_strategy", "variant")
+SIZE_FIELDS = ("depth", "cx", "conditional_cx", "num_qubits")
+
+# Basis for the width sweep, where AerSimulator would keep the MCX gates whole
+BASIS_GATES = ["cx", "u"]
+
+
+def measure(func, memory=True):
+    """Runs func and returns (result, seconds, peak traced bytes).
+
+    The time comes from an untraced call; with memory, func runs a second time
+    under tracemalloc for the peak, so it must be repeatable.
+    """
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def size_fields(compiled):
+    stats = circuit_stats(compiled)
+    return {"depth": stats["depth"], "cx": stats["two_qubit"], "num_qubits": compiled.num_qubits}
+
+
+def conditional_two_qubit(circ):
+    """Two-qubit gates inside classically conditioned blocks."""
+    count = 0
+    for instruction in circ.data:
+        for block in getattr(instruction.operation, "blocks", ()):
+            count += sum(1 for inner in block.data if inner.operation.num_qubits == 2)
+            count += conditional_two_qubit(block)
+    return count
+
+
+def circuit_options(sweep):
+    """The (construction, mcx_strategy) pairs a sweep builds Grover_circuit with."""
+    return [{"construction": construction, "mcx_strategy": mcx_strategy}
+            for construction in sweep["constructions"] for mcx_strategy in sweep["mcx_strategies"]]
+
+
+def bench_build_and_transpile(sweep, backend, memory=True):
+    records = []
+    for options in circuit_options(sweep):
+        for t in sweep["t"]:
+            circ, seconds, peak = measure(lambda: Grover_circuit(t, **options), memory)
+            records.append({"stage": "build", "t": t, **options, "seconds": seconds, "peak_bytes": peak,
+                            "size": circ.size(), "num_qubits": circ.num_qubits})
+            for level in sweep["optimization_levels"]:
+                compiled, seconds, peak = measure(
+                    lambda: transpile(circ, backend, optimization_level=level, seed_transpiler=0), memory)
+                records.append({"stage": "transpile", "t": t, "optimization_level": level, **options,
+                                "backend": backend.name, "seconds": seconds, "peak_bytes": peak,
+                                **size_fields(compiled)})
+    return records
+
+
+def bench_simulate(sweep, simulator, memory=True):
+    records = []
+    runs = [(t, 1000) for t in sweep["t"]] + [(OPTIMAL_T, shots) for shots in sweep["shots"] if shots != 1000]
+    for options in circuit_options(sweep):
+        for t, shots in runs:
+            compiled = transpile(Grover_circuit(t, **options), simulator, optimization_level=1, seed_transpiler=0)
+            _, seconds, peak = measure(lambda: simulator.run(compiled, shots=shots, seed_simulator=0).result(), memory)
+            records.append({"stage": "simulate", "t": t, "shots": shots, **options, "backend": simulator.name,
+                            "seconds": seconds, "peak_bytes": peak, "num_qubits": compiled.num_qubits})
+    return records
+
+
+def bench_postprocess(sweep, memory=True):
+    records = []
+    probs = probabilities(MARKED, len(input_qubits), OPTIMAL_T)
+    for shots in sweep["shots"]:
+        samples = next(sample_outcomes(probs, shots, 0, batch_size=shots)).astype(np.uint8)
+        bit_array = BitArray(samples[:, None], len(input_qubits))
+
+        def arrays():
+            counts = bincount(bit_array)
+            return top_k(counts, len(MARKED)), success_probability(counts, MARKED)
+
+        for variant, func in (("bit_counts", arrays), ("get_counts", bit_array.get_counts)):
+            _, seconds, peak = measure(func, memory)
+            records.append({"stage": "postprocess", "shots": shots, "variant": variant,
+                            "seconds": seconds, "peak_bytes": peak})
+    return records
+
+
+def bench_width(sweep, simulator, memory=True):
+    records = []
+    for num_inputs in sweep["widths"]:
+        builder = GroverBuilder(num_inputs, marked_states_oracle(num_inputs, [0]))
+        (circ, _), seconds, peak = measure(lambda: builder.build(1), memory)
+        records.append({"stage": "width_build", "n": num_inputs, "t": 1, "seconds": seconds, "peak_bytes": peak,
+                        "size": circ.size(), "num_qubits": circ.num_qubits})
+        compiled, seconds, peak = measure(
+            lambda: transpile(circ, basis_gates=BASIS_GATES, seed_transpiler=0), memory)
+        records.append({"stage": "width_transpile", "n": num_inputs, "t": 1, "seconds": seconds,
+                        "peak_bytes": peak, **size_fields(compiled)})
+        _, seconds, peak = measure(lambda: simulator.run(compiled, shots=1000, seed_simulator=0).result(), memory)
+        records.append({"stage": "width_simulate", "n": num_inputs, "t": 1, "shots": 1000, "seconds": seconds,
+                        "peak_bytes": peak, **size_fields(compiled)})
+    return records
+
+
+def bench_uncomputation(sweep, memory=True):
+    """Sizes and success probability of every uncomputation and construction, ideal and with noise."""
+    from qiskit_aer import AerSimulator
+
+    from backends import make_sampler
+
+    device = line_backend(control_flow=True)
+    simulators = [AerSimulator(), AerSimulator.from_backend(device)]
+    simulators[1].name = "noisy_" + device.name
+    shots = sweep["uncomputation_shots"]
+    records = []
+    for uncomputation in sweep["uncomputations"]:
+        for construction in sweep["constructions"]:
+            for t in sweep["uncomputation_t"]:
+                circ = Grover_circuit(t, construction, uncomputation=uncomputation)
+                compiled = transpile(circ, device, optimization_level=1, seed_transpiler=0)
+                sizes = {**size_fields(compiled), "conditional_cx": conditional_two_qubit(compiled)}
+                for simulator in simulators:
+                    run_circuit = compiled if simulator is simulators[1] else transpile(circ, simulator)
+                    sampler = make_sampler(simulator)
+                    result, seconds, peak = measure(lambda: sampler.run([run_circuit], shots=shots).result(), memory)
+                    success = success_probability(bincount(result[0].data.c), MARKED)
+                    records.append({"stage": "uncomputation", "variant": uncomputation, "construction": construction,
+                                    "t": t, "shots": shots, "backend": simulator.name, "seconds": seconds,
+                                    "peak_bytes": peak, "success": success, **sizes})
+    return records
+
+
+def run_suite(sweep, stages, memory=True):
+    """Runs the selected stages and returns their records."""
+    from qiskit_aer import AerSimulator
+    from qiskit_ibm_runtime.fake_provider import FakeSherbrooke
+
+    simulator = AerSimulator()
+    records = []
+    if "transpile" in stages:
+        records += bench_build_and_transpile(sweep, line_backend(), memory)
+        records += [record for record in bench_build_and_transpile(dict(sweep, t=[OPTIMAL_T]), FakeSherbrooke(), memory)
+                    if record["stage"] == "transpile"]
+    if "simulate" in stages:
+        records += bench_simulate(sweep, simulator, memory)
+    if "postprocess" in stages:
+        records += bench_postprocess(sweep, memory)
+    if "width" in stages:
+        records += bench_width(sweep, simulator, memory)
+    if "uncomputation" in stages:
+        records += bench_uncomputation(sweep, memory)
+    return records
+
+
+def save_records(records, path):
+    """Writes the records as JSON lines, after a header line describing the machine."""
+    import qiskit
+
+    header = {"stage": "environment", "python": platform.python_version(), "machine": platform.machine(),
+              "qiskit": qiskit.__version__, "created": time.time()}
+    with open(path, 'w') as f_out:
+        for record in [header] + records:
+            f_out.write(json.dumps(record) + "\n")
+
+
+def load_records(path):
+    with open(path) as f_in:
+        return [json.loads(line) for line in f_in if line.strip()]
+
+
+def record_key(record):
+    return (record.get("backend"),) + tuple(record.get(field) for field in KEY_FIELDS)
+
+
+def compare(baseline, current, time_tolerance=1.5, min_seconds=0.05):
+    """Regressions of current against baseline records.
+
+    Returns a list of messages: any growth of depth, CX or qubit count, and
+    times above time_tolerance times the baseline. Slowdowns of less than
+    min_seconds are timer noise and ignored.
+    """
+    baseline_by_key = {record_key(record): record for record in baseline if record["stage"] != "environment"}
+    regressions = []
+    for record in current:
+        old = baseline_by_key.get(record_key(record))
+        if old is None:
+            continue
+        for field in SIZE_FIELDS:
+            if field in record and field in old and record[field] > old[field]:
+                regressions.append(f"{record_key(record)}: {field} {old[field]} -> {record[field]}")
+        if record["seconds"] > max(time_tolerance * old["seconds"], old["seconds"] + min_seconds):
+            regressions.append(f"{record_key(record)}: {old['seconds']:.4f} s -> {record['seconds']:.4f} s")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.jsonl")
+    parser.add_argument("--quick", action="store_true", help="Small sweep for a fast regression check")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced second run of every stage")
+    parser.add_argument("--compare", help="Baseline JSONL file to check for regressions")
+    parser.add_argument("--time-tolerance", type=float, default=1.5)
+    parser.add_argument("--construction", nargs="+", choices=CONSTRUCTIONS, help="Constructions to sweep")
+    parser.add_argument("--mcx-strategy", nargs="+", choices=MCX_STRATEGIES, help="MCX strategies to sweep")
+    parser.add_argument("--uncomputation", nargs="+", choices=UNCOMPUTATIONS, help="Uncomputations to sweep")
+    args = parser.parse_args()
+
+    sweep = dict(QUICK_SWEEP if args.quick else FULL_SWEEP)
+    for name, values in (("constructions", args.construction), ("mcx_strategies", args.mcx_strategy),
+                         ("uncomputations", args.uncomputation)):
+        if values:
+            sweep[name] = values
+    records = run_suite(sweep, args.stages, not args.no_memory)
+    save_records(records, args.output)
+    for record in records:
+        sizes = " ".join(f"{field}={record[field]}" for field in SIZE_FIELDS + ("success",) if field in record)
+        print(f"{str(record_key(record)):<70} {record['seconds']:>9.4f} s  {sizes}")
+    print(f"Saved {len(records)} records to {args.output}")
+    if args.compare:
+        regressions = compare(load_records(args.compare), records, args.time_tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,74 @@
+"""NumPy post-processing of sampler results.
+
+BitArray.get_counts() builds a dict keyed by bitstrings, one Python string per
+distinct outcome, and everything downstream (filtering, success rates, JSON)
+then works on that dict. Here counts are an integer array of length 2^n
+indexed by the measured outcome, taken straight from the packed bytes of the
+BitArray, so shots and n can grow without Python-level loops. A bitstring dict
+is only built by counts_dict(), e.g. for plot_histogram.
+
+Outcome i is the integer value of the measured bitstring, so classical bit k
+(input qubit k in Grover.py) is bit k of i, as in ideal_grover.
+"""
+import numpy as np
+
+
+def outcomes(bit_array):
+    """Integer outcome of every shot in a BitArray, flattened over its shape."""
+    if bit_array.num_bits > 63:
+        raise ValueError(f"Outcomes of {bit_array.num_bits} bits do not fit in int64.")
+    packed = bit_array.array
+    # Bytes are big-endian: the last byte holds bits 0-7
+    values = np.zeros(packed.shape[:-1], dtype=np.int64)
+    for byte in range(packed.shape[-1]):
+        values = (values << 8) | packed[..., byte]
+    return values.reshape(-1)
+
+
+def bincount(bit_array):
+    """Counts per outcome, an int64 array of length 2^num_bits."""
+    return np.bincount(outcomes(bit_array), minlength=pow(2, bit_array.num_bits))
+
+
+def merge_counts(counts_list):
+    """Sums count arrays, e.g. of several PUBs or jobs of the same circuit."""
+    counts_list = [np.asarray(counts) for counts in counts_list]
+    merged = np.zeros(max(len(counts) for counts in counts_list), dtype=np.int64)
+    for counts in counts_list:
+        merged[:len(counts)] += counts
+    return merged
+
+
+def merged_pub_counts(pub_results, register="c"):
+    """Counts of one classical register summed over several PUB results."""
+    return merge_counts([bincount(getattr(pub_result.data, register)) for pub_result in pub_results])
+
+
+def top_k(counts, k):
+    """The k most frequent outcomes, most frequent first (ties by outcome)."""
+    return np.lexsort((np.arange(len(counts)), -np.asarray(counts)))[:k]
+
+
+def above_threshold(counts, fraction=0.9):
+    """Outcomes counted at least fraction times as often as the most frequent one."""
+    return np.flatnonzero(counts >= fraction * counts.max())
+
+
+def success_probability(counts, marked):
+    """Fraction of shots that landed on a marked outcome."""
+    return float(counts[np.asarray(marked)].sum() / counts.sum())
+
+
+def counts_dict(counts, num_bits=None):
+    """Bitstring dict of the non-zero counts, as returned by get_counts()."""
+    if num_bits is None:
+        num_bits = int(len(counts) - 1).bit_length()
+    return {format(i, f"0{num_bits}b"): int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+def counts_from_dict(counts, num_bits):
+    """Inverse of counts_dict(), e.g. for results saved as bitstring JSON."""
+    array = np.zeros(pow(2, num_bits), dtype=np.int64)
+    for bitstring, count in counts.items():
+        array[int(bitstring, 2)] += count
+    return array
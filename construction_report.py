@@ -0,0 +1,86 @@
+"""Gate-count and depth report of the Grover constructions per backend.
+
+Compares the "kickback" construction (Z_f and Z_or compute into an ancilla and
+kick back into a freshly prepared |-> every time) with the "phase"
+construction (no phase ancilla: Z_f ends in a CZ and Z_or is an X-wrapped
+MCZ) after transpiling to each backend, so the smaller one can be picked per
+backend. Every construction is built with each of the MCX decomposition
+strategies (Grover.MCX_STRATEGIES): the best one depends on the
+backend's connectivity, since ancilla chains trade depth for extra
+interactions between the ancillas and the inputs.
+
+    python construction_report.py --t 6 --optimization-level 1
+"""
+import argparse
+
+from qiskit import transpile
+from qiskit.providers.fake_provider import GenericBackendV2
+from qiskit.transpiler import CouplingMap
+
+from Grover import CONSTRUCTIONS, MCX_STRATEGIES, Grover_circuit
+
+
+def circuit_stats(compiled):
+    """Depth, size and two-qubit gate count of a transpiled circuit."""
+    two_qubit = sum(1 for instruction in compiled.data
+                    if instruction.operation.num_qubits == 2 and instruction.operation.name != "barrier")
+    return {
+        "depth": compiled.depth(),
+        "size": compiled.size(),
+        "two_qubit": two_qubit,
+        "ops": dict(compiled.count_ops()),
+    }
+
+
+def line_backend(num_qubits=15, control_flow=False):
+    """Generic backend with nearest-neighbour connectivity on a line."""
+    return GenericBackendV2(num_qubits, coupling_map=CouplingMap.from_line(num_qubits), control_flow=control_flow,
+                            seed=0)
+
+
+def construction_report(backends, t=6, optimization_level=1, seed_transpiler=0, mcx_strategies=MCX_STRATEGIES):
+    """Transpiles every construction and MCX strategy for every backend.
+
+    Returns:
+      A list of dicts with backend, construction, mcx_strategy and the
+      circuit_stats() fields.
+    """
+    rows = []
+    for backend in backends:
+        for construction in CONSTRUCTIONS:
+            for mcx_strategy in mcx_strategies:
+                circ = Grover_circuit(t, construction, mcx_strategy)
+                compiled = transpile(circ, backend, optimization_level=optimization_level, seed_transpiler=seed_transpiler)
+                rows.append({"backend": backend.name, "construction": construction, "mcx_strategy": mcx_strategy,
+                             **circuit_stats(compiled)})
+    return rows
+
+
+def smallest_construction(rows, backend_name):
+    """(construction, mcx_strategy) with the fewest two-qubit gates (then depth) on a backend."""
+    candidates = [row for row in rows if row["backend"] == backend_name]
+    best = min(candidates, key=lambda row: (row["two_qubit"], row["depth"]))
+    return best["construction"], best["mcx_strategy"]
+
+
+def print_report(rows):
+    print(f"{'backend':<20} {'construction':<12} {'mcx strategy':<15} {'depth':>8} {'size':>8} {'2q gates':>9}")
+    for row in rows:
+        print(f"{row['backend']:<20} {row['construction']:<12} {row['mcx_strategy']:<15} "
+              f"{row['depth']:>8} {row['size']:>8} {row['two_qubit']:>9}")
+    for backend_name in dict.fromkeys(row["backend"] for row in rows):
+        construction, mcx_strategy = smallest_construction(rows, backend_name)
+        print(f"Smallest on {backend_name}: {construction} with {mcx_strategy} MCX")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--t", type=int, default=6)
+    parser.add_argument("--optimization-level", type=int, default=1)
+    args = parser.parse_args()
+
+    from qiskit_aer import AerSimulator
+    from qiskit_ibm_runtime.fake_provider import FakeSherbrooke
+
+    backends = [AerSimulator(), line_backend(), FakeSherbrooke()]
+    print_report(construction_report(backends, args.t, args.optimization_level))
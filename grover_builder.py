@@ -0,0 +1,539 @@
+"""Grover circuits for any number of input qubits.
+
+GroverBuilder takes the number of inputs, an oracle and an ancilla budget,
+lays out the registers itself and builds the circuit. Grover.py builds all of
+its circuits with the builder of its hash function (hash_oracle()) on 15
+qubits.
+
+  * the oracle is an oracle_compiler.OracleProgram (or a config, which is
+    compiled), e.g. hash_oracle() for Grover.py's f or
+    marked_states_oracle() for a given set of solutions;
+  * the "kickback" construction computes the oracle into a result qubit and
+    the OR of the inputs into another one, and kicks both back onto a phase
+    qubit that every oracle prepares in |-> and undoes;
+  * the "phase" construction needs no phase qubit: when the oracle's last
+    gate is the only one writing the result, that gate becomes a
+    multi-controlled Z and no result qubit is allocated, otherwise the result
+    is computed, hit with Z and uncomputed; the diffusion is an X-wrapped
+    multi-controlled Z on the inputs;
+  * the oracle ancillas are freed by replaying the gates in reverse or by
+    X-basis measurements with classically conditioned phase fixups (see
+    UNCOMPUTATIONS);
+  * ancillas for the MCX decompositions are only added when the strategy
+    wants more than the oracle ancillas already provide (those are all |0>
+    during the diffusion), and never beyond the budget.
+
+    python grover_builder.py --min-inputs 8 --max-inputs 20 --t 1
+"""
+import argparse
+import math
+import time
+
+from qiskit import ClassicalRegister, QuantumCircuit
+from qiskit.synthesis import synth_mcx_1_clean_b95, synth_mcx_n_clean_m15, synth_mcx_n_dirty_i15
+
+from oracle_compiler import RESULT, OracleProgram, compile_oracle
+from reversible_sim import truth_table
+
+# --- Multi-controlled X decompositions ---
+# "noancilla" leaves the MCX to the transpiler's ancilla-free synthesis.
+# "clean" builds a v-chain on ancillas that are |0> at that point, "dirty" a
+# chain on ancillas in any state (both restore them). "relative-phase" uses
+# relative-phase Toffolis and leaves its ancillas holding intermediate ANDs
+# until the mirrored uncompute, where the phases cancel; it is only valid for
+# compute/uncompute pairs and for ccx gates that are mirrored the same way.
+MCX_STRATEGIES = ("noancilla", "clean", "dirty", "relative-phase")
+# "kickback" computes the oracle and the OR into qubits and kicks them back onto
+# a phase qubit, "phase" marks the states with multi-controlled Z gates instead
+CONSTRUCTIONS = ("kickback", "phase")
+# How the oracle ancillas are freed: "reversible" repeats the gates in reverse,
+# "measure" measures each ancilla in the X basis and fixes the phase under a
+# classical condition, "reset" does the same but resets the measured ancilla
+# instead of flipping it back
+UNCOMPUTATIONS = ("reversible", "measure", "reset")
+UNCOMPUTE_REGISTER = "uncompute"
+
+
+def mcx_circuit(num_controls, num_ancillas, strategy):
+    """Returns the MCX as a circuit on [controls..., target, ancillas...]."""
+    if strategy not in MCX_STRATEGIES:
+        raise ValueError(f"Unknown MCX strategy: {strategy}")
+    target = num_controls
+    if strategy == "clean" and num_ancillas >= max(num_controls - 2, 1) and num_controls > 2:
+        return synth_mcx_n_clean_m15(num_controls)
+    if strategy == "clean" and num_ancillas >= 1 and num_controls > 2:
+        return synth_mcx_1_clean_b95(num_controls)
+    if strategy == "dirty" and num_ancillas >= num_controls - 2 and num_controls > 2:
+        return synth_mcx_n_dirty_i15(num_controls)
+    if strategy == "relative-phase" and num_controls > 2:
+        # AND pairs of controls into ancillas until the rest fits one gate
+        sub = QuantumCircuit(num_controls + 1 + num_ancillas)
+        pending = list(range(num_controls))
+        free = list(range(num_controls + 1, num_controls + 1 + num_ancillas))
+        while len(pending) > 3 and free:
+            ancilla = free.pop(0)
+            sub.rccx(pending.pop(0), pending.pop(0), ancilla)
+            pending.append(ancilla)
+        if len(pending) == 2:
+            sub.rccx(pending[0], pending[1], target)
+        elif len(pending) == 3:
+            sub.rcccx(pending[0], pending[1], pending[2], target)
+        else:
+            sub.mcx(pending, target)
+        return sub
+    sub = QuantumCircuit(num_controls + 1)
+    sub.mcx(list(range(num_controls)), target)
+    return sub
+
+
+def apply_mcx(circ, controls, target, ancillas, strategy, inverse=False):
+    """Appends an MCX (or its inverse) built with the given strategy.
+
+    ancillas are the qubits the strategy may borrow; they are restored except
+    by "relative-phase", whose inverse must follow later.
+    """
+    sub = mcx_circuit(len(controls), len(ancillas), strategy)
+    qubits = list(controls) + [target] + list(ancillas)[:sub.num_qubits - len(controls) - 1]
+    circ.compose(sub.inverse() if inverse else sub, qubits=qubits, inplace=True)
+
+
+def mcx_ancillas_wanted(num_controls, strategy):
+    """Ancillas the strategy uses for an MCX with num_controls controls when
+    there are enough of them."""
+    if strategy == "noancilla" or num_controls <= 2:
+        return 0
+    return num_controls - 2
+
+
+def unmirrored_strategy(strategy):
+    """Strategy for an MCX that is not undone later: relative phases would not cancel."""
+    return "clean" if strategy == "relative-phase" else strategy
+
+
+# --- Oracles ---
+
+def hash_oracle():
+    """The f of Grover.compute_fx as an OracleProgram over 8 inputs and 4 ancillas.
+
+    The X gates around the (0, 1) Toffoli are folded into its ctrl_state.
+    """
+    ancilla_1, ancilla_2, ancilla_3, ancilla_4 = 8, 9, 10, 11
+    return OracleProgram(8, 4, [
+        ((2, 3), 0b11, ancilla_1),
+        ((4, 6), 0b11, ancilla_2),
+        ((ancilla_1, ancilla_2), 0b11, ancilla_4),
+        ((0, 1), 0b00, ancilla_3),
+        ((ancilla_3, ancilla_4), 0b11, RESULT),
+    ])
+
+
+def marked_states_oracle(num_inputs, states):
+    """Oracle marking the given basis states (Qiskit bit order, as measured).
+
+    One fully controlled X per state; at most one of them fires per input.
+    """
+    gates = [(tuple(range(num_inputs)), int(state), RESULT) for state in sorted(set(states))]
+    return OracleProgram(num_inputs, 0, gates)
+
+
+def optimal_iterations(num_solutions, num_inputs):
+    """Number of iterations maximising the success probability, None without solutions."""
+    if num_solutions == 0:
+        return None
+    theta = math.asin(math.sqrt(num_solutions / pow(2, num_inputs)))
+    return max(0, round(math.pi / (4 * theta) - 0.5))
+
+
+# --- Builder ---
+
+class GroverBuilder:
+    """Lays out and builds Grover circuits for one oracle.
+
+    Qubits are numbered inputs first, then the oracle ancillas, the result
+    qubit (if the oracle needs one), the phase and OR result qubits of the
+    kickback construction and the extra MCX ancillas. Measured bitstrings
+    therefore read the inputs in the usual Qiskit order.
+
+    Args:
+      num_inputs: Number of input qubits n; the search space is 2^n.
+      oracle: OracleProgram, or an oracle_finder config to compile.
+      ancilla_budget: Maximum number of qubits besides the inputs; None for
+        as many as the MCX strategy can use.
+      mcx_strategy: One of MCX_STRATEGIES.
+      construction: One of CONSTRUCTIONS.
+      uncomputation: One of UNCOMPUTATIONS; the measured ones add the
+        classical register UNCOMPUTE_REGISTER to the circuits.
+    """
+
+    def __init__(self, num_inputs, oracle, ancilla_budget=None, mcx_strategy="noancilla", construction="phase",
+                 uncomputation="reversible"):
+        if num_inputs < 2:
+            raise ValueError("Grover needs at least 2 input qubits.")
+        if mcx_strategy not in MCX_STRATEGIES:
+            raise ValueError(f"Unknown MCX strategy: {mcx_strategy}")
+        if construction not in CONSTRUCTIONS:
+            raise ValueError(f"Unknown construction: {construction}")
+        if uncomputation not in UNCOMPUTATIONS:
+            raise ValueError(f"Unknown uncomputation: {uncomputation}")
+        if not isinstance(oracle, OracleProgram):
+            oracle = compile_oracle(oracle, num_inputs)
+        if oracle.num_inputs != num_inputs:
+            raise ValueError(f"Oracle is over {oracle.num_inputs} inputs, not {num_inputs}.")
+        self.num_inputs = num_inputs
+        self.oracle = oracle
+        self.mcx_strategy = mcx_strategy
+        self.construction = construction
+        self.uncomputation = uncomputation
+        # Relative-phase gates rely on their mirror image, which measurement removes
+        self.computing_strategy = mcx_strategy
+        if mcx_strategy == "relative-phase" and uncomputation != "reversible":
+            self.computing_strategy = "clean"
+
+        # Phase shortcut: the result is written once, by the last gate
+        writes = [gate for gate in oracle.gates if gate[2] == RESULT]
+        self.phase_gate = None
+        if construction == "phase" and len(writes) == 1 and oracle.gates[-1][2] == RESULT:
+            self.phase_gate = oracle.gates[-1]
+            self._oracle_body = OracleProgram(num_inputs, oracle.num_ancillas, oracle.gates[:-1])
+
+        kickback = construction == "kickback"
+        required = oracle.num_ancillas + (0 if self.phase_gate else 1) + (2 if kickback else 0)
+        if ancilla_budget is not None and ancilla_budget < required:
+            raise ValueError(f"Oracle needs {required} ancillas, the budget is {ancilla_budget}.")
+
+        if kickback:
+            # The OR of the inputs borrows the oracle ancillas and the result, which
+            # are |0> there, and a dirty chain also the phase qubit
+            wanted = mcx_ancillas_wanted(num_inputs, self.computing_strategy) - oracle.num_ancillas - 1
+            if self.computing_strategy == "dirty":
+                wanted -= 1
+        else:
+            # The diffusion can borrow every non-input qubit, they are all |0> there.
+            # The phase gate runs while the oracle ancillas hold values, so a clean
+            # chain needs qubits of its own while a dirty one can borrow the rest.
+            diffusion_strategy = unmirrored_strategy(mcx_strategy)
+            wanted = mcx_ancillas_wanted(num_inputs - 1, diffusion_strategy) - required
+            if self.phase_gate and len(self.phase_gate[0]) > 1:
+                num_controls = len(self.phase_gate[0]) - 1
+                phase_wanted = mcx_ancillas_wanted(num_controls, diffusion_strategy)
+                if diffusion_strategy == "dirty":
+                    phase_wanted -= num_inputs + oracle.num_ancillas - num_controls - 1
+                wanted = max(wanted, phase_wanted)
+        extra = max(wanted, 0)
+        if ancilla_budget is not None:
+            extra = min(extra, ancilla_budget - required)
+
+        self.input_qubits = list(range(num_inputs))
+        self.oracle_ancillas = list(range(num_inputs, num_inputs + oracle.num_ancillas))
+        next_qubit = num_inputs + oracle.num_ancillas
+        self.result_qubit = None
+        if not self.phase_gate:
+            self.result_qubit = next_qubit
+            next_qubit += 1
+        self.phase_qubit = self.or_result_qubit = None
+        if kickback:
+            self.phase_qubit, self.or_result_qubit = next_qubit, next_qubit + 1
+            next_qubit += 2
+        self.mcx_ancillas = list(range(next_qubit, next_qubit + extra))
+        self.num_qubits = next_qubit + extra
+
+        # Bit of the uncompute register that receives each measured ancilla's outcome
+        measured = self.oracle_ancillas + [q for q in (self.result_qubit, self.or_result_qubit) if q is not None]
+        self.uncompute_bits = {qubit: bit for bit, qubit in enumerate(measured)}
+
+    @property
+    def qubit_map(self):
+        return {
+            "inputs": self.input_qubits,
+            "oracle_ancillas": self.oracle_ancillas,
+            "result": self.result_qubit,
+            "phase": self.phase_qubit,
+            "or_result": self.or_result_qubit,
+            "mcx_ancillas": self.mcx_ancillas,
+        }
+
+    def marked(self):
+        """Indices of the marked inputs, evaluated classically."""
+        circ = QuantumCircuit(self.num_qubits + (1 if self.result_qubit is None else 0))
+        result_qubit = self.result_qubit if self.result_qubit is not None else self.num_qubits
+        self.oracle.compute(circ, self.input_qubits, self.oracle_ancillas, result_qubit)
+        return [int(i) for i, bit in enumerate(truth_table(circ, result_qubit, self.input_qubits)) if bit]
+
+    def optimal_t(self):
+        return optimal_iterations(len(self.marked()), self.num_inputs)
+
+    def new_circuit(self, measure=True):
+        if measure:
+            return QuantumCircuit(self.num_qubits, self.num_inputs)
+        return QuantumCircuit(self.num_qubits)
+
+    def prepare(self, circ):
+        """Puts the inputs in an equal superposition."""
+        circ.h(self.input_qubits)
+        circ.barrier()
+
+    def _mcz(self, circ, controls, ctrl_state, ancillas):
+        """Phase -1 on the basis states where controls match ctrl_state."""
+        flipped = [q for k, q in enumerate(controls) if not (ctrl_state >> k) & 1]
+        if flipped:
+            circ.x(flipped)
+        if not controls:
+            circ.global_phase += math.pi
+        elif len(controls) == 1:
+            circ.z(controls[0])
+        elif len(controls) == 2:
+            circ.cz(controls[0], controls[1])
+        else:
+            target = controls[-1]
+            circ.h(target)
+            apply_mcx(circ, controls[:-1], target, ancillas, unmirrored_strategy(self.mcx_strategy))
+            circ.h(target)
+        if flipped:
+            circ.x(flipped)
+
+    # --- Uncomputation ---
+    # An ancilla holding a = g(x) is freed by measuring it in the X basis: outcome 1
+    # leaves the phase (-1)^g(x) on the inputs, which a fixup gate conditioned on the
+    # outcome removes. For an AND of controls the fixup is a Z controlled on them,
+    # so the reversed Toffoli is replaced by a measurement and, half of the time, a CZ.
+
+    def uncompute_register(self, circ):
+        """The classical register for the ancilla outcomes, added to circ if missing."""
+        for creg in circ.cregs:
+            if creg.name == UNCOMPUTE_REGISTER:
+                return creg
+        creg = ClassicalRegister(len(self.uncompute_bits), UNCOMPUTE_REGISTER)
+        circ.add_register(creg)
+        return creg
+
+    def _measure_uncompute(self, circ, ancilla, fixup):
+        """Frees ancilla by an X-basis measurement; fixup(circ) appends the phase
+        correction applied when the outcome is 1."""
+        bit = self.uncompute_register(circ)[self.uncompute_bits[ancilla]]
+        circ.h(ancilla)
+        circ.measure(ancilla, bit)
+        # The ancilla is back in |0> before the fixup, which may borrow it
+        if self.uncomputation == "reset":
+            circ.reset(ancilla)
+        with circ.if_test((bit, 1)):
+            if self.uncomputation == "measure":
+                circ.x(ancilla)
+            fixup(circ)
+
+    def _free(self, circ, controls, ctrl_state, target):
+        self._measure_uncompute(circ, target, lambda c: self._mcz(c, controls, ctrl_state, []))
+
+    def _uncompute_program(self, circ, program, result_qubit):
+        free = None if self.uncomputation == "reversible" else self._free
+        program.uncompute(circ, self.input_qubits, self.oracle_ancillas, result_qubit,
+                          self.computing_strategy == "relative-phase", free)
+
+    def compute_oracle(self, circ):
+        """Computes the oracle into the result qubit, which must start in |0>."""
+        self.oracle.compute(circ, self.input_qubits, self.oracle_ancillas, self.result_qubit,
+                            self.computing_strategy == "relative-phase")
+
+    def uncompute_oracle(self, circ):
+        """Returns the result qubit and the oracle ancillas to |0>."""
+        self._uncompute_program(circ, self.oracle, self.result_qubit)
+
+    def _or_ancillas(self):
+        """Ancillas the OR's MCX may borrow: the oracle ancillas and the result are
+        |0> around it, the phase qubit is |-> during the uncompute, so only a dirty
+        chain can use it."""
+        ancillas = self.oracle_ancillas + [self.result_qubit]
+        if self.computing_strategy == "dirty":
+            ancillas.append(self.phase_qubit)
+        return ancillas + self.mcx_ancillas
+
+    def _or_phase(self, circ):
+        """(-1)^OR(x) up to a global phase: an X-wrapped MCX onto the |-> phase qubit."""
+        circ.x(self.input_qubits)
+        ancillas = self.oracle_ancillas + [self.result_qubit, self.or_result_qubit] + self.mcx_ancillas
+        apply_mcx(circ, self.input_qubits, self.phase_qubit, ancillas, unmirrored_strategy(self.mcx_strategy))
+        circ.x(self.input_qubits)
+
+    def compute_or(self, circ):
+        """Computes the OR of the inputs into the OR result qubit, which must start in |0>."""
+        circ.x(self.input_qubits)
+        apply_mcx(circ, self.input_qubits, self.or_result_qubit, self._or_ancillas(), self.computing_strategy)
+        circ.x(self.input_qubits)
+        # NOT(AND(NOT x_i)) = OR(x_i)
+        circ.x(self.or_result_qubit)
+
+    def uncompute_or(self, circ):
+        """Returns the OR result qubit to |0>; the measured uncomputations need the
+        phase qubit in |-> for the fixup."""
+        if self.uncomputation != "reversible":
+            self._measure_uncompute(circ, self.or_result_qubit, self._or_phase)
+            return
+        circ.x(self.or_result_qubit)
+        circ.x(self.input_qubits)
+        apply_mcx(circ, self.input_qubits, self.or_result_qubit, self._or_ancillas(), self.computing_strategy,
+                  inverse=True)
+        circ.x(self.input_qubits)
+
+    # --- Grover operation ---
+
+    def _kickback(self, circ, source, control=None):
+        """Flips the sign where source is 1 (and control, if given) through the phase qubit."""
+        circ.x(self.phase_qubit)
+        circ.h(self.phase_qubit)
+        if control is None:
+            circ.cx(source, self.phase_qubit)
+        else:
+            circ.ccx(control, source, self.phase_qubit)
+
+    def oracle_phase(self, circ, control=None):
+        """Flips the sign of the marked inputs; only when control is 1, if given."""
+        if self.construction == "kickback":
+            self.compute_oracle(circ)
+            self._kickback(circ, self.result_qubit, control)
+            self.uncompute_oracle(circ)
+            circ.h(self.phase_qubit)
+            circ.x(self.phase_qubit)
+        elif control is not None:
+            raise ValueError("Only the kickback construction has a controlled iterate.")
+        elif self.phase_gate:
+            relative_phase = self.computing_strategy == "relative-phase"
+            self._oracle_body.compute(circ, self.input_qubits, self.oracle_ancillas, None, relative_phase)
+            controls, ctrl_state, _ = self.phase_gate
+            slots = self.input_qubits + self.oracle_ancillas
+            qubits = [slots[c] for c in controls]
+            ancillas = self.mcx_ancillas
+            if unmirrored_strategy(self.mcx_strategy) == "dirty":
+                ancillas = [q for q in range(self.num_qubits) if q not in qubits] + ancillas
+            self._mcz(circ, qubits, ctrl_state, ancillas)
+            self._uncompute_program(circ, self._oracle_body, None)
+        else:
+            self.compute_oracle(circ)
+            circ.z(self.result_qubit)
+            self.uncompute_oracle(circ)
+        circ.barrier()
+
+    def diffusion(self, circ, control=None):
+        """Inversion about the mean, up to a global phase; only when control is 1, if given."""
+        circ.h(self.input_qubits)
+        if self.construction == "kickback":
+            self.compute_or(circ)
+            self._kickback(circ, self.or_result_qubit, control)
+            self.uncompute_or(circ)
+            circ.h(self.phase_qubit)
+            circ.x(self.phase_qubit)
+        elif control is not None:
+            raise ValueError("Only the kickback construction has a controlled iterate.")
+        else:
+            ancillas = [q for q in range(self.num_inputs, self.num_qubits)]
+            self._mcz(circ, self.input_qubits, 0, ancillas)
+        circ.h(self.input_qubits)
+        circ.barrier()
+
+    def iteration(self, circ):
+        self.oracle_phase(circ)
+        self.diffusion(circ)
+
+    def controlled_iteration(self, circ, control):
+        """The kickback iterate controlled by the qubit control, for quantum counting.
+
+        Only the two kickbacks need the control: everything else undoes itself
+        when it is off. The measured uncomputations fix the phase whatever the
+        control, as the compute/uncompute pairs are not controlled either.
+        """
+        self.oracle_phase(circ, control)
+        self.diffusion(circ, control)
+
+    def measure(self, circ):
+        circ.measure(self.input_qubits, list(range(self.num_inputs)))
+
+    def snapshots(self, circ, t_max):
+        """Appends t_max iterations after prepare(), saving the input probabilities
+        after each of them, labelled "t_1" .. "t_{t_max}"."""
+        from qiskit_aer.library import SaveProbabilities
+
+        self.prepare(circ)
+        for t in range(1, t_max + 1):
+            self.iteration(circ)
+            circ.append(SaveProbabilities(self.num_inputs, label=f"t_{t}"), self.input_qubits)
+
+    def pieces(self):
+        """(prepare, iterate, measure) circuits for transpile_cache.transpile_repeated."""
+        prepare = self.new_circuit()
+        self.prepare(prepare)
+        iterate = self.new_circuit()
+        self.iteration(iterate)
+        measure = self.new_circuit()
+        self.measure(measure)
+        if self.uncomputation != "reversible":
+            # Every piece needs the same classical bits to be composed
+            for piece in (prepare, iterate, measure):
+                self.uncompute_register(piece)
+        return prepare, iterate, measure
+
+    def circuit(self, t, measure=True):
+        """The Grover circuit with t iterations."""
+        circ = self.new_circuit(measure)
+        self.prepare(circ)
+        for _ in range(t):
+            self.iteration(circ)
+        if measure:
+            self.measure(circ)
+        return circ
+
+    def build(self, t=None, measure=True):
+        """Builds the Grover circuit.
+
+        Args:
+          t: Number of iterations, defaults to optimal_t().
+          measure: Whether to measure the inputs at the end.
+
+        Returns:
+          (circuit, metadata) where metadata holds the qubit map, t, the
+          number of marked inputs and the optimal t.
+        """
+        marked = self.marked()
+        optimal_t = optimal_iterations(len(marked), self.num_inputs)
+        if t is None:
+            t = optimal_t or 0
+        circ = self.circuit(t, measure)
+        metadata = {
+            "num_inputs": self.num_inputs,
+            "num_qubits": self.num_qubits,
+            "qubits": self.qubit_map,
+            "mcx_strategy": self.mcx_strategy,
+            "construction": self.construction,
+            "uncomputation": self.uncomputation,
+            "t": t,
+            "num_marked": len(marked),
+            "optimal_t": optimal_t,
+        }
+        return circ, metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-inputs", type=int, default=8)
+    parser.add_argument("--max-inputs", type=int, default=20)
+    parser.add_argument("--t", type=int, default=1, help="Iterations to build (default 1)")
+    parser.add_argument("--mcx-strategy", choices=MCX_STRATEGIES, default="noancilla")
+    parser.add_argument("--ancilla-budget", type=int, default=None)
+    parser.add_argument("--construction", choices=CONSTRUCTIONS, default="phase")
+    parser.add_argument("--uncomputation", choices=UNCOMPUTATIONS, default="reversible")
+    args = parser.parse_args()
+
+    from qiskit import transpile
+    from qiskit_aer import AerSimulator
+
+    simulator = AerSimulator(method='statevector')
+    print(f"{'n':>3} {'qubits':>7} {'opt t':>6} {'build s':>8} {'transpile s':>12} {'simulate s':>11}")
+    for num_inputs in range(args.min_inputs, args.max_inputs + 1):
+        start = time.perf_counter()
+        builder = GroverBuilder(num_inputs, marked_states_oracle(num_inputs, [pow(2, num_inputs) - 1]),
+                                args.ancilla_budget, args.mcx_strategy, args.construction, args.uncomputation)
+        circ, metadata = builder.build(args.t)
+        built = time.perf_counter()
+        compiled = transpile(circ, simulator)
+        transpiled = time.perf_counter()
+        simulator.run(compiled, shots=1).result()
+        simulated = time.perf_counter()
+        print(f"{num_inputs:>3} {metadata['num_qubits']:>7} {metadata['optimal_t']:>6} {built - start:>8.3f} "
+              f"{transpiled - built:>12.3f} {simulated - transpiled:>11.3f}")
@@ -0,0 +1,100 @@
+"""Ancilla-free NumPy simulation of ideal Grover runs.
+
+The Aer circuit carries 7 ancillas that only ever hold classical values, so
+its statevector is 2^15 amplitudes for a 2^8 search. Without noise, Grover only
+needs the input amplitudes: Z_f is a sign flip on the marked states and
+H Z_or H is the inversion about the mean (2|s><s| - I). Starting from the
+uniform state the amplitudes stay real, so a float vector of length 2^n is
+enough, which also makes n = 20-26 feasible (512 MiB at n = 26 in float64,
+half of that in float32).
+
+The oracle is a classical predicate: a boolean mask, the indices of the marked
+states, or a compute circuit evaluated with reversible_sim.
+"""
+import numpy as np
+from qiskit import QuantumCircuit
+
+from reversible_sim import truth_table
+
+
+def marked_from_circuit(compute, num_qubits, input_qubits, result_qubit):
+    """Marked indices of a compute function such as Grover.compute_fx.
+
+    Indices follow Qiskit's bit order, so they match measured bitstrings.
+    """
+    circ = QuantumCircuit(num_qubits)
+    compute(circ)
+    return np.flatnonzero(truth_table(circ, result_qubit, input_qubits))
+
+
+def marked_from_predicate(predicate, num_inputs):
+    """Marked indices of a vectorized predicate over np.arange(2^num_inputs)."""
+    return np.flatnonzero(predicate(np.arange(pow(2, num_inputs), dtype=np.int64)))
+
+
+def _marked_indices(marked):
+    marked = np.asarray(marked)
+    return np.flatnonzero(marked) if marked.dtype == bool else marked.astype(np.int64)
+
+
+def grover_iterations(marked, num_inputs, t, dtype=np.float64):
+    """Yields the amplitude vector after each of t Grover iterations.
+
+    The same array is updated in place and yielded every time; copy it to keep
+    an intermediate state.
+    """
+    indices = _marked_indices(marked)
+    psi = np.full(pow(2, num_inputs), 1 / np.sqrt(pow(2, num_inputs)), dtype=dtype)
+    for _ in range(t):
+        # Z_f: flip the sign of the marked states
+        psi[indices] = -psi[indices]
+        # H Z_or H: inversion about the mean
+        mean = psi.mean(dtype=np.float64)
+        np.subtract(dtype(2 * mean), psi, out=psi)
+        yield psi
+
+
+def grover_state(marked, num_inputs, t, dtype=np.float64):
+    """Amplitudes of the input register after t iterations."""
+    psi = None
+    for psi in grover_iterations(marked, num_inputs, t, dtype):
+        pass
+    if psi is None:
+        psi = np.full(pow(2, num_inputs), 1 / np.sqrt(pow(2, num_inputs)), dtype=dtype)
+    return psi
+
+
+def probabilities(marked, num_inputs, t, dtype=np.float64):
+    """Measurement probabilities of every input state after t iterations."""
+    psi = grover_state(marked, num_inputs, t, dtype)
+    return np.square(psi, dtype=np.float64)
+
+
+def success_probability(marked, num_inputs, t, dtype=np.float64):
+    """Probability of measuring a marked state after t iterations."""
+    psi = grover_state(marked, num_inputs, t, dtype)
+    indices = _marked_indices(marked)
+    return float(np.sum(np.square(psi[indices], dtype=np.float64)))
+
+
+def sample_counts(probs, shots, rng=None):
+    """Counts per input state (length 2^n) for shots samples of probs."""
+    rng = np.random.default_rng(rng)
+    probs = np.asarray(probs, dtype=np.float64)
+    return rng.multinomial(shots, probs / probs.sum())
+
+
+def sample_outcomes(probs, shots, rng=None, batch_size=1 << 20):
+    """Yields batches of sampled outcomes (integer input states).
+
+    The cumulative distribution is built once, so every batch only costs a
+    binary search per shot.
+    """
+    rng = np.random.default_rng(rng)
+    cdf = np.cumsum(probs, dtype=np.float64)
+    remaining = shots
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        outcomes = np.searchsorted(cdf, rng.random(size) * cdf[-1], side='right')
+        yield np.minimum(outcomes, len(cdf) - 1)
+        remaining -= size
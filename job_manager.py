@@ -0,0 +1,313 @@
+"""Concurrent, resumable submission of sampler jobs.
+
+Blocking on job.result() one submission at a time wastes the queue time of
+every job after the first, and a run that dies while its jobs wait in the
+queue loses their ids and with them results that were already paid for.
+JobManager submits many batches of PUBs concurrently with asyncio and polls
+each job with a doubling interval. Every step is appended to a journal
+(JOURNAL_FILE):
+
+  * "submitted" with the batch key, job id, backend and metadata;
+  * "done" with the path of the saved result (RuntimeEncoder JSON under
+    RESULTS_DIR);
+  * "failed" with the final status or error.
+
+Batch keys start with a run id, new_run_id() once per invocation, so a new
+run always samples again. Resuming a run means passing its id again: the
+batches then reload the results of done jobs, wait for submitted jobs that
+can still be retrieved, and only submit the rest; JobManager.reloaded
+holds the keys whose results came from the journal, so callers do not
+store them twice. The rest of the key identifies the work, i.e. the
+backend, the logical circuits' hash, the compile settings and the shots
+(see batch_key()). The compiled circuits make poor keys: the layout search
+re-scores layouts with every calibration, so a resume after a calibration
+update would compile differently and pay for the batch again.
+
+Given a Telemetry, the manager records submit, queue_wait, execute and fetch
+of every job like telemetry.wait_for_job(), with the job id and batch key.
+
+Submissions go through an adapter: RuntimeAdapter wraps a SamplerV2 (and a
+QiskitRuntimeService to retrieve jobs of an earlier process), StandInAdapter
+runs locally on AerSimulator and can hold every job in an artificial queue
+for offline testing:
+
+    python job_manager.py --stand-in --queue-delay 1 5 --t 1 2 3 4
+    python job_manager.py --stand-in --t 1 2 3 4 --resume <run id>
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+
+from telemetry import FINAL_STATUSES, job_metrics, record_wait, status_name
+from transpile_cache import circuit_hash
+
+# Default journal and result locations
+JOURNAL_FILE = "./results/jobs/journal.jsonl"
+RESULTS_DIR = "./results/jobs/results"
+
+
+def new_run_id():
+    """A fresh run id for batch_key(), sortable by start time."""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def batch_key(run_id, backend_name, circuits, shots, **config):
+    """Key of the same circuits, compiled with the same config and run with the same shots on the same backend,
+    within run run_id."""
+    digest = hashlib.sha256()
+    for circ in circuits:
+        digest.update(circuit_hash(circ).encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return f"{run_id}-{backend_name}-{shots}-{digest.hexdigest()[:16]}"
+
+
+class Batch:
+    """PUBs to run as one job, identified by key."""
+
+    def __init__(self, key, pubs, shots, **metadata):
+        self.key = key
+        self.pubs = pubs
+        self.shots = shots
+        self.metadata = metadata
+
+
+class RuntimeAdapter:
+    """Submits through a SamplerV2; service, if given, retrieves jobs by id after a restart."""
+
+    def __init__(self, sampler, service=None):
+        self.sampler = sampler
+        self.service = service
+        self.jobs = {}
+
+    @property
+    def backend_name(self):
+        return self.sampler.backend().name
+
+    def submit(self, pubs, shots):
+        job = self.sampler.run(pubs, shots=shots)
+        self.jobs[job.job_id()] = job
+        return job.job_id()
+
+    def retrieve(self, job_id):
+        """Whether job_id can be polled, fetching it from the service when it is not known here."""
+        if job_id not in self.jobs and self.service is not None:
+            try:
+                self.jobs[job_id] = self.service.job(job_id)
+            except Exception:
+                return False
+        return job_id in self.jobs
+
+    def status(self, job_id):
+        return status_name(self.jobs[job_id].status())
+
+    def result(self, job_id):
+        return self.jobs[job_id].result()
+
+    def metrics(self, job_id):
+        return job_metrics(self.jobs[job_id])
+
+
+class StandInAdapter(RuntimeAdapter):
+    """Runs on a local simulator, holding every job QUEUED for a random delay first.
+
+    Jobs only live in this process, so after a restart submitted but unfinished
+    jobs are submitted again, while done ones are reloaded from the journal.
+    """
+
+    def __init__(self, backend=None, queue_delay=(0.0, 0.0), seed=None):
+        from backends import local_backend, make_sampler
+
+        super().__init__(make_sampler(backend or local_backend()))
+        self.queue_delay = queue_delay
+        self.rng = random.Random(seed)
+        self.pending = {}
+
+    def submit(self, pubs, shots):
+        job_id = "standin-" + uuid.uuid4().hex
+        self.pending[job_id] = (time.monotonic() + self.rng.uniform(*self.queue_delay), pubs, shots)
+        return job_id
+
+    def retrieve(self, job_id):
+        return job_id in self.pending or job_id in self.jobs
+
+    def status(self, job_id):
+        if job_id in self.pending:
+            release, pubs, shots = self.pending[job_id]
+            if time.monotonic() < release:
+                return "QUEUED"
+            del self.pending[job_id]
+            self.jobs[job_id] = self.sampler.run(pubs, shots=shots)
+        return super().status(job_id)
+
+
+class JobManager:
+    """Runs batches through adapter concurrently, journaling every submission and result."""
+
+    def __init__(self, adapter, journal_path=JOURNAL_FILE, results_dir=RESULTS_DIR, poll_interval=0.05,
+                 max_poll_interval=30.0, max_concurrent=8, telemetry=None):
+        self.adapter = adapter
+        self.telemetry = telemetry
+        self.journal_path = journal_path
+        self.results_dir = results_dir
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_concurrent = max_concurrent
+        # Keys of the batches whose results were reloaded from the journal
+        self.reloaded = set()
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        os.makedirs(results_dir, exist_ok=True)
+
+    def _log(self, event, key, **fields):
+        entry = {"event": event, "key": key, "time": time.time(), **fields}
+        with open(self.journal_path, 'a') as f_journal:
+            f_journal.write(json.dumps(entry) + "\n")
+        return entry
+
+    def journal(self):
+        """The last journal entry of every batch key."""
+        if not os.path.exists(self.journal_path):
+            return {}
+        latest = {}
+        with open(self.journal_path) as f_journal:
+            for line in f_journal:
+                if line.strip():
+                    entry = json.loads(line)
+                    latest[entry["key"]] = entry
+        return latest
+
+    def _save_result(self, job_id, result):
+        from qiskit_ibm_runtime import RuntimeEncoder
+
+        path = os.path.join(self.results_dir, job_id + ".json")
+        with open(path + ".tmp", 'w') as f_result:
+            json.dump(result, f_result, cls=RuntimeEncoder)
+        os.replace(path + ".tmp", path)
+        return path
+
+    @staticmethod
+    def load_result(path):
+        from qiskit_ibm_runtime import RuntimeDecoder
+
+        with open(path) as f_result:
+            return json.load(f_result, cls=RuntimeDecoder)
+
+    async def _wait(self, job_id, key):
+        """Final status of job_id, recording its queue_wait and execute."""
+        interval = self.poll_interval
+        start = time.perf_counter()
+        running = None
+        waiting = start
+        while True:
+            status = await asyncio.to_thread(self.adapter.status, job_id)
+            now = time.perf_counter()
+            if status == "RUNNING" and running is None:
+                running = now
+            if status in FINAL_STATUSES:
+                break
+            if running is None:
+                waiting = now
+            await asyncio.sleep(interval)
+            interval = min(2 * interval, self.max_poll_interval)
+        if self.telemetry is not None:
+            metrics = await asyncio.to_thread(self.adapter.metrics, job_id)
+            record_wait(self.telemetry, start, now, running, waiting, status, metrics, job_id=job_id, batch=key)
+        return status
+
+    def _record(self, stage, seconds, **fields):
+        if self.telemetry is not None:
+            self.telemetry.record(stage, seconds, **fields)
+
+    async def run_batch(self, batch, previous=None, semaphore=None):
+        """Result of one batch, reusing its journaled job or result when there is one."""
+        if previous and previous["event"] == "done" and os.path.exists(previous["result"]):
+            start = time.perf_counter()
+            result = self.load_result(previous["result"])
+            self._record("fetch", time.perf_counter() - start, job_id=previous["job_id"], batch=batch.key,
+                         journaled=True)
+            self.reloaded.add(batch.key)
+            return result
+        async with semaphore or asyncio.Semaphore(1):
+            retrieved = (previous and previous["event"] == "submitted"
+                         and await asyncio.to_thread(self.adapter.retrieve, previous["job_id"]))
+            if retrieved:
+                job_id = previous["job_id"]
+            else:
+                start = time.perf_counter()
+                job_id = await asyncio.to_thread(self.adapter.submit, batch.pubs, batch.shots)
+                self._record("submit", time.perf_counter() - start, job_id=job_id, batch=batch.key)
+                self._log("submitted", batch.key, job_id=job_id, backend=self.adapter.backend_name,
+                          shots=batch.shots, metadata=batch.metadata)
+            status = await self._wait(job_id, batch.key)
+            if status != "DONE":
+                self._log("failed", batch.key, job_id=job_id, status=status)
+                raise RuntimeError(f"Job {job_id} of batch {batch.key} ended as {status}")
+            start = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(self.adapter.result, job_id)
+            except Exception as e:
+                self._log("failed", batch.key, job_id=job_id, status=status, error=f"{type(e).__name__}: {e}")
+                raise
+            self._record("fetch", time.perf_counter() - start, job_id=job_id, batch=batch.key)
+        self._log("done", batch.key, job_id=job_id, result=self._save_result(job_id, result))
+        return result
+
+    async def run_all(self, batches):
+        """Results of all batches, in order; a failed batch gives its exception instead."""
+        journal = self.journal()
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        return await asyncio.gather(*(self.run_batch(batch, journal.get(batch.key), semaphore)
+                                      for batch in batches), return_exceptions=True)
+
+    def run(self, batches):
+        """Blocking run_all()."""
+        return asyncio.run(self.run_all(batches))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--t", type=int, nargs="+", default=[1, 2, 3, 4, 5, 6])
+    parser.add_argument("--shots", type=int, default=1024)
+    parser.add_argument("--stand-in", action="store_true", help="Run on a local AerSimulator stand-in")
+    parser.add_argument("--queue-delay", type=float, nargs=2, default=[0.0, 0.0], metavar=("MIN", "MAX"))
+    parser.add_argument("--journal", default=JOURNAL_FILE)
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume this run instead of sampling again")
+    args = parser.parse_args()
+
+    from qiskit import transpile
+
+    from Grover import Grover_circuit
+
+    if args.stand_in:
+        adapter = StandInAdapter(queue_delay=args.queue_delay)
+    else:
+        from qiskit_ibm_runtime import QiskitRuntimeService
+
+        from backends import ibm_backend, make_sampler
+        device = ibm_backend()
+        adapter = RuntimeAdapter(make_sampler(device), QiskitRuntimeService())
+    backend = adapter.sampler.backend()
+    run_id = args.resume or new_run_id()
+    print(f"Run {run_id}")
+    batches = []
+    for t in args.t:
+        circ = Grover_circuit(t)
+        compiled = transpile(circ, backend, optimization_level=1, seed_transpiler=0)
+        batches.append(Batch(batch_key(run_id, backend.name, [circ], args.shots, optimization_level=1), [compiled], args.shots,
+                             t=t))
+
+    start = time.perf_counter()
+    manager = JobManager(adapter, args.journal)
+    results = manager.run(batches)
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            print(f"t={batch.metadata['t']}: failed: {result}")
+        else:
+            counts = result[0].data.c.get_counts()
+            source = " (journaled)" if batch.key in manager.reloaded else ""
+            print(f"t={batch.metadata['t']}: most frequent {max(counts, key=counts.get)}{source}")
+    print(f"{len(batches)} batches in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,158 @@
+"""Multi-seed layout and routing search for hardware runs.
+
+Routing the Grover circuit onto heavy-hex coupling inserts a number of swaps
+that depends strongly on seed_transpiler and on the initial layout, and the
+two-qubit gate count decides whether a hardware histogram shows the marked
+states at all. search_layouts() transpiles many candidates in a process pool
+and keeps the one with the highest estimated fidelity:
+
+  * estimated_fidelity() multiplies (1 - error) over every gate and
+    measurement of the compiled circuit, with the error rates the backend
+    reports in its target;
+  * the candidates are seeds 0..n-1 with the transpiler's own layout, plus
+    the best initial layouts logged for the same circuit and backend, so a
+    good layout found once is tried again on every later run;
+  * every candidate is appended to LAYOUT_LOG with its seed, layout, two-qubit
+    count, depth, estimated fidelity and compile time.
+
+    python layout_search.py --seeds 32
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+from qiskit import transpile
+
+from pools import process_pool
+from transpile_cache import circuit_hash
+
+# Log of every compiled candidate
+LAYOUT_LOG = "./results/layout_search.jsonl"
+
+
+def estimated_fidelity(compiled, target):
+    """Product of (1 - error) over the gates and measurements of compiled.
+
+    Operations without a reported error (barriers, virtual rz, simulators)
+    count as perfect. Returns (fidelity, log fidelity); the log stays finite
+    where the product underflows.
+    """
+    log_fidelity = 0.0
+    for instruction in compiled.data:
+        name = instruction.operation.name
+        if name == "barrier" or name not in target.operation_names:
+            continue
+        qargs = tuple(compiled.find_bit(q).index for q in instruction.qubits)
+        properties = target[name].get(qargs) if qargs in target[name] else None
+        error = getattr(properties, "error", None)
+        if error:
+            log_fidelity += math.log1p(-min(error, 1 - 1e-12))
+    return math.exp(log_fidelity), log_fidelity
+
+
+def two_qubit_count(compiled):
+    return sum(1 for instruction in compiled.data
+               if instruction.operation.num_qubits == 2 and instruction.operation.name != "barrier")
+
+
+def _compile_candidate(circ, target, optimization_level, seed, initial_layout):
+    start = time.perf_counter()
+    compiled = transpile(circ, target=target, optimization_level=optimization_level,
+                         seed_transpiler=seed, initial_layout=initial_layout)
+    seconds = time.perf_counter() - start
+    fidelity, log_fidelity = estimated_fidelity(compiled, target)
+    # Targets without a coupling map (simulators) are not laid out
+    layout = compiled.layout.initial_index_layout(filter_ancillas=True) if compiled.layout else None
+    return compiled, {
+        "seed": seed,
+        "initial_layout": layout,
+        "given_layout": initial_layout is not None,
+        "two_qubit": two_qubit_count(compiled),
+        "depth": compiled.depth(),
+        "estimated_fidelity": fidelity,
+        "log_fidelity": log_fidelity,
+        "compile_seconds": seconds,
+    }
+
+
+def logged_layouts(key, backend_name, limit=4, log_path=LAYOUT_LOG):
+    """The best distinct (seed, initial layout) pairs logged for a circuit hash and backend."""
+    if not log_path or not os.path.exists(log_path):
+        return []
+    with open(log_path) as f_log:
+        records = [json.loads(line) for line in f_log if line.strip()]
+    records = [record for record in records if record["circuit"] == key and record["backend"] == backend_name]
+    best = []
+    for record in sorted(records, key=lambda record: record["log_fidelity"], reverse=True):
+        layout = record["initial_layout"]
+        if layout is not None and layout not in [known for _, known in best]:
+            best.append((record["seed"], layout))
+        if len(best) == limit:
+            break
+    return best
+
+
+def search_layouts(circ, backend, seeds=16, optimization_level=3, workers=None, reuse=True, log_path=LAYOUT_LOG):
+    """Transpiles circ for backend with many seeds and layouts; returns (best compiled, candidates).
+
+    Args:
+      circ: The circuit to compile.
+      backend: Target backend; its target supplies the error rates.
+      seeds: Number of seeds tried with the transpiler's own layout.
+      optimization_level: Transpiler optimization level of every candidate.
+      workers: Process pool size, None for one per CPU.
+      reuse: Also try the best layouts logged for this circuit and backend.
+      log_path: JSONL log of the candidates, None to not log them.
+
+    Returns:
+      The compiled circuit with the highest estimated fidelity (fewest two-qubit
+      gates on a tie) and the candidate records, best first.
+    """
+    key = circuit_hash(circ)
+    candidates = [(seed, None) for seed in range(seeds)]
+    if reuse:
+        candidates += logged_layouts(key, backend.name, log_path=log_path)
+    target = backend.target
+    with process_pool(workers) as pool:
+        futures = [pool.submit(_compile_candidate, circ, target, optimization_level, seed, layout)
+                   for seed, layout in candidates]
+        results = [future.result() for future in futures]
+
+    results.sort(key=lambda result: (-result[1]["log_fidelity"], result[1]["two_qubit"]))
+    records = []
+    for _, record in results:
+        records.append({"circuit": key, "backend": backend.name, "optimization_level": optimization_level,
+                        "time": time.time(), **record})
+    if log_path:
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        with open(log_path, 'a') as f_log:
+            for record in records:
+                f_log.write(json.dumps(record) + "\n")
+    return results[0][0], records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=16)
+    parser.add_argument("--t", type=int, default=6)
+    parser.add_argument("--optimization-level", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--ibm", action="store_true", help="Use the least busy IBM device instead of FakeSherbrooke")
+    args = parser.parse_args()
+
+    from Grover import Grover_circuit
+
+    if args.ibm:
+        from backends import ibm_backend
+        backend = ibm_backend()
+    else:
+        from qiskit_ibm_runtime.fake_provider import FakeSherbrooke
+        backend = FakeSherbrooke()
+    compiled, records = search_layouts(Grover_circuit(args.t), backend, args.seeds, args.optimization_level,
+                                       args.workers)
+    for record in records:
+        print(f"seed {record['seed']:>3}{' (logged layout)' if record['given_layout'] else '':<16} "
+              f"two-qubit {record['two_qubit']:>5}  depth {record['depth']:>6}  "
+              f"fidelity {record['estimated_fidelity']:.3e}  {record['compile_seconds']:.2f} s")
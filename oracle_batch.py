@@ -0,0 +1,196 @@
+"""Screening many oracles with one job.
+
+Grover.py runs the one oracle wired into compute_fx, so comparing candidate
+oracles from oracle_finder.py or the configs noted in go/oracle.go costs a
+build, transpile and submission each. OracleBatch lays out one Grover
+template for a whole list of oracles: every oracle is compiled
+(oracle_compiler) and padded to the ancilla count of the largest one, so the
+grover_builder.GroverBuilder of each oracle puts it on the same fixed qubits
+and the oracles are interchangeable pieces of the template:
+
+  * the prepare, diffusion and measure pieces come from the builder with the
+    most qubits, are transpiled once and shared;
+  * each oracle piece (its builder's oracle_phase) is transpiled once on the
+    same layout and stitched with the diffusion t times, t being the
+    oracle's optimal number of iterations unless given; pieces that routing
+    leaves permuted are followed by the swaps that undo it;
+  * all circuits go out as one batch of PUBs, and the result is each
+    oracle's measured success probability next to its ideal one.
+
+Oracle wiring cannot be a circuit parameter (it decides which qubits the
+Toffolis act on), so the oracles are swapped in as pre-transpiled pieces
+instead of being bound to a parameterized circuit.
+
+    python oracle_batch.py --go
+    python oracle_batch.py --random 24 --seed 0
+"""
+import argparse
+
+import numpy as np
+
+from bit_counts import bincount, success_probability
+from grover_builder import GroverBuilder, optimal_iterations
+from ideal_grover import success_probability as ideal_success_probability
+from oracle_compiler import OracleProgram, compile_oracle
+from oracle_finder import TARGET_WIRES, batch_hits, random_configs
+from transpile_cache import transpile_pieces
+
+# Configs noted as good in go/oracle.go (8 and 4 hits). The note's "output 5"
+# config is left out: Oracle() never applied its output size fold, and under
+# the hit test of main() that config marks no input.
+GO_CONFIGS = [
+    [[3, 1, 1, 6], [1, 3, 0, 7], [2, 3, 7, 6], [0, 2, 4, 2], [3, 0, 6, 0], [0, 4, 5, 5], [3, 7, 5, 3], [0, 7, 2, 6],
+     [3, 2, 4, 7], [2, 7, 1, 7], [2, 3, 4, 5], [3, 1, 3, 4], [3, 2, 1, 6], [1, 5, 3, 2], [0, 3, 2, 0], [3, 1, 4, 6]],
+    [[2, 2, 4, 7], [1, 4, 4, 1], [1, 6, 5, 4], [3, 6, 3, 7], [1, 4, 7, 5], [2, 0, 2, 5], [0, 2, 6, 6], [2, 2, 1, 6],
+     [0, 1, 4, 7], [2, 3, 7, 2], [0, 7, 3, 1], [1, 2, 4, 6], [2, 4, 4, 1], [2, 4, 7, 2], [2, 0, 0, 7], [0, 1, 6, 7]],
+    [[2, 4, 6, 3], [2, 1, 3, 3], [2, 2, 3, 6], [1, 2, 5, 3]],
+    [[0, 2, 3, 1], [0, 5, 7, 2], [2, 3, 2, 5], [2, 5, 6, 5], [3, 1, 6, 6], [2, 7, 4, 7]],
+    [[1, 3, 1, 2], [1, 4, 5, 4], [1, 4, 2, 3], [0, 3, 3, 5]],
+]
+
+# Wire k is bit k of the input in go/oracle.go, and main() counts a hit when
+# output&0b11100000 == 0, i.e. bits 5-7 are 0
+GO_TARGET_WIRES = (5, 6, 7)
+
+
+def go_oracle(confs):
+    """Compiles a config of go/oracle.go into an OracleProgram over 8 inputs."""
+    return compile_oracle(confs, 8, GO_TARGET_WIRES)
+
+
+class OracleBatch:
+    """One Grover template for several oracles over the same inputs.
+
+    Args:
+      oracles: OraclePrograms or oracle_finder configs (compiled with
+        target_wires).
+      num_inputs: Number of input qubits.
+      target_wires: Target wires used to compile configs.
+      mcx_strategy: Strategy of the MCX gates, see grover_builder.
+    """
+
+    def __init__(self, oracles, num_inputs=8, target_wires=TARGET_WIRES, mcx_strategy="noancilla"):
+        programs = [oracle if isinstance(oracle, OracleProgram) else compile_oracle(oracle, num_inputs, target_wires)
+                    for oracle in oracles]
+        num_ancillas = max(program.num_ancillas for program in programs)
+        # Padded to the same ancillas, every builder lays its oracle out on the same qubits
+        self.builders = [GroverBuilder(num_inputs, OracleProgram(num_inputs, num_ancillas, program.gates),
+                                       mcx_strategy=mcx_strategy) for program in programs]
+        self.template = max(self.builders, key=lambda builder: builder.num_qubits)
+        self.num_inputs = num_inputs
+        self.num_qubits = self.template.num_qubits
+        self.input_qubits = self.template.input_qubits
+
+    def new_circuit(self):
+        return self.template.new_circuit()
+
+    def marked(self, index):
+        """Input states marked by oracle index."""
+        return self.builders[index].marked()
+
+    def prepare(self):
+        circ = self.new_circuit()
+        self.template.prepare(circ)
+        return circ
+
+    def oracle_phase(self, index):
+        """Sign flip of the states marked by oracle index, leaving the ancillas |0>."""
+        circ = self.new_circuit()
+        self.builders[index].oracle_phase(circ)
+        return circ
+
+    def diffusion(self):
+        """Inversion about the mean, borrowing every |0> non-input qubit of the template."""
+        circ = self.new_circuit()
+        self.template.diffusion(circ)
+        return circ
+
+    def measure(self):
+        circ = self.new_circuit()
+        self.template.measure(circ)
+        return circ
+
+    def iterations(self, t=None):
+        """Per-oracle t: the given one, or the oracle's optimal t (1 without marked states)."""
+        if t is not None:
+            return [t] * len(self.builders)
+        return [optimal_iterations(len(self.marked(index)), self.num_inputs) or 1 for index in range(len(self.builders))]
+
+    def circuit(self, index, t):
+        """The untranspiled Grover circuit of oracle index."""
+        circ = self.prepare()
+        for _ in range(t):
+            circ.compose(self.oracle_phase(index), inplace=True)
+            circ.compose(self.diffusion(), inplace=True)
+        circ.compose(self.measure(), inplace=True)
+        return circ
+
+    def compile(self, backend, t=None, optimization_level=1, **options):
+        """Transpiled circuits of every oracle, sharing the compiled prepare, diffusion and measure.
+
+        Every piece is transpiled once on the diffusion's layout, with the swaps
+        that undo its routing permutation (transpile_cache.transpile_pieces), and
+        each oracle's circuit is stitched from the compiled pieces. Extra keyword
+        arguments go to transpile_pieces.
+        """
+        pieces = [self.diffusion(), self.prepare(), self.measure()]
+        pieces += [self.oracle_phase(index) for index in range(len(self.builders))]
+        diffusion, prepare, measure, *oracles = transpile_pieces(pieces, backend, optimization_level, **options)
+        compiled = []
+        for oracle, t_index in zip(oracles, self.iterations(t)):
+            full = prepare.copy()
+            for _ in range(t_index):
+                full.compose(oracle, inplace=True)
+                full.compose(diffusion, inplace=True)
+            full.compose(measure, inplace=True)
+            compiled.append(full)
+        return compiled
+
+    def screen(self, sampler, backend, shots=1024, t=None, optimization_level=1):
+        """Runs every oracle as one job; returns one dict per oracle with its measured and ideal success."""
+        iterations = self.iterations(t)
+        compiled = self.compile(backend, t, optimization_level)
+        result = sampler.run(compiled, shots=shots).result()
+        rows = []
+        for index, (pub_result, circ, t_index) in enumerate(zip(result, compiled, iterations)):
+            marked = self.marked(index)
+            counts = bincount(pub_result.data.c)
+            rows.append({
+                "oracle": index,
+                "hits": len(marked),
+                "t": t_index,
+                "success": success_probability(counts, marked) if marked else 0.0,
+                "ideal_success": float(ideal_success_probability(marked, self.num_inputs, t_index)) if marked else 0.0,
+                "two_qubit": sum(1 for instruction in circ.data if instruction.operation.num_qubits == 2
+                                 and instruction.operation.name != "barrier"),
+                "depth": circ.depth(),
+            })
+        return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--go", action="store_true", help="Screen the configs noted in go/oracle.go")
+    parser.add_argument("--random", type=int, default=0, help="Screen this many random configs with 1-16 hits")
+    parser.add_argument("--num-iter", type=int, default=16, help="Operations per random config")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--t", type=int, default=None, help="Iterations for every oracle (default: each one's optimal)")
+    parser.add_argument("--shots", type=int, default=1024)
+    parser.add_argument("--optimization-level", type=int, default=1)
+    args = parser.parse_args()
+
+    from backends import make_backend
+
+    if args.go:
+        oracles = [go_oracle(confs) for confs in GO_CONFIGS]
+    else:
+        rng = np.random.default_rng(args.seed)
+        candidates = random_configs(rng, 50 * max(args.random, 1), args.num_iter)
+        hits = batch_hits(candidates)
+        oracles = [confs.tolist() for confs in candidates[(hits >= 1) & (hits <= 16)][:args.random]]
+    batch = OracleBatch(oracles)
+    backend, sampler = make_backend(True)
+    print(f"{len(oracles)} oracles on {batch.num_qubits} qubits")
+    for row in batch.screen(sampler, backend, args.shots, args.t, args.optimization_level):
+        print(f"oracle {row['oracle']:>3}: {row['hits']:>2} hits, t={row['t']:>2}, success {row['success']:.3f} "
+              f"(ideal {row['ideal_success']:.3f}), {row['two_qubit']} two-qubit gates")
@@ -0,0 +1,280 @@
+"""Compiles oracle_finder configs into reversible compute/uncompute circuits.
+
+A config is a list of [operation_type, param_1, param_2, param_3] ops on wires
+(NOT, AND, OR, XOR, see oracle_finder.oracle). The oracle marks an input when
+all TARGET_WIRES end up 0. The compiler turns such a config into a gate list
+that computes the mark into a result qubit, and mirrors it to uncompute:
+
+  * gates that cannot reach the target wires are dropped;
+  * NOT and copies cost nothing: each wire value carries a polarity that is
+    folded into the ctrl_state of the gates reading it;
+  * XOR is a CX into the operand's qubit when that old value is no longer
+    needed, otherwise two CXs into a fresh ancilla;
+  * OR is De Morgan: one Toffoli on the negated operands, with the result
+    polarity flipped instead of an extra X;
+  * with reuse_ancillas, an ancilla whose value is dead is uncomputed on the
+    spot (when its operands are still intact) and handed to the next gate.
+"""
+from oracle_finder import AND, NOT, OR, TARGET_WIRES, XOR, live_gates
+
+
+class OracleProgram:
+    """A reversible oracle as gates over logical slots.
+
+    Slots 0..num_inputs-1 are the input qubits and num_inputs.. are ancillas.
+    The result is written to a separate qubit. Each gate is a
+    (controls, ctrl_state, target) tuple, i.e. an X with any number of
+    controls; ctrl_state bit k selects whether controls[k] must be 1 or 0.
+    """
+
+    def __init__(self, num_inputs, num_ancillas, gates):
+        self.num_inputs = num_inputs
+        self.num_ancillas = num_ancillas
+        self.gates = gates
+
+    @property
+    def num_toffolis(self):
+        """Gates with two or more controls."""
+        return sum(1 for controls, _, _ in self.gates if len(controls) >= 2)
+
+    @property
+    def num_cx(self):
+        return sum(1 for controls, _, _ in self.gates if len(controls) == 1)
+
+    def _slot_map(self, input_qubits, ancilla_qubits, result_qubit):
+        if len(input_qubits) != self.num_inputs:
+            raise ValueError(f"Oracle needs {self.num_inputs} input qubits, got {len(input_qubits)}.")
+        if len(ancilla_qubits) < self.num_ancillas:
+            raise ValueError(f"Oracle needs {self.num_ancillas} ancillas, got {len(ancilla_qubits)}.")
+        return list(input_qubits) + list(ancilla_qubits)[:self.num_ancillas] + [result_qubit]
+
+    def _emit(self, circ, gates, slots, relative_phase=False):
+        for controls, ctrl_state, target in gates:
+            qubits = [slots[c] for c in controls]
+            if not controls:
+                circ.x(slots[target])
+            elif len(controls) == 1:
+                circ.cx(qubits[0], slots[target], ctrl_state=ctrl_state)
+            elif len(controls) == 2 and relative_phase:
+                flipped = [q for k, q in enumerate(qubits) if not (ctrl_state >> k) & 1]
+                if flipped:
+                    circ.x(flipped)
+                circ.rccx(qubits[0], qubits[1], slots[target])
+                if flipped:
+                    circ.x(flipped)
+            elif len(controls) == 2:
+                circ.ccx(qubits[0], qubits[1], slots[target], ctrl_state=ctrl_state)
+            else:
+                circ.mcx(qubits, slots[target], ctrl_state=ctrl_state)
+
+    def compute(self, circ, input_qubits, ancilla_qubits, result_qubit, relative_phase=False):
+        """Computes the oracle into result_qubit, which must start in |0>.
+
+        relative_phase emits the Toffolis as relative-phase Toffolis, which is
+        only valid when uncompute() mirrors them the same way.
+        """
+        self._emit(circ, self.gates, self._slot_map(input_qubits, ancilla_qubits, result_qubit), relative_phase)
+
+    def uncompute(self, circ, input_qubits, ancilla_qubits, result_qubit, relative_phase=False, free=None):
+        """Mirror of compute(): every gate is self-inverse, so replay them backwards.
+
+        free(circ, controls, ctrl_state, target), given qubits instead of
+        slots, replaces the replay of every gate with two or more controls
+        whose target no other gate writes, i.e. which held the AND of its
+        controls on |0>; it must return the target to |0>, e.g. by measuring it.
+        """
+        slots = self._slot_map(input_qubits, ancilla_qubits, result_qubit)
+        writes = {}
+        for _, _, target in self.gates:
+            writes[target] = writes.get(target, 0) + 1
+        for gate in reversed(self.gates):
+            controls, ctrl_state, target = gate
+            if free is not None and len(controls) >= 2 and not 0 <= target < self.num_inputs and writes[target] == 1:
+                free(circ, [slots[c] for c in controls], ctrl_state, slots[target])
+            else:
+                self._emit(circ, [gate], slots, relative_phase)
+
+
+# The special slot index of the result qubit inside the compiler
+RESULT = -1
+
+
+class _Value:
+    """A wire value: slot holding it (None for a constant) and its polarity."""
+
+    __slots__ = ("slot", "inverted")
+
+    def __init__(self, slot, inverted=False):
+        self.slot = slot
+        self.inverted = inverted
+
+    def negated(self):
+        return _Value(self.slot, not self.inverted)
+
+
+def _live_after(confs, live, target_wires):
+    """For every live op, the set of wires whose value is still read afterwards."""
+    needed = set(target_wires)
+    live_after = {}
+    for index in reversed(live):
+        live_after[index] = set(needed)
+        operation_type, param_1, param_2, param_3 = confs[index]
+        needed.discard(param_3)
+        needed.add(param_1)
+        if operation_type != NOT:
+            needed.add(param_2)
+    return live_after
+
+
+class _Compiler:
+
+    def __init__(self, num_inputs, reuse_ancillas):
+        self.num_inputs = num_inputs
+        self.reuse_ancillas = reuse_ancillas
+        self.gates = []
+        self.num_ancillas = 0
+        self.free = []
+        # Every write bumps the slot's version; history records, per ancilla,
+        # the gates that wrote it and the operand versions they saw
+        self.version = {slot: 0 for slot in range(num_inputs)}
+        self.history = {}
+
+    def allocate(self):
+        if self.free:
+            slot = min(self.free)
+            self.free.remove(slot)
+        else:
+            slot = self.num_inputs + self.num_ancillas
+            self.num_ancillas += 1
+            self.version[slot] = 0
+        self.version[slot] += 1
+        self.history[slot] = []
+        return slot
+
+    def gate(self, operands, target):
+        """Emits an X on target controlled by the given _Values being 1."""
+        controls = tuple(value.slot for value in operands)
+        ctrl_state = 0
+        for k, value in enumerate(operands):
+            if not value.inverted:
+                ctrl_state |= 1 << k
+        self.gates.append((controls, ctrl_state, target))
+        if target != RESULT:
+            self.version[target] += 1
+            if target in self.history:
+                self.history[target].append((controls, ctrl_state, {c: self.version[c] for c in controls}))
+
+    def release(self, slot):
+        """Uncomputes a dead ancilla if all of its operands are unchanged."""
+        history = self.history.get(slot)
+        if not self.reuse_ancillas or history is None:
+            return
+        for controls, _, versions in history:
+            if any(self.version.get(c) != v for c, v in versions.items()):
+                return
+        for controls, ctrl_state, _ in reversed(history):
+            self.gates.append((controls, ctrl_state, slot))
+        del self.history[slot]
+        self.version[slot] += 1
+        self.free.append(slot)
+
+
+def compile_oracle(confs, num_inputs=8, target_wires=TARGET_WIRES, reuse_ancillas=True):
+    """Compiles a config into an OracleProgram.
+
+    Wire j is input qubit j. The program computes 1 into the result qubit
+    exactly when oracle_finder.oracle() leaves every target wire at 0.
+
+    Args:
+      confs: List of [operation_type, param_1, param_2, param_3].
+      num_inputs: Number of wires / input qubits.
+      target_wires: Wires that must be 0 for an input to be marked.
+      reuse_ancillas: Uncompute dead ancillas early so later gates can reuse them.
+    """
+    live = live_gates(confs, target_wires)
+    live_after = _live_after(confs, live, target_wires)
+    compiler = _Compiler(num_inputs, reuse_ancillas)
+    wires = {w: _Value(w) for w in range(num_inputs)}
+
+    def slot_needed(slot, after):
+        return any(wires[w].slot == slot for w in after)
+
+    for index in live:
+        operation_type, param_1, param_2, param_3 = confs[index]
+        a = wires[param_1]
+        b = wires[param_2]
+        after = live_after[index] - {param_3}
+
+        if operation_type == NOT:
+            result = a.negated()
+        elif a.slot is None or b.slot is None or a.slot == b.slot:
+            result = _fold(operation_type, a, b)
+        elif operation_type == XOR:
+            # In place into an operand whose old value is not read again,
+            # preferring ancillas so the inputs stay intact for early releases
+            options = sorted([(a, b), (b, a)], key=lambda pair: pair[0].slot < num_inputs)
+            for target, other in options:
+                if not slot_needed(target.slot, after):
+                    compiler.gate([_Value(other.slot)], target.slot)
+                    result = _Value(target.slot, a.inverted != b.inverted)
+                    break
+            else:
+                slot = compiler.allocate()
+                compiler.gate([_Value(a.slot)], slot)
+                compiler.gate([_Value(b.slot)], slot)
+                result = _Value(slot, a.inverted != b.inverted)
+        elif operation_type == AND:
+            slot = compiler.allocate()
+            compiler.gate([a, b], slot)
+            result = _Value(slot)
+        elif operation_type == OR:
+            # De Morgan: a or b = not(not a and not b)
+            slot = compiler.allocate()
+            compiler.gate([a.negated(), b.negated()], slot)
+            result = _Value(slot, True)
+        else:
+            raise ValueError(f"Unknown operation type: {operation_type}")
+
+        released = {a.slot, b.slot, wires[param_3].slot}
+        wires[param_3] = result
+        for slot in released:
+            if slot is not None and slot >= num_inputs and not slot_needed(slot, live_after[index]):
+                compiler.release(slot)
+
+    # Mark the input when every target wire is 0
+    controls = {}
+    for w in target_wires:
+        value = wires[w]
+        if value.slot is None:
+            if value.inverted:
+                # The wire is constant 1, nothing is ever marked
+                return OracleProgram(num_inputs, compiler.num_ancillas, compiler.gates)
+            continue
+        wanted = value.inverted  # slot value for which the wire reads 0
+        if controls.get(value.slot, wanted) != wanted:
+            return OracleProgram(num_inputs, compiler.num_ancillas, compiler.gates)
+        controls[value.slot] = wanted
+    compiler.gate([_Value(slot, not wanted) for slot, wanted in controls.items()], RESULT)
+    return OracleProgram(num_inputs, compiler.num_ancillas, compiler.gates)
+
+
+def _fold(operation_type, a, b):
+    """Result of an op whose operands are constants or share a slot."""
+    if a.slot is None and b.slot is None:
+        bit_a, bit_b = a.inverted, b.inverted
+        bit = {AND: bit_a and bit_b, OR: bit_a or bit_b, XOR: bit_a != bit_b}[operation_type]
+        return _Value(None, bit)
+    if a.slot is None or b.slot is None:
+        const, value = (a, b) if a.slot is None else (b, a)
+        if operation_type == AND:
+            return value if const.inverted else _Value(None, False)
+        if operation_type == OR:
+            return _Value(None, True) if const.inverted else value
+        return value.negated() if const.inverted else value
+    # Same slot: equal or opposite polarity
+    same = a.inverted == b.inverted
+    if operation_type == XOR:
+        return _Value(None, not same)
+    if same:
+        return a
+    return _Value(None, operation_type == OR)
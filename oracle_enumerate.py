@@ -0,0 +1,410 @@
+"""Exhaustive depth-first enumeration of oracle_finder configurations.
+
+Instead of sampling configs, walk every gate sequence up to max_depth gates.
+The wire values after a prefix are computed once (as Python ints holding the
+truth table over all 2^size inputs) and shared by all of its extensions, and
+branches that can only produce an equivalent or a wasteful config are pruned:
+
+  * canonical operands: AND/OR/XOR are commutative so only p1 < p2 is tried,
+    and(a,a)/or(a,a) is only tried once as a copy, xor(a,a) only as an
+    in-place clear and NOT ignores param_2;
+  * no-op gates that leave the wire state unchanged;
+  * dead gates: a wire written and overwritten before being read, or still
+    unread at the end without being a target wire;
+  * wire symmetry: inputs inside the target wires and inside the other wires
+    are interchangeable, so fresh wires are used in index order;
+  * repeated states: a wire state already expanded at the same depth, up to
+    relabelling wires within the target and the other wires, is not expanded
+    again. Every rule above only depends on the state, so the first visit
+    expands everything a repeat would.
+
+The last two gates of every branch are not walked one by one: all of their
+completions are evaluated at once with NumPy from the wire state they
+extend, keeping one order of two independent last gates. Configs are
+reported by their output, the set of inputs leaving every target wire at 0:
+one config per output and length, so the (hits, length) pairs found are
+exactly those of all canonical configs.
+
+Exhaustive search stops at 5 gates. On one core, all 8-wire sequences of 4
+gates over NOT/AND/OR/XOR take about 20 seconds and of 5 gates about 40
+minutes, and every extra gate multiplies the walk by about a hundred, so
+sequences of 6 to 8 gates are not enumerated; oracle_search.py samples them.
+
+    python oracle_enumerate.py --max-depth 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from oracle_finder import AND, NOT, OR, TARGET_WIRES, XOR, _popcount, initial_wires, valid_mask
+
+
+def canonical_gates(size, ops=(NOT, AND, OR, XOR)):
+    """Lists every gate worth trying once, as [operation_type, p1, p2, p3] tuples."""
+    gates = []
+    for operation_type in ops:
+        for param_1 in range(size):
+            for param_3 in range(size):
+                if operation_type == NOT:
+                    gates.append((NOT, param_1, 0, param_3))
+                    continue
+                if operation_type == AND and param_1 != param_3:
+                    # and(a,a) is a copy of a, or(a,a) is the same copy
+                    gates.append((AND, param_1, param_1, param_3))
+                if operation_type == XOR and param_1 == param_3:
+                    # xor(a,a) clears the wire, only useful in place
+                    gates.append((XOR, param_1, param_1, param_3))
+                for param_2 in range(param_1 + 1, size):
+                    gates.append((operation_type, param_1, param_2, param_3))
+    return sorted(gates)
+
+
+def _reads(gate):
+    operation_type, param_1, param_2, _ = gate
+    return (param_1,) if operation_type == NOT or param_1 == param_2 else (param_1, param_2)
+
+
+def _apply(gate, wires, full):
+    operation_type, param_1, param_2, _ = gate
+    if operation_type == NOT:
+        return wires[param_1] ^ full
+    if operation_type == AND:
+        return wires[param_1] & wires[param_2]
+    if operation_type == OR:
+        return wires[param_1] | wires[param_2]
+    return wires[param_1] ^ wires[param_2]
+
+
+class _Gates:
+    """Gates, sorted by operation type, as arrays for applying them all at once."""
+
+    def __init__(self, gates):
+        self.gates = gates
+        columns = np.array(gates, dtype=np.intp).reshape(-1, 4).T
+        self.param_1, self.param_2, self.write = columns[1], columns[2], columns[3]
+        self.slices = [(operation_type, np.searchsorted(columns[0], operation_type),
+                        np.searchsorted(columns[0], operation_type, side='right'))
+                       for operation_type in (NOT, AND, OR, XOR)]
+
+    def apply(self, value_1, value_2, full):
+        """Results of every gate from its operands, one column per gate."""
+        result = np.empty_like(value_1)
+        for operation_type, start, stop in self.slices:
+            if start == stop:
+                continue
+            out = result[:, start:stop]
+            if operation_type == NOT:
+                np.bitwise_xor(value_1[:, start:stop], full, out=out)
+            elif operation_type == AND:
+                np.bitwise_and(value_1[:, start:stop], value_2[:, start:stop], out=out)
+            elif operation_type == OR:
+                np.bitwise_or(value_1[:, start:stop], value_2[:, start:stop], out=out)
+            else:
+                np.bitwise_xor(value_1[:, start:stop], value_2[:, start:stop], out=out)
+        return result
+
+
+def _column_hits(outputs):
+    """Number of set bits in each column of a (words, n) uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(outputs).sum(axis=0, dtype=np.int64)
+    return _popcount(np.ascontiguousarray(outputs.T))
+
+
+class Enumerator:
+    """Depth-first walk over canonical gate sequences.
+
+    Args:
+      size: Number of wires.
+      max_depth: Longest gate sequence to enumerate.
+      ops: Operation types to use (0 NOT, 1 AND, 2 OR, 3 XOR).
+      target_wires: Wires that must be 0 for an input to be a hit.
+      accept: Predicate on hits deciding which configs are reported.
+      min_depth: Shortest gate sequence to report.
+    """
+
+    def __init__(self, size=8, max_depth=4, ops=(NOT, AND, OR, XOR), target_wires=TARGET_WIRES,
+                 accept=lambda hits: 1 < hits < 16, min_depth=1):
+        self.size = size
+        self.max_depth = max_depth
+        self.min_depth = min_depth
+        self.target_wires = tuple(target_wires)
+        self.accept = accept
+        self.gates = canonical_gates(size, ops)
+        self.full_words = valid_mask(size)
+        self.full = int.from_bytes(self.full_words.tobytes(), 'little')
+        self.num_bytes = self.full_words.nbytes
+        self.start = tuple(int.from_bytes(row.tobytes(), 'little') for row in initial_wires(size))
+        target = set(self.target_wires)
+        self.classes = [sorted(target), sorted(set(range(size)) - target)]
+        self.class_of = {w: index for index, members in enumerate(self.classes) for w in members}
+        self.seen = set()
+        self.reported = set()
+        self._candidate_cache = {}
+        self._plan_cache = {}
+        self.stats = {"nodes": 0, "completions": 0, "noop": 0, "dead": 0, "commute": 0, "symmetry": 0, "repeat": 0}
+        self._accepted = np.array([bool(accept(hits)) for hits in range(pow(2, size) + 1)])
+
+    def output(self, wires):
+        """The inputs leaving every target wire at 0, as an int bitset."""
+        zero = self.full
+        for w in self.target_wires:
+            zero &= ~wires[w]
+        return zero
+
+    def hits(self, wires):
+        return self.output(wires).bit_count()
+
+    def state_key(self, wires, unread):
+        """The wire state up to relabelling wires within their class.
+
+        Swapping two target wires, or two other wires, maps every continuation
+        of a prefix to one with the same hits, so the walk only needs each
+        multiset of (value, unread) pairs per class once.
+        """
+        return tuple(tuple(sorted((wires[w], w in unread) for w in members)) for members in self.classes)
+
+    def _fresh_ok(self, gate, touched):
+        """Checks that fresh wires are taken in index order within their class.
+           Returns the new touched set, or None when the gate is not canonical.
+        """
+        new_touched = touched
+        for w in _reads(gate) + (gate[3],):
+            if w in new_touched:
+                continue
+            members = self.classes[self.class_of[w]]
+            if w != next(m for m in members if m not in new_touched):
+                return None
+            new_touched = new_touched | {w}
+        return new_touched
+
+    def _candidates(self, touched, unread):
+        """Gates passing the symmetry and dead-write rules after a prefix.
+           Only depends on (touched, unread), so the list is built once per pair.
+        """
+        key = (touched, unread)
+        candidates = self._candidate_cache.get(key)
+        if candidates is not None:
+            return candidates
+        candidates = []
+        for gate in self.gates:
+            reads = _reads(gate)
+            write = gate[3]
+            new_touched = self._fresh_ok(gate, touched)
+            if new_touched is None:
+                self.stats["symmetry"] += 1
+                continue
+            if write in unread and write not in reads:
+                self.stats["dead"] += 1
+                continue
+            new_unread = frozenset((unread - set(reads)) | {write})
+            dangling = len(new_unread - set(self.target_wires))
+            candidates.append((gate, write, new_touched, new_unread, dangling))
+        # Sorted by dangling writes so a walk near max_depth can stop early
+        candidates.sort(key=lambda candidate: candidate[4])
+        self._candidate_cache[key] = candidates
+        return candidates
+
+    def _plan(self, touched, unread, remaining):
+        """The gates ending a config after a prefix, as arrays, and with two gates
+           left the pairs of a first gate and a gate ending the config after it.
+
+        A second gate that does not read the first one's write has the same
+        value after every first gate, so those pairs are split from the
+        chained ones and their values are computed once per gate. Two
+        independent gates writing different wires give the same state in
+        either order, so only one order of such pairs is kept.
+        """
+        key = (touched, unread, remaining)
+        plan = self._plan_cache.get(key)
+        if plan is not None:
+            return plan
+        candidates = self._candidates(touched, unread)
+        plan = _Plan()
+        plan.last = _Gates(sorted(gate for gate, _, _, _, dangling in candidates if dangling == 0))
+        plan.last.target = np.array([self.target_wires.index(w) for w in plan.last.write], dtype=np.intp)
+        if remaining == 2:
+            plan.first = _Gates(sorted(gate for gate, _, _, _, dangling in candidates if dangling <= 2))
+            after = {gate: (new_touched, new_unread) for gate, _, new_touched, new_unread, _ in candidates}
+            pairs = {(first_gate, gate) for first_gate in plan.first.gates
+                     for gate, _, _, _, dangling in self._candidates(*after[first_gate]) if dangling == 0}
+            index = {gate: i for i, gate in enumerate(plan.first.gates)}
+            targets = len(self.target_wires)
+            shared, chained = [], []
+            for first_gate, gate in sorted(pairs, key=lambda pair: (pair[1], pair[0])):
+                if first_gate[3] in _reads(gate):
+                    chained.append((gate, index[first_gate]))
+                elif (first_gate > gate and (gate, first_gate) in pairs and gate[3] not in _reads(first_gate)
+                      and gate[3] != first_gate[3]):
+                    self.stats["commute"] += 1
+                else:
+                    shared.append((gate, index[first_gate]))
+            plan.shared = _Gates(sorted({gate for gate, _ in shared}))
+            shared_index = {gate: i for i, gate in enumerate(plan.shared.gates)}
+            plan.shared_first = np.array([i for _, i in shared], dtype=np.intp)
+            plan.shared_second = np.array([shared_index[gate] for gate, _ in shared], dtype=np.intp)
+            plan.shared_zero = np.array([i * targets + self.target_wires.index(gate[3]) for gate, i in shared],
+                                        dtype=np.intp)
+            plan.chained = _Gates([gate for gate, _ in chained])
+            plan.chained_first = np.array([i for _, i in chained], dtype=np.intp)
+            # Columns of the operands and of the overwritten value among the states after the first gates
+            plan.chained_1 = plan.chained_first * self.size + plan.chained.param_1
+            plan.chained_2 = plan.chained_first * self.size + plan.chained.param_2
+            plan.chained_old = plan.chained_first * self.size + plan.chained.write
+            plan.chained_zero = np.array([i * targets + self.target_wires.index(gate[3]) for gate, i in chained],
+                                         dtype=np.intp)
+        self._plan_cache[key] = plan
+        return plan
+
+    def run(self):
+        """Yields (confs, hits) for one accepted config per output and length."""
+        yield from self._walk([], self.start, frozenset(), frozenset())
+
+    def _report(self, confs, output):
+        """Whether a config is accepted and the first of its length with this output."""
+        key = (len(confs), output)
+        if len(confs) < self.min_depth or key in self.reported or not self.accept(output.bit_count()):
+            return False
+        self.reported.add(key)
+        return True
+
+    def _walk(self, prefix, wires, unread, touched):
+        depth = len(prefix)
+        remaining = self.max_depth - depth
+        if remaining <= 2:
+            yield from self._complete(prefix, wires, unread, touched, remaining)
+            return
+        for gate, write, new_touched, new_unread, dangling in self._candidates(touched, unread):
+            if dangling > 2 * (remaining - 1):
+                break
+            value = _apply(gate, wires, self.full)
+            if value == wires[write]:
+                self.stats["noop"] += 1
+                continue
+            new_wires = wires[:write] + (value,) + wires[write + 1:]
+            key = (depth + 1, self.state_key(new_wires, new_unread))
+            if key in self.seen:
+                self.stats["repeat"] += 1
+                continue
+            self.seen.add(key)
+
+            self.stats["nodes"] += 1
+            prefix.append(gate)
+            if dangling == 0:
+                output = self.output(new_wires)
+                if self._report(prefix, output):
+                    yield [list(g) for g in prefix], output.bit_count()
+            yield from self._walk(prefix, new_wires, new_unread, new_touched)
+            prefix.pop()
+
+    def _complete(self, prefix, wires, unread, touched, remaining):
+        """Evaluates the last one or two gates of every config extending prefix at once."""
+        if remaining <= 0:
+            return
+        plan = self._plan(touched, unread, remaining)
+        full = self.full_words[:, None]
+        # One column of packed words per wire
+        packed = np.frombuffer(b"".join(w.to_bytes(self.num_bytes, 'little') for w in wires), dtype=np.uint64)
+        packed = np.ascontiguousarray(packed.reshape(self.size, -1).T)
+        last = plan.last
+        values = last.apply(packed[:, last.param_1], packed[:, last.param_2], full)
+        changed = (values != packed[:, last.write]).any(axis=0)
+        outputs = self._zero(packed)[:, last.target] & ~values
+        self.stats["completions"] += len(last.gates)
+        yield from self._report_all(prefix, [(last.gates, None)], changed, outputs)
+        if remaining == 1:
+            return
+
+        first = plan.first
+        first_values = first.apply(packed[:, first.param_1], packed[:, first.param_2], full)
+        first_changed = (first_values != packed[:, first.write]).any(axis=0)
+        # The wires after each first gate, one block of size columns per gate
+        states = np.repeat(packed[:, None, :], len(first.gates), axis=1)
+        states[:, np.arange(len(first.gates)), first.write] = first_values
+        zero = self._zero(states).reshape(len(full), -1)
+        states = states.reshape(len(full), -1)
+
+        shared = plan.shared
+        values = shared.apply(packed[:, shared.param_1], packed[:, shared.param_2], full)
+        shared_changed = (values != packed[:, shared.write]).any(axis=0)
+        outputs = zero.take(plan.shared_zero, axis=1) & ~values.take(plan.shared_second, axis=1)
+        changed = first_changed[plan.shared_first] & shared_changed[plan.shared_second]
+        self.stats["completions"] += len(plan.shared_first)
+        yield from self._report_all(prefix, [(first.gates, plan.shared_first), (shared.gates, plan.shared_second)],
+                                    changed, outputs)
+
+        chained = plan.chained
+        values = chained.apply(states.take(plan.chained_1, axis=1), states.take(plan.chained_2, axis=1), full)
+        changed = first_changed[plan.chained_first] & (values != states.take(plan.chained_old, axis=1)).any(axis=0)
+        outputs = zero.take(plan.chained_zero, axis=1) & ~values
+        self.stats["completions"] += len(plan.chained_first)
+        yield from self._report_all(prefix, [(first.gates, plan.chained_first), (chained.gates, None)],
+                                    changed, outputs)
+
+    def _zero(self, packed):
+        """For each target wire, the inputs leaving every other target wire at 0.
+
+        packed holds wires on its last axis; the result holds target wires there.
+        """
+        zero = np.empty(packed.shape[:-1] + (len(self.target_wires),), dtype=np.uint64)
+        for k in range(len(self.target_wires)):
+            zero[..., k] = self.full_words.reshape((-1,) + (1,) * (packed.ndim - 2))
+            for j, w in enumerate(self.target_wires):
+                if j != k:
+                    zero[..., k] &= ~packed[..., w]
+        return zero
+
+    def _report_all(self, prefix, gate_lists, changed, outputs):
+        """Yields the accepted configs among completions, one per new output.
+
+        gate_lists holds the gates appended to prefix, each as (gates, index)
+        with index mapping completions to gates (None for one gate each).
+        """
+        length = len(prefix) + len(gate_lists)
+        if length < self.min_depth:
+            return
+        rows = np.flatnonzero(changed & self._accepted[_column_hits(outputs)])
+        if not len(rows):
+            return
+        _, unique = np.unique(outputs[:, rows].T, axis=0, return_index=True)
+        for row in rows[np.sort(unique)].tolist():
+            output = int.from_bytes(outputs[:, row].tobytes(), 'little')
+            if (length, output) in self.reported:
+                continue
+            self.reported.add((length, output))
+            confs = prefix + [gates[row if index is None else index[row]] for gates, index in gate_lists]
+            yield [list(g) for g in confs], output.bit_count()
+
+
+class _Plan:
+    """The gates _complete() evaluates after a prefix, see Enumerator._plan()."""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=8, help="Number of wires.")
+    parser.add_argument("--min-depth", type=int, default=1)
+    parser.add_argument("--max-depth", type=int, default=4,
+                        help="Longest gate sequence; 8 wires take about 20 s at 4 and 40 min at 5.")
+    parser.add_argument("--ops", type=int, nargs="+", default=[NOT, AND, OR, XOR],
+                        help="Operation types to use (0 NOT, 1 AND, 2 OR, 3 XOR).")
+    parser.add_argument("--min-hits", type=int, default=2)
+    parser.add_argument("--max-hits", type=int, default=15)
+    parser.add_argument("--limit", type=int, default=20, help="Number of configs to print.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    enumerator = Enumerator(size=args.size, max_depth=args.max_depth, min_depth=args.min_depth, ops=args.ops,
+                            accept=lambda hits: args.min_hits <= hits <= args.max_hits)
+    start = time.perf_counter()
+    found = 0
+    for confs, hits in enumerator.run():
+        if found < args.limit:
+            print(f"hits={hits}: {confs}")
+        found += 1
+    elapsed = time.perf_counter() - start
+    print(f"{found} configs found in {elapsed:.1f} s")
+    print(f"Stats: {enumerator.stats}")
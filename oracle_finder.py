@@ -1,5 +1,7 @@
 import random
 
+import numpy as np
+
 
 def number_to_binary_array(number, array_size):
   """
@@ -61,8 +63,7 @@ def x (x1, x2):
 
 
 def oracle (input, confs, size):
-    for i in range(num_iter):
-        current_conf = confs[i]
+    for current_conf in confs:
         operation_type = current_conf[0]
         param_1 = current_conf[1]
         param_2 = current_conf[2]
@@ -77,51 +78,177 @@ def oracle (input, confs, size):
             do(x, input, param_1, param_2, param_3)
         else:
             print(f"Unknown operation type: {operation_type}")
-        
-
-
-
-
-
-
-
 
 
-found_config = False
-lowest_hits = 256
-for i in range(1):
-    if found_config == False:
-        bits = [0,0,0,0,0,0,0,0]
-        size = 8
-
-        num_iter = 16
-        #confs = [[random.randint(0, 3)] + [random.randint(0, 7) for _ in range(3)] for _ in range(num_iter)]
-        confs =[[2,4,0,7],[2,5,6,0],[3,7,1,1],[3,7,4,4],[3,4,1,3],[3,4,2,4],[1,3,1,3],[1,4,2,1],[1,3,0,5],[2,6,1,6],[0,5,0,4],[0,5,2,5],[2,6,0,2],[0,0,6,3],[1,7,4,4],[1,5,6,3]]
-        print(confs)
-
-        hits = 0
-        for i in range(pow(2,8)):
-            bits = number_to_binary_array(i,8)
-            #print(bits)
-            oracle(bits, confs, 8)
-            if (bits[0] == 0 and bits[1] == 0 and bits[2] == 0):
-                hits += 1
-            #print(bits)
-            #input()
-        if hits < lowest_hits:
-            lowest_hits = hits
-
-        if hits < 16 and hits > 1:
-           found_config = True
-
-        
-    else:
-        print(confs)
-        print(hits)
-        break
-
-print(lowest_hits)
-
+# Wires that must all be 0 after the oracle for an input to count as a hit
+TARGET_WIRES = (0, 1, 2)
+
+
+def oracle_hits (confs, size=8, target_wires=TARGET_WIRES):
+    """Counts the inputs for which the oracle leaves target_wires at 0.
+       Reference implementation evaluating one input at a time.
+    """
+    hits = 0
+    for i in range(pow(2, size)):
+        bits = number_to_binary_array(i, size)
+        oracle(bits, confs, size)
+        if all(bits[w] == 0 for w in target_wires):
+            hits += 1
+    return hits
+
+
+# --- Bit-sliced evaluation ---
+# Every wire is kept as a packed bit-vector holding its value for all 2^size
+# inputs, so each NOT/AND/OR/XOR is a single array operation over every input
+# of every config in the batch.
+
+NOT, AND, OR, XOR = 0, 1, 2, 3
+
+
+def _pack_rows (bits):
+    """Packs a (rows, 2^size) array of 0/1 into (rows, words) uint64 words.
+       Bit i of a row's packed words is column i. Rows shorter than 64 bits are
+       zero padded.
+    """
+    packed = np.packbits(bits.astype(np.uint8), axis=-1, bitorder='little')
+    pad = (-packed.shape[-1]) % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def _popcount (words):
+    """Number of set bits in each row of a uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    as_bytes = words.view(np.uint8).reshape(words.shape[:-1] + (-1,))
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def initial_wires (size):
+    """Returns the packed wire values before any gate is applied.
+
+    Args:
+      size: Number of wires (and input bits).
+
+    Returns:
+      A (size, words) uint64 array. Bit i of row j is
+      number_to_binary_array(i, size)[j], i.e. wire 0 is the most significant
+      input bit, matching oracle().
+    """
+    inputs = np.arange(pow(2, size), dtype=np.int64)
+    shifts = np.arange(size - 1, -1, -1, dtype=np.int64)
+    return _pack_rows((inputs[None, :] >> shifts[:, None]) & 1)
+
+
+def valid_mask (size):
+    """Packed mask with one bit set per real input (hides row padding)."""
+    return _pack_rows(np.ones((1, pow(2, size)), dtype=np.uint8))[0]
+
+
+def evaluate_configs (confs_batch, size=8):
+    """Applies a batch of configs to all 2^size inputs at once.
+
+    Args:
+      confs_batch: Array-like of shape (batch, num_gates, 4) holding
+        [operation_type, param_1, param_2, param_3] rows as used by oracle().
+        A single (num_gates, 4) config is also accepted.
+      size: Number of wires.
+
+    Returns:
+      A (batch, size, words) uint64 array with the final packed wire values.
+    """
+    confs_batch = np.asarray(confs_batch, dtype=np.intp)
+    if confs_batch.ndim == 2:
+        confs_batch = confs_batch[None]
+    if confs_batch.size and (confs_batch[..., 0].min() < NOT or confs_batch[..., 0].max() > XOR):
+        raise ValueError("Operation types must be in 0..3 (NOT, AND, OR, XOR).")
+    if confs_batch.size and (confs_batch[..., 1:].min() < 0 or confs_batch[..., 1:].max() >= size):
+        raise ValueError(f"Wire indices must be in 0..{size - 1}.")
+
+    batch = confs_batch.shape[0]
+    start = initial_wires(size)
+    wires = np.repeat(start[None], batch, axis=0)
+    rows = np.arange(batch)
+
+    for gate in range(confs_batch.shape[1]):
+        operation_type, param_1, param_2, param_3 = confs_batch[:, gate].T
+        value_1 = wires[rows, param_1]
+        value_2 = wires[rows, param_2]
+        result = ~value_1
+        for code, ufunc in ((AND, np.bitwise_and), (OR, np.bitwise_or), (XOR, np.bitwise_xor)):
+            selected = operation_type == code
+            if selected.any():
+                result[selected] = ufunc(value_1[selected], value_2[selected])
+        wires[rows, param_3] = result
+    return wires
+
+
+def batch_hits (confs_batch, size=8, target_wires=TARGET_WIRES):
+    """Bit-sliced equivalent of oracle_hits() for a whole batch of configs.
+
+    Returns:
+      An int64 array with one hit count per config.
+    """
+    wires = evaluate_configs(confs_batch, size)
+    hit = np.broadcast_to(valid_mask(size), wires[:, 0].shape).copy()
+    for w in target_wires:
+        hit &= ~wires[:, w]
+    return _popcount(hit)
+
+
+def live_gates (confs, target_wires=TARGET_WIRES):
+    """Returns the indices of the gates whose output can reach target_wires.
+       Every other gate is dead: its result is overwritten or never read.
+    """
+    needed = set(target_wires)
+    live = []
+    for index in range(len(confs) - 1, -1, -1):
+        operation_type, param_1, param_2, param_3 = confs[index]
+        if param_3 in needed:
+            needed.discard(param_3)
+            needed.add(param_1)
+            if operation_type != NOT:
+                needed.add(param_2)
+            live.append(index)
+    live.reverse()
+    return live
+
+
+def random_configs (rng, batch, num_iter, size=8):
+    """Draws a (batch, num_iter, 4) array of random configs.
+
+    Args:
+      rng: A numpy Generator.
+    """
+    confs_batch = rng.integers(0, size, size=(batch, num_iter, 4), dtype=np.intp)
+    confs_batch[..., 0] = rng.integers(NOT, XOR + 1, size=(batch, num_iter))
+    return confs_batch
+
+
+if __name__ == "__main__":
+    found_config = False
+    lowest_hits = 256
+    for i in range(1):
+        if found_config == False:
+            size = 8
+
+            num_iter = 16
+            #confs = [[random.randint(0, 3)] + [random.randint(0, 7) for _ in range(3)] for _ in range(num_iter)]
+            confs =[[2,4,0,7],[2,5,6,0],[3,7,1,1],[3,7,4,4],[3,4,1,3],[3,4,2,4],[1,3,1,3],[1,4,2,1],[1,3,0,5],[2,6,1,6],[0,5,0,4],[0,5,2,5],[2,6,0,2],[0,0,6,3],[1,7,4,4],[1,5,6,3]]
+            print(confs)
+
+            hits = int(batch_hits(confs, size)[0])
+            if hits < lowest_hits:
+                lowest_hits = hits
+
+            if hits < 16 and hits > 1:
+               found_config = True
 
 
+        else:
+            print(confs)
+            print(hits)
+            break
 
+    print(lowest_hits)
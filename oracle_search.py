@@ -0,0 +1,244 @@
+"""Multi-core, checkpointable random search over oracle_finder configurations.
+
+Each worker draws batches of random configs from its own deterministic stream
+(seeded by the run seed, the worker id and the chunk number) and scores them
+with oracle_finder.batch_hits. The driver keeps a bounded top-k, stops as soon
+as a config with 1 < hits < 16 is found and regularly writes its progress to a
+JSON checkpoint, so an interrupted search continues exactly where it stopped.
+
+    python oracle_search.py --workers 8 --checkpoint search.json
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from oracle_finder import TARGET_WIRES, batch_hits, live_gates, random_configs
+from pools import POOL_CONTEXT, process_pool
+
+# A config is a solution when TARGET_MIN_HITS < hits < TARGET_MAX_HITS
+TARGET_MIN_HITS = 1
+TARGET_MAX_HITS = 16
+
+# Set by the driver once a target is found; workers check it between batches
+_stop = None
+
+
+def is_target(hits):
+    return TARGET_MIN_HITS < hits < TARGET_MAX_HITS
+
+
+def rank_key(entry):
+    """Sort key of a top-k entry: fewest hits first, then fewest live gates.
+
+    Ties are broken by the config itself, so the top-k does not depend on the
+    order in which the chunks finished.
+    """
+    hits, gates, confs = entry
+    return (hits, gates, confs)
+
+
+def merge_top(top, candidates, top_k):
+    """Merges candidates into top, dropping duplicates and keeping top_k entries."""
+    seen = set()
+    merged = []
+    for entry in sorted(list(top) + list(candidates), key=rank_key):
+        key = json.dumps(entry[2])
+        if key not in seen:
+            seen.add(key)
+            merged.append(entry)
+    return merged[:top_k]
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+
+
+def search_chunk(seed, worker_id, chunk, num_batches, batch_size, num_iter, size, top_k):
+    """Scores num_batches random batches and returns the best configs of the chunk.
+
+    The random stream only depends on (seed, worker_id, chunk), so re-running a
+    chunk after a resume reproduces it exactly. The chunk returns early, with
+    fewer configs evaluated, once it finds a target or the stop flag is set.
+
+    Returns:
+      (worker_id, chunk, top, evaluated, elapsed_seconds)
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng([seed, worker_id, chunk])
+    top = []
+    evaluated = 0
+    for _ in range(num_batches):
+        if _stop is not None and _stop.is_set():
+            break
+        confs_batch = random_configs(rng, batch_size, num_iter, size)
+        hits = batch_hits(confs_batch, size)
+        # Configs with hits <= TARGET_MIN_HITS mark nothing useful
+        candidates = np.flatnonzero(hits > TARGET_MIN_HITS)
+        if len(candidates) > top_k:
+            # Keep every config tied with the k-th fewest hits, merge_top ranks them by live gates
+            kth_hits = np.partition(hits[candidates], top_k - 1)[top_k - 1]
+            candidates = candidates[hits[candidates] <= kth_hits]
+        entries = []
+        for index in candidates:
+            confs = confs_batch[index].tolist()
+            entries.append((int(hits[index]), len(live_gates(confs, TARGET_WIRES)), confs))
+        top = merge_top(top, entries, top_k)
+        evaluated += batch_size
+        if top and is_target(top[0][0]):
+            break
+    return worker_id, chunk, top, evaluated, time.perf_counter() - start
+
+
+# --- Checkpointing ---
+
+def new_state(args):
+    return {
+        "seed": args.seed,
+        "num_iter": args.num_iter,
+        "size": args.size,
+        "batch_size": args.batch_size,
+        "batches_per_chunk": args.batches_per_chunk,
+        "next_chunk": [0] * args.workers,
+        "evaluated": [0] * args.workers,
+        "elapsed": [0.0] * args.workers,
+        "top": [],
+        "found": None,
+    }
+
+
+def load_state(path, args):
+    """Loads a checkpoint, or returns a fresh state when there is none."""
+    if not path or not os.path.exists(path):
+        return new_state(args)
+    with open(path, 'r') as f_json:
+        state = json.load(f_json)
+    for key in ("seed", "num_iter", "size", "batch_size", "batches_per_chunk"):
+        if state[key] != getattr(args, key):
+            raise ValueError(f"Checkpoint {path} was written with {key}={state[key]}, not {getattr(args, key)}.")
+    # Growing the pool adds fresh workers; shrinking it keeps the old counters
+    extra = args.workers - len(state["next_chunk"])
+    for key, default in (("next_chunk", 0), ("evaluated", 0), ("elapsed", 0.0)):
+        state[key] += [default] * max(extra, 0)
+    state["top"] = [tuple(entry) for entry in state["top"]]
+    return state
+
+
+def save_state(path, state):
+    """Writes the checkpoint atomically so a kill never leaves a truncated file."""
+    if not path:
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f_json:
+        json.dump(state, f_json, indent=4)
+    os.replace(tmp_path, path)
+
+
+def report(state, workers):
+    for worker_id in range(workers):
+        elapsed = state["elapsed"][worker_id]
+        rate = state["evaluated"][worker_id] / elapsed if elapsed else 0.0
+        print(f"Worker {worker_id}: {state['evaluated'][worker_id]} configs, {rate:,.0f} configs/s")
+    if state["top"]:
+        hits, gates, confs = state["top"][0]
+        print(f"Best so far: hits={hits}, live gates={gates}, confs={confs}")
+
+
+def record_chunk(state, result, chunk_size, top_k):
+    """Adds a search_chunk() result to the state; returns its worker id.
+
+    A chunk cut short by the stop flag is not counted: the checkpoint keeps
+    its worker at that chunk, and a resumed run evaluates it again in full.
+    A chunk that found a target ends the search, so it counts as it is.
+    """
+    worker_id, chunk, top, evaluated, elapsed = result
+    state["top"] = merge_top(state["top"], top, top_k)
+    for hits, gates, confs in top:
+        if is_target(hits) and state["found"] is None:
+            state["found"] = [hits, gates, confs]
+    if evaluated == chunk_size or any(is_target(hits) for hits, _, _ in top):
+        state["next_chunk"][worker_id] = chunk + 1
+        state["evaluated"][worker_id] += evaluated
+        state["elapsed"][worker_id] += elapsed
+    return worker_id
+
+
+# --- Driver ---
+
+def run_search(args):
+    """Runs the search until a target config is found or max_configs is reached.
+
+    max_configs is rounded up to whole chunks per worker, so every worker runs
+    the same chunks and a search without a target gives the same top-k for the
+    same seed and worker count.
+    """
+    state = load_state(args.checkpoint, args)
+    if state["found"] is not None:
+        print(f"Checkpoint already holds a solution: {state['found']}")
+        return state
+
+    chunk_size = args.batches_per_chunk * args.batch_size
+    max_chunks = math.ceil(args.max_configs / (chunk_size * args.workers)) if args.max_configs else None
+    last_checkpoint = last_report = time.monotonic()
+    stop = POOL_CONTEXT.Event()
+    with process_pool(args.workers, initializer=_init_worker, initargs=(stop,)) as pool:
+        def submit(worker_id):
+            return pool.submit(search_chunk, args.seed, worker_id, state["next_chunk"][worker_id],
+                               args.batches_per_chunk, args.batch_size, args.num_iter, args.size, args.top_k)
+
+        def has_budget(worker_id):
+            return max_chunks is None or state["next_chunk"][worker_id] < max_chunks
+
+        pending = {submit(worker_id) for worker_id in range(args.workers) if has_budget(worker_id)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                worker_id = record_chunk(state, future.result(), chunk_size, args.top_k)
+                if state["found"] is None and has_budget(worker_id):
+                    pending.add(submit(worker_id))
+
+            if state["found"] is not None:
+                # Running chunks return at their next batch, queued ones never start
+                stop.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                pending = set()
+
+            now = time.monotonic()
+            if now - last_checkpoint >= args.checkpoint_interval:
+                save_state(args.checkpoint, state)
+                last_checkpoint = now
+            if now - last_report >= args.report_interval:
+                report(state, args.workers)
+                last_report = now
+
+    save_state(args.checkpoint, state)
+    report(state, args.workers)
+    if state["found"] is not None:
+        hits, gates, confs = state["found"]
+        print(f"Found config with {hits} hits and {gates} live gates: {confs}")
+    return state
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-iter", type=int, default=16, help="Gates per config.")
+    parser.add_argument("--size", type=int, default=8, help="Number of wires.")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--batches-per-chunk", type=int, default=16)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--max-configs", type=int, default=0, help="Stop after this many configs, rounded up to whole chunks per worker (0 = no limit).")
+    parser.add_argument("--checkpoint", default="oracle_search_checkpoint.json")
+    parser.add_argument("--checkpoint-interval", type=float, default=30.0, help="Seconds between checkpoints.")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between throughput reports.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run_search(parse_args())
@@ -0,0 +1,20 @@
+"""Process pools for the parallel tools.
+
+The tools that fan work out over processes often do so from a process that
+has already run NumPy, Aer or the transpiler. Their native thread pools may
+hold a lock at the moment a worker is forked, and the forked worker then
+waits on it forever. Every pool therefore starts its workers from a
+forkserver, which forks them from a clean single-threaded process;
+POOL_CONTEXT also makes the synchronization primitives shared with them,
+e.g. POOL_CONTEXT.Event().
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+POOL_CONTEXT = multiprocessing.get_context("forkserver")
+
+
+def process_pool(workers=None, initializer=None, initargs=()):
+    """A ProcessPoolExecutor with workers processes started from POOL_CONTEXT."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT, initializer=initializer,
+                               initargs=initargs)
@@ -0,0 +1,197 @@
+"""Deferred rendering of circuit diagrams and histograms.
+
+Drawing a 15-qubit, 6-iteration circuit with matplotlib and saving histograms
+at dpi=300 takes longer than simulating them, so runs only record what to
+draw: RenderQueue appends one JSON line per artifact to queue.jsonl, with the
+counts saved next to it as .npy and circuits as QPY. render_pending() later
+draws every job not yet rendered in a process pool on the headless Agg
+backend. Circuit diagrams are cached by circuit hash, so an unchanged circuit
+is drawn once and copied afterwards.
+
+    python render.py --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from itertools import repeat
+
+import numpy as np
+from qiskit import qpy
+
+from bit_counts import counts_dict
+from pools import process_pool
+from transpile_cache import circuit_hash
+
+# Default location of the queue, the saved inputs and the diagram cache
+RENDER_DIR = "./results/render_queue"
+
+HIGHLIGHT_COLOR = '#ff7f0e'
+DEFAULT_COLOR = '#1f77b4'
+
+
+class RenderQueue:
+    """Records render jobs in root/queue.jsonl."""
+
+    def __init__(self, root=RENDER_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "inputs"), exist_ok=True)
+        self.queue_path = os.path.join(root, "queue.jsonl")
+
+    def _add(self, job):
+        job = {"job_id": uuid.uuid4().hex, **job}
+        with open(self.queue_path, 'a') as f_queue:
+            f_queue.write(json.dumps(job) + "\n")
+        return job["job_id"]
+
+    def _save_counts(self, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        path = os.path.join(self.root, "inputs", hashlib.sha256(counts.tobytes()).hexdigest() + ".npy")
+        if not os.path.exists(path):
+            np.save(path, counts)
+        return path
+
+    def circuit(self, circ, out_path):
+        """Queues circ.draw('mpl') into out_path."""
+        key = circuit_hash(circ)
+        path = os.path.join(self.root, "inputs", key + ".qpy")
+        if not os.path.exists(path):
+            with open(path, 'wb') as f_qpy:
+                qpy.dump(circ, f_qpy)
+        return self._add({"kind": "circuit", "circuit": path, "hash": key, "out": os.path.abspath(out_path)})
+
+    def histogram(self, counts, out_path, title=None):
+        """Queues plot_histogram of a counts array into out_path."""
+        return self._add({"kind": "histogram", "counts": self._save_counts(counts),
+                          "out": os.path.abspath(out_path), "title": title})
+
+    def highlighted_histogram(self, counts, highlight, out_path, title="Measurement Outcomes from Grover's Algorithm"):
+        """Queues a bar plot over every outcome with the highlight outcomes colored."""
+        return self._add({"kind": "highlighted", "counts": self._save_counts(counts),
+                          "highlight": [int(i) for i in highlight], "out": os.path.abspath(out_path), "title": title})
+
+
+def _render_circuit(job, cache_dir):
+    from matplotlib import pyplot
+
+    cached = os.path.join(cache_dir, job["hash"] + ".png")
+    if not os.path.exists(cached):
+        with open(job["circuit"], 'rb') as f_qpy:
+            circ = qpy.load(f_qpy)[0]
+        figure = circ.draw('mpl')
+        figure.savefig(cached + ".tmp.png")
+        pyplot.close(figure)
+        os.replace(cached + ".tmp.png", cached)
+    shutil.copyfile(cached, job["out"])
+
+
+def _render_histogram(job):
+    from matplotlib import pyplot
+    from qiskit.visualization import plot_histogram
+
+    counts = np.load(job["counts"])
+    figure = plot_histogram(counts_dict(counts), title=job["title"])
+    figure.savefig(job["out"], dpi=300)
+    pyplot.close(figure)
+
+
+def _render_highlighted(job):
+    from matplotlib import pyplot
+    from matplotlib.patches import Patch
+
+    counts = np.load(job["counts"])
+    num_bits = int(len(counts) - 1).bit_length()
+    highlight = set(job["highlight"])
+    colors = [HIGHLIGHT_COLOR if i in highlight else DEFAULT_COLOR for i in range(len(counts))]
+    labels = [format(i, f"0{num_bits}b") if i in highlight else '' for i in range(len(counts))]
+
+    figure, ax = pyplot.subplots(figsize=(20, 10))
+    ax.bar(range(len(counts)), counts, color=colors)
+    ax.set_title(job["title"], fontsize=20, pad=20)
+    ax.set_xlabel('Quantum States', fontsize=16)
+    ax.set_ylabel('Counts', fontsize=16)
+    ax.set_xticks(np.arange(len(counts)))
+    ax.set_xticklabels(labels, rotation=75, ha='right', fontsize=12)
+    ax.margins(x=0.01)
+    legend_elements = [Patch(facecolor=HIGHLIGHT_COLOR, edgecolor='black', label='Target Solutions'),
+                       Patch(facecolor=DEFAULT_COLOR, edgecolor='black', label='Other Outcomes')]
+    ax.legend(handles=legend_elements, fontsize=14)
+    figure.tight_layout()
+    figure.savefig(job["out"])
+    pyplot.close(figure)
+
+
+def render_job(job, cache_dir):
+    """Renders one job; returns (job_id, error message or None)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    try:
+        os.makedirs(os.path.dirname(job["out"]), exist_ok=True)
+        if job["kind"] == "circuit":
+            _render_circuit(job, cache_dir)
+        elif job["kind"] == "histogram":
+            _render_histogram(job)
+        elif job["kind"] == "highlighted":
+            _render_highlighted(job)
+        else:
+            raise ValueError(f"Unknown render job kind: {job['kind']}")
+    except Exception as e:
+        return job["job_id"], f"{type(e).__name__}: {e}"
+    return job["job_id"], None
+
+
+def pending_jobs(root=RENDER_DIR):
+    """Queued jobs without a record in rendered.jsonl."""
+    queue_path = os.path.join(root, "queue.jsonl")
+    if not os.path.exists(queue_path):
+        return []
+    done = set()
+    rendered_path = os.path.join(root, "rendered.jsonl")
+    if os.path.exists(rendered_path):
+        with open(rendered_path) as f_rendered:
+            done = {json.loads(line)["job_id"] for line in f_rendered if line.strip()}
+    with open(queue_path) as f_queue:
+        jobs = [json.loads(line) for line in f_queue if line.strip()]
+    return [job for job in jobs if job["job_id"] not in done]
+
+
+def render_pending(root=RENDER_DIR, workers=None):
+    """Renders all pending jobs in a process pool; returns the failed ones."""
+    jobs = pending_jobs(root)
+    if not jobs:
+        return []
+    cache_dir = os.path.join(root, "diagrams")
+    os.makedirs(cache_dir, exist_ok=True)
+    # Each distinct circuit is drawn once, by its first job; the jobs repeating
+    # it only copy the cached diagram, so they wait for the first round
+    first_of_hash = {}
+    for job in jobs:
+        if job["kind"] == "circuit":
+            first_of_hash.setdefault(job["hash"], job["job_id"])
+    drawing = [job for job in jobs if job["kind"] != "circuit" or first_of_hash[job["hash"]] == job["job_id"]]
+    copies = [job for job in jobs if job["kind"] == "circuit" and first_of_hash[job["hash"]] != job["job_id"]]
+    with process_pool(workers) as pool:
+        results = list(pool.map(render_job, drawing, repeat(cache_dir)))
+        results += list(pool.map(render_job, copies, repeat(cache_dir)))
+
+    failed = []
+    with open(os.path.join(root, "rendered.jsonl"), 'a') as f_rendered:
+        for job_id, error in results:
+            if error is None:
+                f_rendered.write(json.dumps({"job_id": job_id}) + "\n")
+            else:
+                failed.append((job_id, error))
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=RENDER_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"Rendering {len(pending_jobs(args.root))} pending jobs")
+    for job_id, error in render_pending(args.root, args.workers):
+        print(f"Job {job_id} failed: {error}")
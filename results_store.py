@@ -0,0 +1,120 @@
+"""Append-only store of run results.
+
+Every run gets a new id; its counts are written as a length 2^n int64 array
+to runs/<id>.npy, which np.load(..., mmap_mode='r') maps without parsing, and
+one JSON line describing the run (backend, t, shots, optimization level,
+oracle hash, timings, ...) is appended to index.jsonl. Nothing is ever
+overwritten: run files are created exclusively and the index is only
+appended to, so hundreds of runs can be compared by filtering the index and
+stacking their arrays.
+
+    python results_store.py list --backend aer_simulator
+    python results_store.py import results/IBM_6_noreset/grover_known_solutions_results.json --t 6
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+from bit_counts import counts_from_dict
+
+# Default location of the store
+STORE_DIR = "./results/store"
+
+
+class ResultsStore:
+    """Counts arrays under root/runs and their index in root/index.jsonl."""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.runs_dir = os.path.join(root, "runs")
+        self.index_path = os.path.join(root, "index.jsonl")
+        os.makedirs(self.runs_dir, exist_ok=True)
+
+    def save(self, counts, **metadata):
+        """Stores one run's counts array; returns its run id.
+
+        metadata is recorded in the index as given and should be JSON
+        serializable, e.g. backend, t, shots, optimization_level, oracle_hash
+        and timings.
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        run_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        path = os.path.join(self.runs_dir, run_id + ".npy")
+        with open(path, 'xb') as f_npy:  # Fails rather than overwrite a run
+            np.save(f_npy, counts)
+        record = {
+            "run_id": run_id,
+            "created": time.time(),
+            "num_inputs": int(len(counts) - 1).bit_length(),
+            "total_shots": int(counts.sum()),
+            **metadata,
+        }
+        with open(self.index_path, 'a') as f_index:
+            f_index.write(json.dumps(record) + "\n")
+        return run_id
+
+    def runs(self, **filters):
+        """Index records, oldest first, whose fields equal the given filters."""
+        if not os.path.exists(self.index_path):
+            return []
+        records = []
+        with open(self.index_path) as f_index:
+            for line in f_index:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if all(record.get(key) == value for key, value in filters.items()):
+                    records.append(record)
+        return records
+
+    def load(self, run_id, mmap=True):
+        """Counts array of a run, memory-mapped read-only by default."""
+        return np.load(os.path.join(self.runs_dir, run_id + ".npy"), mmap_mode='r' if mmap else None)
+
+    def load_many(self, records):
+        """Stacks the counts of several runs of the same n into one (runs, 2^n) array."""
+        return np.stack([self.load(record["run_id"]) for record in records])
+
+    def import_json(self, path, num_inputs=8, **metadata):
+        """Stores a bitstring-keyed counts JSON as written by Grover.py.
+
+        Files holding one dict per t ({"t_1": {...}, ...}) become one run per t.
+        """
+        with open(path) as f_json:
+            data = json.load(f_json)
+        metadata = {"source": path, **metadata}
+        if all(key.startswith("t_") and isinstance(value, dict) for key, value in data.items()):
+            return [self.save(counts_from_dict(counts, num_inputs), **{**metadata, "t": int(key[2:])})
+                    for key, counts in data.items()]
+        return [self.save(counts_from_dict(data, num_inputs), **metadata)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="List runs, optionally filtered")
+    list_parser.add_argument("--backend")
+    list_parser.add_argument("--t", type=int)
+    import_parser = commands.add_parser("import", help="Import a Grover.py counts JSON")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--backend")
+    import_parser.add_argument("--t", type=int)
+    import_parser.add_argument("--shots", type=int)
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    if args.command == "list":
+        filters = {key: value for key, value in (("backend", args.backend), ("t", args.t)) if value is not None}
+        for record in store.runs(**filters):
+            print(f"{record['run_id']}  backend={record.get('backend')}  t={record.get('t')}  "
+                  f"shots={record['total_shots']}")
+    else:
+        metadata = {key: value for key, value in (("backend", args.backend), ("t", args.t), ("shots", args.shots))
+                    if value is not None}
+        for run_id in store.import_json(args.path, **metadata):
+            print(f"Imported {args.path} as {run_id}")
@@ -0,0 +1,110 @@
+"""Classical simulator for reversible (X/CX/CCX/MCX) circuits.
+
+compute_fx, uncompute_fx and compute_OR_fx only permute computational basis
+states, so there is no need for a statevector: every qubit is tracked as a
+Python int bit-vector whose bit i is the qubit's value when the input qubits
+start in basis state i. One pass over the circuit therefore evaluates all
+2^n inputs at once.
+"""
+import numpy as np
+
+# Gates that only add a phase to basis states. They are skipped when
+# ignore_phases=True and rejected otherwise.
+DIAGONAL_GATES = {"id", "z", "s", "sdg", "t", "tdg", "p", "rz", "u1", "cz", "ccz", "cp", "crz", "mcphase", "global_phase"}
+
+# Relative-phase Toffolis act like their plain counterparts on basis states
+RELATIVE_PHASE_GATES = {"rccx": 2, "rcccx": 3}
+
+# Instructions that do not touch the basis state of any qubit
+IGNORED_INSTRUCTIONS = {"barrier", "measure", "delay"}
+
+
+def input_bitsets(num_inputs):
+    """Returns one bit-vector per input qubit: bit i of entry k is bit k of i."""
+    indices = np.arange(pow(2, num_inputs), dtype=np.int64)
+    bitsets = []
+    for k in range(num_inputs):
+        bits = ((indices >> k) & 1).astype(np.uint8)
+        bitsets.append(int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little'))
+    return bitsets
+
+
+def _apply(circ, qubit_map, state, full, ignore_phases):
+    for instruction in circ.data:
+        operation = instruction.operation
+        name = operation.name
+        qubits = [qubit_map[circ.find_bit(q).index] for q in instruction.qubits]
+
+        if name in IGNORED_INSTRUCTIONS:
+            continue
+        if name in DIAGONAL_GATES:
+            if not ignore_phases:
+                raise ValueError(f"Gate '{name}' only changes phases; pass ignore_phases=True to skip it.")
+            continue
+
+        if name == "x":
+            state[qubits[0]] ^= full
+        elif name == "swap":
+            a, b = qubits
+            state[a], state[b] = state[b], state[a]
+        elif name in RELATIVE_PHASE_GATES or getattr(getattr(operation, "base_gate", None), "name", None) == "x":
+            num_ctrl = RELATIVE_PHASE_GATES.get(name, getattr(operation, "num_ctrl_qubits", 0))
+            ctrl_state = getattr(operation, "ctrl_state", pow(2, num_ctrl) - 1)
+            if name in RELATIVE_PHASE_GATES and not ignore_phases:
+                raise ValueError(f"Gate '{name}' is a Toffoli only up to phases; pass ignore_phases=True to allow it.")
+            active = full
+            for k, control in enumerate(qubits[:num_ctrl]):
+                value = state[control]
+                active &= value if (ctrl_state >> k) & 1 else value ^ full
+            state[qubits[num_ctrl]] ^= active
+        elif operation.definition is not None:
+            _apply(operation.definition, qubits, state, full, ignore_phases)
+        else:
+            raise ValueError(f"Gate '{name}' is not a classical reversible gate.")
+
+
+def simulate(circ, input_qubits, ignore_phases=False):
+    """Runs circ on every basis state of input_qubits at once.
+
+    Args:
+      circ: A QuantumCircuit made of X/CX/CCX/MCX (and SWAP) gates.
+      input_qubits: Qubits whose basis states are enumerated; bit k of the
+        basis index is the value of input_qubits[k] (Qiskit's little-endian
+        order). Every other qubit starts in |0>.
+      ignore_phases: Skip diagonal gates and treat relative-phase Toffolis as
+        Toffolis.
+
+    Returns:
+      A list with one int bit-vector per qubit of circ.
+    """
+    full = pow(2, pow(2, len(input_qubits))) - 1
+    state = [0] * circ.num_qubits
+    for qubit, bitset in zip(input_qubits, input_bitsets(len(input_qubits))):
+        state[qubit] = bitset
+    _apply(circ, list(range(circ.num_qubits)), state, full, ignore_phases)
+    return state
+
+
+def to_array(bitset, num_inputs):
+    """Unpacks a bit-vector into a uint8 array of length 2^num_inputs."""
+    num_bytes = pow(2, num_inputs) // 8 or 1
+    packed = np.frombuffer(bitset.to_bytes(num_bytes, 'little'), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder='little')[:pow(2, num_inputs)]
+
+
+def truth_table(circ, qubit, input_qubits, ignore_phases=False):
+    """Value of qubit after circ for every basis state of input_qubits."""
+    state = simulate(circ, input_qubits, ignore_phases)
+    return to_array(state[qubit], len(input_qubits))
+
+
+def dirty_qubits(circ, input_qubits, ancillas, ignore_phases=False):
+    """Returns the qubits that circ does not restore.
+
+    Ancillas must come back to |0> and input qubits to their starting value for
+    every input. An empty list means circ is a clean compute/uncompute pair.
+    """
+    state = simulate(circ, input_qubits, ignore_phases)
+    dirty = [q for q in ancillas if state[q] != 0]
+    dirty += [q for q, bitset in zip(input_qubits, input_bitsets(len(input_qubits))) if state[q] != bitset]
+    return dirty
@@ -0,0 +1,247 @@
+"""Declarative parameter sweeps of the Grover circuit.
+
+A sweep is a grid over the run parameters that Grover.py keeps as globals:
+
+    {
+        "name": "t_vs_level",
+        "grid": {
+            "t": [1, 2, 3, 4, 5, 6],
+            "shots": [1024, 8192],
+            "optimization_level": [1, 3],
+            "construction": ["kickback", "phase"],
+            "use_local": [true]
+        },
+        "workers": null,
+        "seed": 0
+    }
+
+Every combination is one point. Points that share (t, construction,
+mcx_strategy, uncomputation, optimization_level, use_local) are built and
+transpiled once, as one task. Local tasks run in a process pool, each worker
+sampling its circuit for all the shots values of the task on a
+single-threaded AerSimulator, so the pool and not Aer spreads the sweep over
+the cores. Hardware points (use_local false) are submitted concurrently
+through the job manager, which journals them under a new run id; giving
+"resume": <run id> (or --resume) reloads or waits for the jobs of that run
+instead of sampling again. Instead of t, the grid may give
+"known_solutions": true for the optimal t of the hash oracle, or false for
+the t values Grover.py's unknown-solutions mode tries (candidate_schedule).
+
+Each sweep writes one result set to SWEEP_DIR/<name>-<timestamp>/:
+sweep.json (the config), points.jsonl (one line per point with its
+parameters, success probability, most frequent outcomes and timings) and
+counts.npy (a (points, 256) int64 array in the order of points.jsonl).
+
+    python sweep_runner.py --config sweep.json
+    python sweep_runner.py --t 1 2 3 4 5 6 --optimization-level 0 1 2 3 --shots 1024
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from pools import process_pool
+
+# Where every sweep's result set is written
+SWEEP_DIR = "./results/sweeps"
+
+DEFAULTS = {
+    "t": 6,
+    "shots": 1024,
+    "optimization_level": 1,
+    "construction": "kickback",
+    "mcx_strategy": "noancilla",
+    "uncomputation": "reversible",
+    "use_local": True,
+}
+# Parameters that change the compiled circuit; points equal in these share a task
+COMPILE_FIELDS = ("t", "construction", "mcx_strategy", "uncomputation", "optimization_level", "use_local")
+
+
+def expand_grid(grid):
+    """The points of a grid: one dict per combination, missing parameters at DEFAULTS."""
+    from Grover import KNOWN_SOLUTIONS_T, candidate_schedule, input_qubits
+
+    grid = {name: values if isinstance(values, list) else [values] for name, values in grid.items()}
+    if "known_solutions" in grid:
+        if "t" in grid:
+            raise ValueError("A sweep gives either t or known_solutions, not both")
+        t_values = set()
+        for known in grid.pop("known_solutions"):
+            t_values.update([KNOWN_SOLUTIONS_T] if known else candidate_schedule(pow(2, len(input_qubits))))
+        grid["t"] = sorted(t_values)
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    names = sorted(grid)
+    return [{**DEFAULTS, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+
+
+def compile_tasks(points):
+    """Groups point indices by the circuit they compile to: {compile key: [index, ...]}."""
+    tasks = {}
+    for index, point in enumerate(points):
+        tasks.setdefault(tuple(point[field] for field in COMPILE_FIELDS), []).append(index)
+    return tasks
+
+
+def build_and_transpile(point, backend):
+    """The point's circuit, its transpiled circuit and the seconds spent building and transpiling it."""
+    from Grover import Grover_circuit
+    from transpile_cache import cached_transpile
+
+    start = time.perf_counter()
+    circ = Grover_circuit(point["t"], point["construction"], point["mcx_strategy"], point["uncomputation"])
+    built = time.perf_counter()
+    compiled = cached_transpile(circ, backend, optimization_level=point["optimization_level"])
+    return circ, compiled, {"build": built - start, "transpile": time.perf_counter() - built}
+
+
+def run_local_task(points, seeds, threads=1):
+    """Builds and transpiles the circuit shared by points once, then samples every point.
+
+    Returns one (counts array, timings) pair per point; the compile time is
+    reported with the first point only.
+    """
+    from aer_methods import choose_options
+    from backends import local_backend, make_sampler
+    from bit_counts import bincount
+
+    _, compiled, timings = build_and_transpile(points[0], local_backend())
+    outputs = []
+    for point, seed in zip(points, seeds):
+        options = dict(choose_options(compiled, point["shots"]), max_parallel_threads=threads)
+        sampler = make_sampler(local_backend(**options))
+        sampler.options.simulator.seed_simulator = seed
+        start = time.perf_counter()
+        result = sampler.run([compiled], shots=point["shots"]).result()
+        outputs.append((bincount(result[0].data.c), {**timings, "simulate": time.perf_counter() - start}))
+        timings = {}
+    return outputs
+
+
+def run_hardware_tasks(tasks, points, job_run):
+    """Compiles each hardware task once and submits one journaled job per point of run job_run."""
+    from qiskit_ibm_runtime import QiskitRuntimeService
+
+    from backends import ibm_backend, make_sampler
+    from bit_counts import bincount
+    from job_manager import Batch, JobManager, RuntimeAdapter, batch_key
+
+    backend = ibm_backend()
+    batches, timings = [], []
+    for indices in tasks:
+        circ, compiled, compile_timings = build_and_transpile(points[indices[0]], backend)
+        # Keyed on the logical circuit, so a resume after a calibration update finds the journaled jobs
+        key_config = {"optimization_level": points[indices[0]]["optimization_level"]}
+        for index in indices:
+            shots = points[index]["shots"]
+            batches.append(Batch(batch_key(job_run, backend.name, [circ], shots, **key_config), [compiled], shots,
+                                 point=index))
+            timings.append(compile_timings)
+            compile_timings = {}
+    start = time.perf_counter()
+    results = JobManager(RuntimeAdapter(make_sampler(backend), QiskitRuntimeService())).run(batches)
+    seconds = time.perf_counter() - start
+    outputs = {}
+    for batch, result, compile_timings in zip(batches, results, timings):
+        if isinstance(result, Exception):
+            raise result
+        outputs[batch.metadata["point"]] = (bincount(result[0].data.c), {**compile_timings, "jobs": seconds})
+    return outputs
+
+
+def run_sweep(config, out_dir=SWEEP_DIR):
+    """Runs every point of config["grid"] and writes the sweep's result set; returns its directory."""
+    from bit_counts import success_probability, top_k
+    from Grover import F_RESULT_ANC_INDEX, NUM_QUBITS, compute_fx, input_qubits
+    from ideal_grover import marked_from_circuit
+
+    points = expand_grid(config["grid"])
+    tasks = compile_tasks(points)
+    seeds = np.random.SeedSequence(config.get("seed")).generate_state(len(points)).tolist()
+    local = [indices for key, indices in tasks.items() if key[COMPILE_FIELDS.index("use_local")]]
+    hardware = [indices for key, indices in tasks.items() if not key[COMPILE_FIELDS.index("use_local")]]
+    print(f"{len(points)} points in {len(tasks)} compile tasks ({len(hardware)} on hardware)")
+
+    outputs = {}
+    job_run = None
+    if hardware:
+        from job_manager import new_run_id
+
+        job_run = config.get("resume") or new_run_id()
+        print(f"Journaling hardware jobs as run {job_run}")
+    start = time.perf_counter()
+    workers = config.get("workers") or os.cpu_count()
+    with process_pool(workers) as pool:
+        futures = {pool.submit(run_local_task, [points[i] for i in indices], [seeds[i] for i in indices]): indices
+                   for indices in local}
+        if hardware:
+            outputs.update(run_hardware_tasks(hardware, points, job_run))
+        for future, indices in futures.items():
+            outputs.update(zip(indices, future.result()))
+    seconds = time.perf_counter() - start
+
+    marked = marked_from_circuit(compute_fx, NUM_QUBITS, input_qubits, F_RESULT_ANC_INDEX)
+    sweep_dir = os.path.join(out_dir, f"{config.get('name', 'sweep')}-{time.strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(sweep_dir)
+    with open(os.path.join(sweep_dir, "sweep.json"), 'w') as f_config:
+        json.dump({**config, "points": len(points), "seconds": seconds, "job_run": job_run}, f_config, indent=4)
+    with open(os.path.join(sweep_dir, "points.jsonl"), 'w') as f_points:
+        for index, point in enumerate(points):
+            counts, timings = outputs[index]
+            f_points.write(json.dumps({
+                "point": index, **point, "seed": seeds[index],
+                "success": success_probability(counts, marked),
+                "top": top_k(counts, len(marked)).tolist(),
+                "timings": timings,
+            }) + "\n")
+    np.save(os.path.join(sweep_dir, "counts.npy"), np.stack([outputs[index][0] for index in range(len(points))]))
+    print(f"Sweep finished in {seconds:.2f} s, results in {sweep_dir}")
+    return sweep_dir
+
+
+def load_sweep(sweep_dir):
+    """(points, counts) of a written sweep: the point records and their (points, 256) counts."""
+    with open(os.path.join(sweep_dir, "points.jsonl")) as f_points:
+        points = [json.loads(line) for line in f_points if line.strip()]
+    return points, np.load(os.path.join(sweep_dir, "counts.npy"), mmap_mode='r')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="JSON sweep config; the options below build one otherwise")
+    parser.add_argument("--name", default="sweep")
+    parser.add_argument("--t", type=int, nargs="+")
+    parser.add_argument("--shots", type=int, nargs="+")
+    parser.add_argument("--optimization-level", type=int, nargs="+")
+    parser.add_argument("--construction", nargs="+")
+    parser.add_argument("--mcx-strategy", nargs="+")
+    parser.add_argument("--uncomputation", nargs="+")
+    parser.add_argument("--known-solutions", action="store_true", help="Use the optimal t instead of --t")
+    parser.add_argument("--ibm", action="store_true", help="Run on IBM hardware instead of locally")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=SWEEP_DIR)
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume the hardware jobs of this run")
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config) as f_config:
+            config = json.load(f_config)
+    else:
+        grid = {name: getattr(args, name) for name in DEFAULTS if getattr(args, name, None) is not None}
+        grid["use_local"] = [not args.ibm]
+        if args.known_solutions:
+            grid["known_solutions"] = [True]
+        config = {"name": args.name, "grid": grid, "workers": args.workers, "seed": args.seed}
+    if args.resume:
+        config["resume"] = args.resume
+    sweep_dir = run_sweep(config, args.out)
+    points, _ = load_sweep(sweep_dir)
+    for point in points:
+        parameters = "  ".join(f"{field}={point[field]}" for field in DEFAULTS if field != "use_local")
+        print(f"{parameters}  success={point['success']:.4f}")
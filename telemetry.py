@@ -0,0 +1,204 @@
+"""Per-stage timing of runs as JSON lines.
+
+A run goes through build, transpile, submit, queue_wait, execute, fetch,
+postprocess and render. Telemetry appends one record per stage to
+TELEMETRY_FILE with the stage's wall time and the run's context (run id,
+backend, t, shots, job id, transpiled depth and CX count), so a slow hardware
+run shows whether the time went to compilation, the queue, the device or
+local work. wait_for_job() splits the wait on a job into queue_wait and
+execute by polling its status, and adds the device's own timestamps and
+quantum seconds from job.metrics() where the job reports them. A job that
+finishes between two polls is split by those timestamps, or marked as split
+"unknown" without them.
+
+summarize() aggregates the records of many runs per stage (or any other
+fields):
+
+    python telemetry.py --by backend stage
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Default location of the telemetry records
+TELEMETRY_FILE = "./results/telemetry.jsonl"
+
+STAGES = ("build", "transpile", "submit", "queue_wait", "execute", "fetch", "postprocess", "render")
+
+FINAL_STATUSES = {"DONE", "ERROR", "CANCELLED"}
+
+
+def circuit_fields(compiled):
+    """Depth and two-qubit gate count (CX, or the backend's ECR/CZ) of a transpiled circuit."""
+    cx = sum(1 for instruction in compiled.data
+             if instruction.operation.num_qubits == 2 and instruction.operation.name != "barrier")
+    return {"depth": compiled.depth(), "cx": cx}
+
+
+class Telemetry:
+    """Appends stage records of one run to path; path=None only keeps them in memory."""
+
+    def __init__(self, path=TELEMETRY_FILE, **context):
+        self.path = path
+        self.context = {"run_id": uuid.uuid4().hex, **context}
+        self.records = []
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def update(self, **context):
+        """Adds fields, e.g. job_id or depth, to every following record."""
+        self.context.update(context)
+
+    def record(self, stage, seconds, **fields):
+        record = {**self.context, "stage": stage, "seconds": seconds, "time": time.time(), **fields}
+        self.records.append(record)
+        if self.path:
+            with open(self.path, 'a') as f_out:
+                f_out.write(json.dumps(record) + "\n")
+        return record
+
+    @contextmanager
+    def stage(self, stage, **fields):
+        """Times the body of a with statement as one stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def seconds(self):
+        """Total seconds per stage recorded so far, e.g. for a results store index."""
+        totals = {}
+        for record in self.records:
+            totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["seconds"]
+        return totals
+
+
+def status_name(status):
+    """Upper-case job status; runtime jobs report strings, local and Aer jobs a JobStatus enum."""
+    return getattr(status, "name", str(status)).upper()
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+
+def job_metrics(job):
+    """Server-side queue and execution seconds of a finished job, {} if unavailable."""
+    try:
+        metrics = job.metrics()
+    except Exception:
+        return {}
+    timestamps = metrics.get("timestamps") or {}
+    created, running, finished = (_timestamp(timestamps.get(key)) for key in ("created", "running", "finished"))
+    fields = {}
+    if created and running:
+        fields["server_queue_seconds"] = (running - created).total_seconds()
+    if running and finished:
+        fields["server_execute_seconds"] = (finished - running).total_seconds()
+    quantum_seconds = (metrics.get("usage") or {}).get("quantum_seconds")
+    if quantum_seconds is not None:
+        fields["quantum_seconds"] = quantum_seconds
+    return fields
+
+
+def record_wait(telemetry, start, end, running, waiting, status, metrics, **fields):
+    """Records the queue_wait and execute stages of a job waited on from start to end.
+
+    running is the first poll that saw the job RUNNING, waiting the last one
+    that saw it still waiting (start if none did). A job that finishes between
+    two polls is never seen running; its wait is then split by the device's
+    own execution time from job_metrics() where there is one, and otherwise
+    only the time up to the last waiting poll counts as queue_wait. Both
+    records carry how the wait was split: "observed", "metrics" or "unknown".
+    """
+    if running is not None:
+        split, execute_start = "observed", running
+    elif "server_execute_seconds" in metrics:
+        split, execute_start = "metrics", max(start, end - metrics["server_execute_seconds"])
+    else:
+        split, execute_start = "unknown", waiting
+    telemetry.record("queue_wait", execute_start - start, split=split, **fields)
+    telemetry.record("execute", end - execute_start, status=status, split=split, **metrics, **fields)
+
+
+def wait_for_job(job, telemetry, poll_interval=0.01, max_poll_interval=5.0):
+    """Waits for job while recording queue_wait, execute and fetch; returns job.result().
+
+    The status is polled with a doubling interval, so a local job costs
+    milliseconds of polling and a queued hardware job a request every few
+    seconds.
+    """
+    telemetry.update(job_id=job.job_id())
+    start = time.perf_counter()
+    running = None
+    waiting = start
+    while True:
+        status = status_name(job.status())
+        now = time.perf_counter()
+        if status == "RUNNING" and running is None:
+            running = now
+        if status in FINAL_STATUSES:
+            break
+        if running is None:
+            waiting = now
+        time.sleep(poll_interval)
+        poll_interval = min(2 * poll_interval, max_poll_interval)
+    record_wait(telemetry, start, now, running, waiting, status, job_metrics(job))
+    with telemetry.stage("fetch"):
+        return job.result()
+
+
+def load_records(path=TELEMETRY_FILE):
+    with open(path) as f_in:
+        return [json.loads(line) for line in f_in if line.strip()]
+
+
+def summarize(records, by=("stage",)):
+    """Per group of the by fields: runs, count, total, mean, p50, p95, max seconds and share of the total.
+
+    Returns a list of dicts sorted by total seconds, largest first.
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(tuple(record.get(field) for field in by), []).append(record)
+    grand_total = sum(record["seconds"] for record in records) or 1.0
+    rows = []
+    for key, group in groups.items():
+        seconds = sorted(record["seconds"] for record in group)
+        total = sum(seconds)
+        rows.append({
+            **dict(zip(by, key)),
+            "runs": len({record.get("run_id") for record in group}),
+            "count": len(seconds),
+            "total": total,
+            "mean": total / len(seconds),
+            "p50": seconds[len(seconds) // 2],
+            "p95": seconds[min(len(seconds) - 1, int(0.95 * len(seconds)))],
+            "max": seconds[-1],
+            "share": total / grand_total,
+        })
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=TELEMETRY_FILE)
+    parser.add_argument("--by", nargs="+", default=["stage"], help="Record fields to group by")
+    parser.add_argument("--backend", help="Only summarize runs on this backend")
+    args = parser.parse_args()
+
+    records = load_records(args.path)
+    if args.backend:
+        records = [record for record in records if record.get("backend") == args.backend]
+    print(f"{len({record.get('run_id') for record in records})} runs, {len(records)} records")
+    for row in summarize(records, args.by):
+        group = "  ".join(f"{field}={row[field]}" for field in args.by)
+        print(f"{group:<40} n={row['count']:<5} total={row['total']:>9.3f} s  mean={row['mean']:.4f}  "
+              f"p50={row['p50']:.4f}  p95={row['p95']:.4f}  max={row['max']:.4f}  {100 * row['share']:5.1f}%")
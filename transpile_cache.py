@@ -0,0 +1,197 @@
+"""On-disk cache of transpiled circuits.
+
+Transpiling the Grover circuit for hardware at optimization_level 3 can take
+longer than the job itself, and every run repeats it. cached_transpile() stores
+each compiled circuit as QPY under a key made of
+
+  * a structural hash of the circuit (gates, operands and parameters, not its
+    auto-generated name),
+  * the backend name, version and target (operations, coupling map and the
+    reported gate and readout errors, which VF2Layout scores layouts by, so a
+    recalibrated device gets fresh compilations),
+  * the transpiler options and the Qiskit version,
+
+and evicts the least recently used entries once the cache exceeds its size
+budget. transpile_pieces() goes one step further for circuits made of repeated
+pieces: every piece is transpiled once on a shared initial layout, followed
+by the swaps that undo its routing permutation, so the compiled pieces can be
+stitched in any order. transpile_repeated() uses it for Grover circuits, so a
+sweep over t = 1..12 costs one compilation of the iterate instead of twelve
+full ones.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import qiskit
+from qiskit import QuantumCircuit, qpy, transpile
+from qiskit.transpiler.passes.routing.algorithms import ApproximateTokenSwapper
+
+# Directory holding the cached .qpy files
+CACHE_DIR = "./.transpile_cache"
+# Size budget of the cache directory in bytes
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def _structure(circ, out):
+    """Feeds a canonical description of circ into the hash object out."""
+    out.update(f"{circ.num_qubits}|{circ.num_clbits}|{circ.global_phase}\n".encode())
+    for instruction in circ.data:
+        operation = instruction.operation
+        qubits = [circ.find_bit(q).index for q in instruction.qubits]
+        clbits = [circ.find_bit(c).index for c in instruction.clbits]
+        params = [p for p in operation.params if not isinstance(p, QuantumCircuit)]
+        ctrl_state = getattr(operation, "ctrl_state", None)
+        out.update(f"{operation.name}|{qubits}|{clbits}|{params}|{ctrl_state}\n".encode())
+        for block in getattr(operation, "blocks", ()):
+            _structure(block, out)
+
+
+def circuit_hash(circ):
+    """Hash of the circuit's structure; equal for equal gate sequences."""
+    out = hashlib.sha256()
+    _structure(circ, out)
+    return out.hexdigest()
+
+
+def calibration_hash(target):
+    """Hash of the error rates target reports per operation and qubits."""
+    out = hashlib.sha256()
+    for name in sorted(target.operation_names):
+        for qargs, properties in sorted(target[name].items(), key=lambda item: repr(item[0])):
+            out.update(f"{name}|{qargs}|{getattr(properties, 'error', None)}\n".encode())
+    return out.hexdigest()
+
+
+def backend_key(backend):
+    """Identifies the backend and the version of its target, calibration included."""
+    target = backend.target
+    coupling = sorted(target.build_coupling_map().get_edges()) if target.build_coupling_map() else None
+    return {
+        "name": backend.name,
+        "version": str(getattr(backend, "backend_version", None)),
+        "num_qubits": target.num_qubits,
+        "operations": sorted(target.operation_names),
+        "coupling": hashlib.sha256(repr(coupling).encode()).hexdigest(),
+        "calibration": calibration_hash(target),
+    }
+
+
+def cache_key(circ, backend, optimization_level, options):
+    key = {
+        "circuit": circuit_hash(circ),
+        "backend": backend_key(backend),
+        "optimization_level": optimization_level,
+        "options": {name: repr(value) for name, value in sorted(options.items())},
+        "qiskit": qiskit.__version__,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Deletes the least recently used entries until the cache fits max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".qpy"):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # Evicted by another process meanwhile
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_transpile(circ, backend, optimization_level=1, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, **options):
+    """Drop-in replacement for transpile(circ, backend, optimization_level=...).
+
+    Extra keyword arguments are passed to transpile() and are part of the key.
+    Pass a seed_transpiler for the cached result to match a fresh compilation
+    exactly; without one the first result is reused.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, cache_key(circ, backend, optimization_level, options) + ".qpy")
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f_qpy:
+                compiled = qpy.load(f_qpy)[0]
+            os.utime(path)  # Mark as recently used for eviction
+            return compiled
+        except Exception as e:
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+
+    compiled = transpile(circ, backend, optimization_level=optimization_level, **options)
+    # Pool workers may compile the same key at once, so each writes its own temp file
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as f_qpy:
+        qpy.dump(compiled, f_qpy)
+    os.replace(f_qpy.name, path)
+    evict(cache_dir, max_bytes)
+    return compiled
+
+
+def restore_layout(compiled, backend, optimization_level=1, **options):
+    """Compiled swaps that move every qubit of compiled from its final back to its initial physical qubit.
+
+    Returns None when routing left compiled without a permutation. The swaps
+    act on coupled pairs only, found by token swapping on the backend's
+    coupling map; physical qubits outside the layout only carry |0> and may
+    end anywhere.
+    """
+    layout = compiled.layout
+    if layout is None:
+        return None
+    initial = layout.initial_index_layout(filter_ancillas=True)
+    final = layout.final_index_layout(filter_ancillas=True)
+    if final == initial:
+        return None
+    graph = backend.target.build_coupling_map().graph.to_undirected()
+    swaps = QuantumCircuit(compiled.num_qubits)
+    for a, b in ApproximateTokenSwapper(graph, seed=0).map(dict(zip(final, initial))):
+        swaps.swap(a, b)
+    # The swaps are already placed and routed, they only need translating
+    options = dict(options, initial_layout=list(range(compiled.num_qubits)), routing_method="none")
+    return cached_transpile(swaps, backend, optimization_level, **options)
+
+
+def transpile_pieces(pieces, backend, optimization_level=1, **options):
+    """Transpiles each piece once so that the compiled pieces can be composed in any order.
+
+    The first piece chooses the layout, unless options give an initial_layout,
+    and the others are placed on it. A piece that routing leaves permuted is
+    followed by the swaps of restore_layout(), so every compiled piece starts
+    and ends with each qubit on the same physical qubit. Optimizations across
+    piece boundaries are lost, which is the price for compiling each piece
+    only once.
+    """
+    # A piece in the middle of a circuit finds its qubits in any state, so the
+    # synthesis must not borrow idle qubits as clean ancillas
+    options = dict(options, qubits_initially_zero=False)
+    first = cached_transpile(pieces[0], backend, optimization_level, **options)
+    if first.layout is not None:
+        options = dict(options, initial_layout=first.layout.initial_index_layout(filter_ancillas=True))
+    compiled = [first] + [cached_transpile(piece, backend, optimization_level, **options) for piece in pieces[1:]]
+    for index, piece in enumerate(compiled):
+        restore = restore_layout(piece, backend, optimization_level, **options)
+        if restore is not None:
+            compiled[index] = piece.compose(restore)
+    return compiled
+
+
+def transpile_repeated(prepare, iterate, finish, t, backend, optimization_level=1, **options):
+    """Transpiles prepare + t * iterate + finish by compiling each piece once (see transpile_pieces)."""
+    compiled_iterate, compiled_prepare, compiled_finish = transpile_pieces([iterate, prepare, finish], backend,
+                                                                           optimization_level, **options)
+    full = compiled_prepare.copy()
+    for _ in range(t):
+        full.compose(compiled_iterate, inplace=True)
+    full.compose(compiled_finish, inplace=True)
+    return full